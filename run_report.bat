@@ -6,5 +6,7 @@ call .venv\Scripts\activate
 
 python -m src.main
 
+REM modo continuo (en vez del Programador de tareas): python -m src.main --watch --interval 30
+
 REM opcional: para que el scheduler capture un errorlevel
 exit /b %errorlevel% 
\ No newline at end of file
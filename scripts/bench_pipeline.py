@@ -0,0 +1,162 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+from scripts.synth_export import generate_export, write_export
+
+DEFAULT_RESULTS = Path("bench_results") / "pipeline.jsonl"
+
+
+def _commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _settings(root: Path, chunksize: int | None, formats: tuple[str, ...]):
+    from src.config import Settings
+
+    return Settings(
+        input_dir=root / "input",
+        archive_dir=root / "archive",
+        output_dir=root / "output",
+        log_dir=root / "logs",
+        opera_pattern="opera_export_*.csv",
+        enable_outlook_download=False,
+        outlook_folder_path=[],
+        outlook_processed_folder=None,
+        mail_input_dir=root / "input",
+        mail_archive_dir=root / "archive",
+        mail_allowed_ext={".csv"},
+        read_chunksize=chunksize,
+        output_formats=formats,
+        state_dir=root / "state",
+        # Se mide el pipeline completo, con las etapas opcionales activas
+        enable_guest_index=True,
+        enable_daily_aggregates=True,
+        enable_pace_report=True,
+    )
+
+
+def run_scale(file_path: Path, settings) -> tuple[float, list[dict]]:
+    """
+    Corre `process_file` sobre un archivo (en un proceso nuevo, ver main).
+
+    Returns
+    -------
+    tuple[float, list[dict]]
+        (segundos totales, métricas por etapa de src.metrics).
+    """
+    from src.main import process_file
+    from src.metrics import RunMetrics
+
+    logger = logging.getLogger("bench_pipeline")
+    logger.setLevel(logging.WARNING)
+
+    metrics = RunMetrics()
+    t0 = time.perf_counter()
+    process_file(file_path, settings, logger, settings.archive_dir, metrics=metrics)
+    return time.perf_counter() - t0, [asdict(r) for r in metrics.records]
+
+
+def _previous_run(results: Path, commit: str | None) -> dict[tuple, dict]:
+    """
+    Última medición de otro commit por (filas, modo, etapa), para comparar.
+    """
+    previous = {}
+    if not results.exists():
+        return previous
+    for line in results.read_text(encoding="utf-8").splitlines():
+        r = json.loads(line)
+        if r["commit"] != commit:
+            previous[(r["rows"], r["mode"], r["stage"])] = r
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de process_file con exports sintéticos")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Lectura por bloques (READ_CHUNKSIZE); por defecto archivo completo")
+    parser.add_argument("--formats", default="excel", help="Formatos de salida, separados por coma")
+    parser.add_argument("--results", type=Path, default=DEFAULT_RESULTS,
+                        help="Archivo JSON Lines donde se agregan los resultados")
+    args = parser.parse_args()
+
+    formats = tuple(f.strip() for f in args.formats.split(",") if f.strip())
+    mode = f"chunk{args.chunksize}" if args.chunksize else "full"
+    commit = _commit()
+    previous = _previous_run(args.results, commit)
+    common = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "mode": mode,
+        "formats": ",".join(formats),
+    }
+
+    args.results.parent.mkdir(parents=True, exist_ok=True)
+    print(f"commit {commit} | modo {mode} | formatos {common['formats']}")
+    print(f"{'rows':>9} | {'etapa':<18} | {'segundos':>8} | {'RSS MB':>7} | {'vs antes':>8}")
+
+    # Un proceso nuevo por escala: el pico de RSS es del proceso completo,
+    # así cada escala mide solo lo suyo (y no lo que dejó la anterior)
+    ctx = multiprocessing.get_context("spawn")
+
+    with open(args.results, "a", encoding="utf-8") as out:
+        for rows in args.rows:
+            with tempfile.TemporaryDirectory() as tmp:
+                root = Path(tmp)
+                settings = _settings(root, args.chunksize, formats)
+                settings.input_dir.mkdir()
+
+                # El export se genera fuera del proceso medido
+                file_path = write_export(
+                    generate_export(rows, seed=args.seed), settings.input_dir / f"opera_export_{rows}.csv"
+                )
+
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    total, stages = pool.submit(run_scale, file_path, settings).result()
+
+            stages.append({
+                "stage": "total", "seconds": total,
+                "peak_rss_mb": max((s["peak_rss_mb"] or 0 for s in stages), default=None),
+            })
+            for s in stages:
+                record = {
+                    **common, "rows": rows, "stage": s["stage"], "seconds": round(s["seconds"], 4),
+                    "rows_in": s.get("rows_in"), "rows_out": s.get("rows_out"),
+                    "peak_rss_mb": s["peak_rss_mb"] and round(s["peak_rss_mb"], 1),
+                }
+                out.write(json.dumps(record) + "\n")
+
+                before = previous.get((rows, mode, s["stage"]))
+                delta = (
+                    f"{(record['seconds'] / before['seconds'] - 1) * 100:>+7.0f}%"
+                    if before and before["seconds"] else f"{'-':>8}"
+                )
+                rss = f"{record['peak_rss_mb']:>7.0f}" if record["peak_rss_mb"] else f"{'-':>7}"
+                print(f"{rows:>9} | {s['stage']:<18} | {record['seconds']:>8.3f} | {rss} | {delta}")
+
+    print(f"\nResultados agregados a {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook
+
+from src import extract
+from src.extract import read_export
+
+SAMPLE = Path("data/input_mail/reservations_test.csv")
+
+
+def build_xlsx(rows: int, dest: Path) -> None:
+    # Replica las filas del export de ejemplo como lo guardaría Excel:
+    # números como números y fechas como celdas de fecha
+    sample = pd.read_csv(SAMPLE, encoding="utf-8", sep=",")
+    for c in ("Arrival", "Departure"):
+        sample[c] = pd.to_datetime(sample[c], format="%d-%m-%Y")
+    body = [
+        [None if pd.isna(v) else v for v in row]
+        for row in sample.astype(object).itertuples(index=False)
+    ]
+
+    # write_only escribe en streaming (sin armar el libro en memoria)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Reservations")
+    ws.append(list(sample.columns))
+    for i in range(rows):
+        ws.append(body[i % len(body)])
+    wb.save(dest)
+
+
+def measure(fn) -> tuple[float, float, float]:
+    t0 = time.perf_counter()
+    df = fn()
+    elapsed = time.perf_counter() - t0
+    frame_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+
+    # tracemalloc solo ve memoria de Python: lo que reserve calamine
+    # (Rust) no aparece, por eso el pico es orientativo en ese modo
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak / 1024 ** 2, frame_mb
+
+
+def read_export_with(calamine: bool, path: Path):
+    def run():
+        previous = extract.HAS_CALAMINE
+        extract.HAS_CALAMINE = calamine
+        try:
+            return read_export(path)
+        finally:
+            extract.HAS_CALAMINE = previous
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[20_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"python-calamine disponible: {extract.HAS_CALAMINE}")
+    print(f"{'rows':>9} | {'modo':<28} | {'segundos':>8} | {'peak MB':>8} | {'df MB':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = Path(tmp) / f"opera_export_{rows}.xlsx"
+            build_xlsx(rows, path)
+
+            modes = [
+                ("read_excel (openpyxl)", lambda: pd.read_excel(path)),
+                ("read_export openpyxl", read_export_with(False, path)),
+            ]
+            if extract.HAS_CALAMINE:
+                modes.append(("read_export calamine", read_export_with(True, path)))
+
+            for mode, fn in modes:
+                elapsed, peak, frame_mb = measure(fn)
+                print(f"{rows:>9} | {mode:<28} | {elapsed:>8.3f} | {peak:>8.1f} | {frame_mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
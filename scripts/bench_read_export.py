@@ -0,0 +1,69 @@
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from src import extract
+from src.extract import read_export
+
+SAMPLE = Path("data/input_mail/reservations_test.csv")
+
+
+def build_csv(rows: int, dest: Path, complete_rows: bool) -> None:
+    # Replica las filas del export de ejemplo tal cual (texto crudo).
+    # complete_rows=True agrega la coma final que Opera omite en "Linked Name",
+    # para poder medir también el motor pyarrow.
+    lines = SAMPLE.read_text(encoding="utf-8").splitlines()
+    header, body = lines[0], lines[1:]
+    if complete_rows:
+        body = [line + "," if line.count(",") < header.count(",") + 1 else line for line in body]
+
+    with dest.open("w", encoding="utf-8", newline="\n") as f:
+        f.write(header + "\n")
+        for i in range(rows):
+            f.write(body[i % len(body)] + "\n")
+
+
+def measure(fn) -> tuple[float, float, float]:
+    t0 = time.perf_counter()
+    df = fn()
+    elapsed = time.perf_counter() - t0
+    frame_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak / 1024 ** 2, frame_mb
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"pyarrow disponible: {extract.HAS_PYARROW}")
+    print(f"{'rows':>9} | {'filas':<9} | {'modo':<22} | {'segundos':>8} | {'peak MB':>8} | {'df MB':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            for complete_rows in (False, True):
+                path = Path(tmp) / f"opera_export_{rows}.csv"
+                build_csv(rows, path, complete_rows)
+                label = "completas" if complete_rows else "Opera"
+
+                modes = [
+                    ("read_csv inferido", lambda: pd.read_csv(path, encoding="utf-8", sep=",")),
+                    ("read_export tipado", lambda: read_export(path)),
+                ]
+                for mode, fn in modes:
+                    elapsed, peak, frame_mb = measure(fn)
+                    print(f"{rows:>9} | {label:<9} | {mode:<22} | {elapsed:>8.3f} | {peak:>8.1f} | {frame_mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
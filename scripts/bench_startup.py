@@ -0,0 +1,98 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Módulos que una corrida sin nada que hacer no debe cargar
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow", "win32com")
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """
+    Tiempo acumulado (µs) por módulo según la salida de `-X importtime`.
+    """
+    cumulative = {}
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line.split("|")
+        if cum.strip().isdigit():
+            cumulative[name.strip()] = int(cum)
+    return cumulative
+
+
+def run(args: list[str], env: dict[str, str]) -> tuple[float, dict[str, int]]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return time.perf_counter() - t0, parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de src.main (-X importtime)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=300.0,
+                        help="Umbral para `import src.main` (mejor de --repeat)")
+    parser.add_argument("--max-run-ms", type=float, default=1500.0,
+                        help="Umbral para una corrida sin pendientes, intérprete incluido")
+    args = parser.parse_args()
+
+    failures = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(Path.cwd()),
+            "INPUT_DIR": str(root / "input"),
+            "ARCHIVE_DIR": str(root / "archive"),
+            "OUTPUT_DIR": str(root / "output"),
+            "LOG_DIR": str(root / "logs"),
+            "ENABLE_OUTLOOK_DOWNLOAD": "0",
+        }
+        (root / "input").mkdir()
+
+        cases = [
+            ("import src.main", ["-c", "import src.main"], "src.main", args.max_import_ms),
+            ("corrida sin pendientes", ["-m", "src.main"], None, args.max_run_ms),
+        ]
+
+        print(f"{'caso':<24} | {'mejor ms':>9} | {'import ms':>9} | {'umbral':>7}")
+        for label, argv, module, threshold in cases:
+            best, modules = None, {}
+            for _ in range(args.repeat):
+                elapsed, modules = run(argv, env)
+                best = elapsed if best is None else min(best, elapsed)
+
+            # Con -m src.main el módulo corre como __main__ y no aparece en
+            # importtime: ahí el umbral es sobre el tiempo total del proceso
+            measured = modules.get(module, 0) / 1000 if module else best * 1000
+            import_txt = f"{measured:>9.1f}" if module else f"{'-':>9}"
+            print(f"{label:<24} | {best * 1000:>9.1f} | {import_txt} | {threshold:>7.0f}")
+
+            if measured > threshold:
+                failures.append(f"{label}: {measured:.0f} ms > {threshold:.0f} ms")
+
+            heavy = sorted(m for m in modules if m.split(".")[0] in HEAVY_MODULES and "." not in m)
+            if heavy:
+                failures.append(f"{label}: importa {', '.join(heavy)}")
+
+        # Los módulos más caros de la corrida, para ver qué revisar si se pasa del umbral
+        print("\nmódulos más caros (acumulado, corrida sin pendientes):")
+        for name, us in sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[:8]:
+            print(f"  {us / 1000:>8.1f} ms  {name}")
+
+    if failures:
+        print("\nFALLA:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from src.transform import basic_clean, map_columns, transform_export, validate
+from src.names import NameMemo
+
+SAMPLE = Path("data/input_mail/reservations_test.csv")
+
+
+def build_frame(rows: int) -> pd.DataFrame:
+    # Replica el export de ejemplo hasta tener `rows` filas.
+    df = pd.read_csv(SAMPLE)
+
+    reps = rows // len(df) + 1
+    df = pd.concat([df] * reps, ignore_index=True).head(rows)
+    df["ConfirmationNumber"] = range(len(df))
+    return df
+
+
+def chained(df: pd.DataFrame) -> pd.DataFrame:
+    # Cadena original (normalize_columns -> validate -> basic_clean ->
+    # split_name -> build_customer_key_name), como referencia: cada paso
+    # copia el DataFrame completo y recorre 'name' con regex
+    df = map_columns(df.copy())
+    validate(df)
+    df = basic_clean(df)
+
+    df = df.copy()
+    df["name"] = df["name"].astype(str).str.strip().str.replace(r"\s+", " ", regex=True)
+    parts = df["name"].str.split(",", n=1, expand=True)
+    df["last_name"] = parts[0].str.strip()
+    df["first_name"] = parts[1].str.strip() if parts.shape[1] > 1 else None
+
+    df = df.copy()
+    ln = df["last_name"].fillna("").str.lower().str.strip()
+    fn = df["first_name"].fillna("").str.lower().str.strip()
+    df["customer_key_name"] = (ln + "|" + fn).str.replace(r"\s+", " ", regex=True)
+    df["customer_key_confidence"] = "low"
+    return df
+
+
+def measure(fn, df: pd.DataFrame) -> tuple[float, float]:
+    # Cada corrida parte de una copia recién hecha (fuera de la medición).
+    # Tiempo y memoria se miden en corridas separadas porque tracemalloc
+    # agrega overhead a cada asignación.
+    data = df.copy()
+    t0 = time.perf_counter()
+    fn(data)
+    elapsed = time.perf_counter() - t0
+
+    data = df.copy()
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} | {'modo':<16} | {'segundos':>9} | {'peak MB':>9}")
+    for rows in args.rows:
+        df = build_frame(rows)
+
+        with tempfile.TemporaryDirectory() as state_dir:
+            # Memo "tibio": simula una corrida diaria con huéspedes ya vistos
+            memo = NameMemo(Path(state_dir))
+            transform_export(df.copy(), name_memo=memo)
+            memo.commit()
+
+            modes = [
+                ("encadenado", chained),
+                ("transform_export", transform_export),
+                ("con memo", lambda data: transform_export(data, name_memo=memo)),
+            ]
+            for label, fn in modes:
+                elapsed, peak = measure(fn, df)
+                print(f"{rows:>10} | {label:<16} | {elapsed:>9.3f} | {peak:>9.1f}")
+
+            memo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from src.extract import read_export
+from src import load
+from src.load import write_outputs
+from src.transform import transform_export
+
+SAMPLE = Path("data/input_mail/reservations_test.csv")
+
+
+def build_frame(rows: int) -> pd.DataFrame:
+    # Export de ejemplo ya transformado, replicado hasta tener `rows` filas
+    df = transform_export(read_export(SAMPLE))
+
+    reps = rows // len(df) + 1
+    df = pd.concat([df] * reps, ignore_index=True).head(rows)
+    df["confirmation_number"] = pd.array(range(len(df)), dtype="Int64")
+    return df
+
+
+def measure(fn) -> tuple[float, float]:
+    # Tiempo y memoria en corridas separadas: tracemalloc agrega overhead.
+    # El DataFrame de entrada ya existe antes de medir, así que el pico
+    # es solo lo que agrega la escritura.
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak / 1024 ** 2
+
+
+def write_with(xlsxwriter: bool, out: Path, df: pd.DataFrame, fmt: str = "excel"):
+    def run():
+        previous = load.HAS_XLSXWRITER
+        load.HAS_XLSXWRITER = xlsxwriter
+        try:
+            return write_outputs([df], out, formats=(fmt,))
+        finally:
+            load.HAS_XLSXWRITER = previous
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 40_000])
+    args = parser.parse_args()
+
+    print(f"xlsxwriter disponible: {load.HAS_XLSXWRITER}")
+    print(f"{'rows':>9} | {'modo':<32} | {'segundos':>8} | {'peak MB':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        for rows in args.rows:
+            df = build_frame(rows)
+
+            modes = [
+                ("df.to_excel", lambda: df.to_excel(out / "to_excel.xlsx", index=False)),
+                ("ExcelOutput openpyxl", write_with(False, out, df)),
+            ]
+            if load.HAS_XLSXWRITER:
+                modes += [
+                    ("ExcelOutput xlsxwriter", write_with(True, out, df)),
+                    ("ExcelOutput xlsxwriter propiedad", write_with(True, out, df, "excel_by_property")),
+                ]
+            for mode, fn in modes:
+                elapsed, peak = measure(fn)
+                print(f"{rows:>9} | {mode:<32} | {elapsed:>8.3f} | {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
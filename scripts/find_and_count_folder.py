@@ -1,27 +1,27 @@
 import win32com.client
 
-def walk(folder, path):
-    for sub in folder.Folders:
-        new_path = f"{path}/{sub.Name}"
-        yield new_path, sub
-        yield from walk(sub, new_path)
+from src.config import get_settings
+from src.download_from_outlook import OutlookFolderCache
 
 def main():
     outlook = win32com.client.Dispatch("Outlook.Application").GetNamespace("MAPI")
+    cache = OutlookFolderCache.load(get_settings().state_dir)
     needle = "opera test"
 
-    roots = list(outlook.Folders)
-    for root in roots:
-        root_path = root.Name
+    matches = {p: ids for p, ids in cache.all_folders(outlook).items() if needle in p.lower()}
+    if not matches:
+        # La caché puede estar desactualizada: se recorre de nuevo una vez
+        matches = {p: ids for p, ids in cache.all_folders(outlook, refresh=True).items() if needle in p.lower()}
+    cache.save()
 
-        for path, f in walk(root, root_path):
-            if needle in path.lower():
-                try:
-                    items = f.Items
-                    count = items.Count
-                except Exception:
-                    count = "?"
-                print(f"{path}  | items={count}")
+    for path, ids in matches.items():
+        # Solo se abren las carpetas que calzan (GetFolderFromID)
+        f = cache.open(outlook, ids)
+        try:
+            count = f.Items.Count if f is not None else "?"
+        except Exception:
+            count = "?"
+        print(f"{path}  | items={count}")
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,7 @@
 import win32com.client
 
-def walk_folders(folder, path):
-    for sub in folder.Folders:
-        new_path = f"{path}/{sub.Name}"
-        yield new_path, sub
-        yield from walk_folders(sub, new_path)
+from src.config import get_settings
+from src.download_from_outlook import OutlookFolderCache, iter_items
 
 def safe_str(x):
     try:
@@ -22,30 +19,45 @@ def main():
         print("Debes ingresar un texto.")
         return
 
+    # Carpetas del store desde la caché (se construye la primera vez)
+    cache = OutlookFolderCache.load(get_settings().state_dir)
+    folders = {p: ids for p, ids in cache.all_folders(outlook).items() if p.startswith(f"{store.Name}/")}
+    cache.save()
+
     # Busca en TODAS las carpetas del store
     found = 0
-    for path, folder in walk_folders(store, store.Name):
+    for path, ids in folders.items():
+        folder = cache.open(outlook, ids)
+        if folder is None:
+            # ID obsoleto: se descarta el índice para reconstruirlo en la próxima búsqueda
+            print(f"(carpeta no disponible: {path})")
+            cache.tree = {}
+            cache.dirty = True
+            continue
         try:
-            items = folder.Items
-            # Ojo: Items.Count puede ser caro en carpetas enormes; lo dejamos simple.
-            for msg in list(items):
+            # Filtro evaluado por Outlook: solo viajan los correos cuyo Subject calza
+            items = folder.Items.Restrict(
+                f"@SQL=\"urn:schemas:httpmail:subject\" LIKE '%{needle.replace(chr(39), chr(39) * 2)}%'"
+            )
+            for msg in iter_items(items):
                 if msg.Class != 43:  # MailItem
                     continue
                 subj = safe_str(getattr(msg, "Subject", ""))
-                if needle in subj.lower():
-                    found += 1
-                    print("\nFOUND:")
-                    print("Path :", path)
-                    print("Subj :", subj)
-                    print("Unread:", getattr(msg, "UnRead", None))
-                    print("Attachments:", msg.Attachments.Count)
-                    # muestra nombres de adjuntos si hay
-                    for i in range(1, msg.Attachments.Count + 1):
-                        att = msg.Attachments.Item(i)
-                        print(" -", att.FileName)
+                found += 1
+                print("\nFOUND:")
+                print("Path :", path)
+                print("Subj :", subj)
+                print("Unread:", getattr(msg, "UnRead", None))
+                print("Attachments:", msg.Attachments.Count)
+                # muestra nombres de adjuntos si hay
+                for i in range(1, msg.Attachments.Count + 1):
+                    att = msg.Attachments.Item(i)
+                    print(" -", att.FileName)
         except Exception:
             continue
 
+    cache.save()
+
     if found == 0:
         print("\nNo encontré ningún correo cuyo Subject contenga:", needle)
 
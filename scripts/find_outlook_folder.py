@@ -1,14 +1,16 @@
 import win32com.client
 
-def walk_folders(folder, prefix=""):
-    # Recorre subcarpetas de forma recursiva
-    for sub in folder.Folders:
-        path = f"{prefix}/{sub.Name}" if prefix else sub.Name
-        yield path, sub
-        yield from walk_folders(sub, path)
+from src.config import get_settings
+from src.download_from_outlook import OutlookFolderCache
+
+def search(cache, outlook, needle, refresh=False):
+    # Busca en el índice de carpetas cacheado (se construye la primera vez)
+    tree = cache.all_folders(outlook, refresh=refresh)
+    return [path for path in tree if needle in path.lower()]
 
 def main():
     outlook = win32com.client.Dispatch("Outlook.Application").GetNamespace("MAPI")
+    cache = OutlookFolderCache.load(get_settings().state_dir)
 
     needle = input("Escriba un texto a buscar (ej: opera): ").strip().lower()
     if not needle:
@@ -16,21 +18,20 @@ def main():
         return
 
     print("\n=== Stores (raíces) disponibles ===")
-    roots = list(outlook.Folders)
-    for r in roots:
+    for r in outlook.Folders:
         print("-", r.Name)
 
     print("\n=== Coincidencias ===")
-    found = 0
-    for root in roots:
-        root_name = root.Name
-        # Incluye también la raíz como punto de partida
-        for path, _sub in walk_folders(root, prefix=root_name):
-            if needle in path.lower():
-                print(path)
-                found += 1
-
-    if found == 0:
+    found = search(cache, outlook, needle)
+    if not found:
+        # La caché puede estar desactualizada: se recorre de nuevo una vez
+        found = search(cache, outlook, needle, refresh=True)
+    cache.save()
+
+    for path in found:
+        print(path)
+
+    if not found:
         print("No encontré carpetas que coincidan con ese texto.")
 
 if __name__ == "__main__":
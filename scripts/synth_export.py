@@ -0,0 +1,222 @@
+import argparse
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Encabezados tal como los exporta Opera (mismo orden que el export de ejemplo)
+OPERA_HEADER = [
+    "Property", "ConfirmationNumber", "Rate", "Balance", "Name", "Room", "RoomType", "Arrival",
+    "Nights", "Departure", "ReservationType", "RateCode", "RoomTypeToCharge", "Rooms", "Adults",
+    "Children", "Company", "Travel Agent", "Market Code", "Block Code", "Membership Number", "ETD",
+    "Last Room", "VIP Code", "Linked Name",
+]
+
+PROPERTIES = (["ALMASPDV", "ALMASPUQ", "ALMASPUQX"], [0.45, 0.30, 0.25])
+
+# Tipo de habitación -> tarifa base
+ROOM_TYPES = (["TWIN", "KING", "KINGJR", "DPTOSB", "DPTOCB"], [0.30, 0.35, 0.15, 0.10, 0.10])
+BASE_RATES = np.array([72.0, 80.0, 100.0, 115.0, 135.0])
+
+# Rate codes con y sin "SD" (sin desayuno), flexibles y no reembolsables -> factor sobre la base
+RATE_CODES = (
+    ["BARFLEX", "BARFLEXSD", "CANNRFSD", "LSNRFSD", "PROMONRFSD", "PROMONRF", "CORPFLEX"],
+    [0.18, 0.27, 0.20, 0.08, 0.15, 0.07, 0.05],
+)
+RATE_FACTORS = np.array([1.15, 1.0, 0.95, 0.82, 0.9, 1.02, 1.05])
+
+# "" = reserva directa (sin travel agent)
+TRAVEL_AGENTS = (["BOOKING", "EXPEDIA", "DESPEGAR", "ABNB", ""], [0.50, 0.20, 0.10, 0.08, 0.12])
+
+RESERVATION_TYPES = (
+    ["Guaranteed by Credit Card", "Non Guaranteed", "Cancelled"],
+    [0.75, 0.10, 0.15],
+)
+
+MARKET_CODES = (["WHOL", "DIR", "CORP"], [0.80, 0.15, 0.05])
+COMPANIES = ["Minera Austral", "Turismo Sur Ltda", "Andes Consulting"]
+VIP_CODES = ["VIP1", "VIP2"]
+
+LAST_NAMES = [
+    "Lee", "Liagouris", "Silvino", "Kery", "Macakanja", "Ouyang", "Possetti", "Potter", "Zhang",
+    "Brun", "Leichter", "Moore", "Oley", "Yan", "Culhane", "González", "Muñoz", "Rojas", "Díaz",
+    "Pérez", "Soto", "Contreras", "Silva", "Martínez", "Sepúlveda", "Morales", "Rodríguez",
+    "López", "Fuentes", "Hernández", "Torres", "Araya", "Flores", "Espinoza", "Valenzuela",
+    "Castillo", "Tapia", "Reyes", "Gutiérrez", "Castro", "Pizarro", "Álvarez", "Vásquez",
+    "Sánchez", "Fernández", "Ramírez", "Carrasco", "Gómez", "Cortés", "Herrera", "Smith",
+    "Johnson", "Williams", "Brown", "Jones", "Miller", "Davis", "Wilson", "Anderson", "Taylor",
+    "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Rossi",
+    "Russo", "Ferrari", "Esposito", "Bianchi", "Romano", "Colombo", "Ricci", "Marino", "Greco",
+    "Wang", "Li", "Liu", "Chen", "Yang", "Huang", "Zhao", "Wu", "Zhou", "Xu", "Sun", "Ma",
+]
+FIRST_NAMES = [
+    "Ichen", "George", "Marise Fernandes", "Renee", "Tanya", "Yucheng", "Debora", "Britt", "Kun",
+    "Andreas", "Jon", "Chris", "Margaret", "Zhen", "Julianne", "María José", "Juan Pablo",
+    "Francisca", "Matías", "Valentina", "Benjamín", "Catalina", "Sebastián", "Javiera", "Tomás",
+    "Camila", "Nicolás", "Fernanda", "Diego", "Constanza", "José", "Isidora", "Vicente", "Antonia",
+    "Felipe", "Sofía", "Ignacio", "Martina", "Cristóbal", "Emily", "James", "Olivia", "William",
+    "Emma", "Lukas", "Anna", "Leon", "Lena", "Marco", "Giulia", "Luca", "Chiara", "Wei", "Fang",
+]
+
+
+def _choice(rng: np.random.Generator, options: tuple[list, list], size: int) -> np.ndarray:
+    values, weights = options
+    return rng.choice(len(values), size=size, p=weights)
+
+
+def _take(values: list, codes: np.ndarray) -> np.ndarray:
+    return np.asarray(values, dtype=object)[codes]
+
+
+def _format_dates(days: np.ndarray, start: pd.Timestamp) -> np.ndarray:
+    # dd-mm-YYYY como Opera; se formatea cada fecha distinta una sola vez
+    uniques, codes = np.unique(days, return_inverse=True)
+    text = (start + pd.to_timedelta(uniques, unit="D")).strftime("%d-%m-%Y")
+    return np.asarray(text, dtype=object)[codes]
+
+
+def generate_export(
+        rows: int,
+        seed: int = 0,
+        start: str = "2026-01-01",
+        days: int = 365,
+        invalid_share: float = 0.001,
+) -> pd.DataFrame:
+    """
+    Genera un export de Opera sintético (como texto, igual que el CSV).
+
+    Reproducible con la misma semilla. Imita el export real: las tres
+    propiedades, rate codes con y sin "SD" y no reembolsables, OTAs y
+    reservas directas, fechas dd-mm-YYYY, cancelaciones, huéspedes que se
+    repiten (con variaciones de mayúsculas/espacios en el nombre),
+    reservas de grupo con "Linked Name", campos opcionales casi siempre
+    vacíos y unas pocas filas sin nombre (van a cuarentena).
+
+    Parameters
+    ----------
+    rows : int
+        Reservas a generar.
+    seed : int, optional
+        Semilla del generador.
+    start : str, optional
+        Primera fecha de llegada posible (YYYY-MM-DD).
+    days : int, optional
+        Días de la ventana de llegadas.
+    invalid_share : float, optional
+        Proporción de filas inválidas (sin nombre).
+
+    Returns
+    -------
+    pd.DataFrame
+        Columnas `OPERA_HEADER`, todos los valores como texto ("" = vacío).
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start)
+
+    prop = _choice(rng, PROPERTIES, rows)
+    room_type = _choice(rng, ROOM_TYPES, rows)
+    rate_code = _choice(rng, RATE_CODES, rows)
+    agent = _choice(rng, TRAVEL_AGENTS, rows)
+    res_type = _choice(rng, RESERVATION_TYPES, rows)
+
+    # Huéspedes: un pool menor que las reservas, con algunos muy frecuentes
+    guests = max(rows * 7 // 10, 1)
+    guest = np.minimum(rng.zipf(1.3, size=rows) - 1, guests - 1)
+    guest = np.where(rng.random(rows) < 0.5, rng.integers(0, guests, size=rows), guest)
+    last = _take(LAST_NAMES, guest % len(LAST_NAMES))
+    first = _take(FIRST_NAMES, (guest // len(LAST_NAMES)) % len(FIRST_NAMES))
+    names = last + ", " + first
+    # Nombres tipeados distinto en algunas reservas (los normaliza el pipeline)
+    variant = rng.random(rows)
+    names = np.where(variant < 0.03, np.char.upper(names.astype(str)).astype(object), names)
+    names = np.where((variant >= 0.03) & (variant < 0.05), last + ",  " + first + " ", names)
+
+    names[rng.random(rows) < invalid_share] = ""
+
+    arrival = rng.integers(0, days, size=rows)
+    nights = np.minimum(rng.geometric(0.35, size=rows), 21)
+    adults = rng.choice([1, 2, 3], size=rows, p=[0.3, 0.6, 0.1])
+    children = rng.choice([0, 1, 2], size=rows, p=[0.85, 0.1, 0.05])
+
+    rate = BASE_RATES[room_type] * RATE_FACTORS[rate_code] * rng.normal(1.0, 0.08, size=rows)
+    balance = np.where(rng.random(rows) < 0.1, rate * rng.integers(1, 4, size=rows), 0.0)
+
+    room = np.where(
+        rng.random(rows) < 0.85,
+        "Assign Room",
+        (rng.integers(1, 5, size=rows) * 100 + rng.integers(1, 40, size=rows)).astype(str),
+    ).astype(object)
+
+    # Grupos: ~5% de las reservas apunta al nombre de otra reserva
+    linked = np.full(rows, "", dtype=object)
+    in_group = rng.random(rows) < 0.05
+    linked[in_group] = names[rng.integers(0, rows, size=int(in_group.sum()))]
+
+    def sparse(values: list, share: float) -> np.ndarray:
+        out = np.full(rows, "", dtype=object)
+        mask = rng.random(rows) < share
+        out[mask] = _take(values, rng.integers(0, len(values), size=int(mask.sum())))
+        return out
+
+    membership = np.full(rows, "", dtype=object)
+    members = rng.random(rows) < 0.08
+    membership[members] = (guest[members] + 900_000).astype(str)
+
+    confirmation = rng.choice(10_000_000, size=rows, replace=False) + 330_000_000
+
+    return pd.DataFrame({
+        "Property": _take(PROPERTIES[0], prop),
+        "ConfirmationNumber": confirmation.astype(str),
+        "Rate": np.char.mod("%.2f", rate),
+        "Balance": np.where(balance > 0, np.char.mod("%.2f", balance), "0"),
+        "Name": names,
+        "Room": room,
+        "RoomType": _take(ROOM_TYPES[0], room_type),
+        "Arrival": _format_dates(arrival, start),
+        "Nights": nights.astype(str),
+        "Departure": _format_dates(arrival + nights, start),
+        "ReservationType": _take(RESERVATION_TYPES[0], res_type),
+        "RateCode": _take(RATE_CODES[0], rate_code),
+        "RoomTypeToCharge": _take(ROOM_TYPES[0], room_type),
+        "Rooms": "1",
+        "Adults": adults.astype(str),
+        "Children": children.astype(str),
+        "Company": sparse(COMPANIES, 0.03),
+        "Travel Agent": _take(TRAVEL_AGENTS[0], agent),
+        "Market Code": _take(MARKET_CODES[0], _choice(rng, MARKET_CODES, rows)),
+        "Block Code": sparse(["GRP2026A", "GRP2026B"], 0.02),
+        "Membership Number": membership,
+        "ETD": "",
+        "Last Room": "",
+        "VIP Code": sparse(VIP_CODES, 0.01),
+        "Linked Name": linked,
+    }, columns=OPERA_HEADER)
+
+
+def write_export(df: pd.DataFrame, dest: Path, block_rows: int = 100_000) -> Path:
+    """
+    Escribe el export como CSV igual que Opera: sin la coma final cuando
+    el último campo ("Linked Name") viene vacío.
+    """
+    with open(dest, "w", encoding="utf-8", newline="\n") as fh:
+        fh.write(",".join(OPERA_HEADER) + "\n")
+        for start in range(0, len(df), block_rows):
+            text = df.iloc[start:start + block_rows].to_csv(header=False, index=False, lineterminator="\n")
+            fh.write(re.sub(r",$", "", text, flags=re.MULTILINE))
+    return dest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un export de Opera sintético")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=Path("opera_export_synthetic.csv"))
+    args = parser.parse_args()
+
+    path = write_export(generate_export(args.rows, seed=args.seed), args.out)
+    print(f"{args.rows} reservas -> {path}")
+
+
+if __name__ == "__main__":
+    main()
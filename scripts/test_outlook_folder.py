@@ -1,12 +1,14 @@
 from src.config import get_settings
-from src.download_from_outlook import get_outlook_folder
+from src.download_from_outlook import get_outlook_folder, OutlookFolderCache
 import win32com.client
 
 def main():
     s = get_settings()
     outlook = win32com.client.Dispatch("Outlook.Application").GetNamespace("MAPI")
-    folder = get_outlook_folder(outlook, s.outlook_folder_path)
+    cache = OutlookFolderCache.load(s.state_dir)
+    folder = get_outlook_folder(outlook, s.outlook_folder_path, cache=cache)
+    cache.save()
     print("OK folder:", folder.Name)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,500 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.transform import OPERA_DATE_FORMAT, header_mapping
+
+# Nombre del archivo SQLite dentro de state_dir
+AGGREGATES_DB_NAME = "daily_aggregates.sqlite"
+
+# Archivo (dentro de output_dir) con la tabla diaria para gerencia
+DAILY_OUTPUT_NAME = "daily_aggregates.xlsx"
+
+# Dimensiones de la tabla diaria (además de la fecha de estadía)
+AGGREGATE_DIMENSIONS = ["property", "room_type", "travel_agent"]
+
+# Tope de noches por reserva: protege la expansión de fechas mal cargadas
+MAX_STAY_NIGHTS = 365
+
+# Columnas de cada noche de estadía (una fila por reserva y noche)
+_NIGHT_COLUMNS = ["confirmation_number", "stay_date", *AGGREGATE_DIMENSIONS, "rooms", "revenue"]
+
+# Columnas (ya transformadas) que usa la expansión por noche (ver AggregateBatch)
+AGGREGATE_INPUT_COLUMNS = ["confirmation_number", "arrival", "departure", "nights", "rooms", "rate", *AGGREGATE_DIMENSIONS]
+
+
+@dataclass
+class AggregateStats:
+    """
+    Conteo de lo que cambió en las tablas diarias.
+
+    Attributes
+    ----------
+    changed : int
+        Reservas nuevas o modificadas (sus noches se reemplazaron).
+    unchanged : int
+        Reservas cuyas noches ya estaban iguales en la tabla.
+    removed : int
+        Reservas que ya no vienen en el export (canceladas): se borran.
+    dates : int
+        Fechas de estadía recalculadas en el último commit.
+    """
+
+    changed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    dates: int = 0
+
+
+def _as_dates(values: pd.Series) -> pd.Series:
+    # read_export ya entrega fechas; texto dd-mm-YYYY se convierte por si acaso
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, format=OPERA_DATE_FORMAT, errors="coerce")
+
+
+def stay_lengths(df: pd.DataFrame) -> tuple[pd.Series, np.ndarray]:
+    """
+    Fecha de llegada y número de noches de cada reserva.
+
+    Las noches se calculan como departure - arrival; si falta la salida se
+    usa la columna 'nights'. Sin llegada (o con noches negativas) quedan
+    en 0, y se topan en MAX_STAY_NIGHTS.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame con columnas normalizadas ('arrival', 'departure' y
+        opcionalmente 'nights').
+
+    Returns
+    -------
+    tuple[pd.Series, np.ndarray]
+        (llegadas como datetime, noches como int64).
+    """
+    arrival = _as_dates(df["arrival"])
+    departure = _as_dates(df["departure"])
+
+    nights = (departure - arrival).dt.days
+    if "nights" in df.columns:
+        nights = nights.fillna(pd.to_numeric(df["nights"], errors="coerce"))
+    nights = nights.fillna(0).clip(0, MAX_STAY_NIGHTS).to_numpy(dtype=np.int64)
+    nights[arrival.isna().to_numpy()] = 0
+
+    return arrival, nights
+
+
+def room_counts(df: pd.DataFrame) -> np.ndarray:
+    """
+    Habitaciones de cada reserva (columna 'rooms'; 1 si no viene o está vacía).
+    """
+    if "rooms" not in df.columns:
+        return np.ones(len(df), dtype=np.int64)
+    return pd.to_numeric(df["rooms"], errors="coerce").fillna(1).to_numpy(dtype=np.int64)
+
+
+def _take_text(values: pd.Series, rows: np.ndarray) -> pd.Categorical:
+    # Columna como texto ("" si falta), repetida según `rows` vía códigos de categoría
+    codes, uniques = pd.factorize(values.astype("string").fillna(""))
+    return pd.Categorical.from_codes(codes[rows], uniques.astype(object))
+
+
+def expand_stay_nights(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Expande cada reserva en una fila por noche de estadía (vectorizado).
+
+    Las noches van desde 'arrival' (incluida) hasta 'departure' (excluida).
+    Si falta la salida se usa la columna 'nights'. Reservas sin llegada o
+    sin noches (ej: day use) no generan filas.
+
+    Por noche: 'rooms' habitaciones (1 si no viene) y 'revenue' = rate * rooms.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame transformado (columnas normalizadas).
+
+    Returns
+    -------
+    pd.DataFrame
+        Columnas: confirmation_number, stay_date, property, room_type,
+        travel_agent, rooms, revenue.
+    """
+    arrival, nights = stay_lengths(df)
+
+    rooms = room_counts(df)
+    rate = pd.to_numeric(df["rate"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+
+    # Fila de origen de cada noche y su desplazamiento desde la llegada:
+    # nights = [2, 3] -> rows = [0, 0, 1, 1, 1], offsets = [0, 1, 0, 1, 2]
+    rows = np.repeat(np.arange(len(df)), nights)
+    starts = np.repeat(np.cumsum(nights) - nights, nights)
+    offsets = np.arange(len(rows)) - starts
+
+    stay_date = arrival.to_numpy(dtype="datetime64[D]")[rows] + offsets.astype("timedelta64[D]")
+
+    # Texto solo para los valores distintos (hay pocas fechas y códigos
+    # distintos frente a millones de noches) y se expande con los códigos
+    date_codes, dates = pd.factorize(stay_date)
+    out = {
+        "confirmation_number": _take_text(df["confirmation_number"], rows),
+        "stay_date": pd.Categorical.from_codes(date_codes, np.datetime_as_string(dates, unit="D")),
+    }
+    for dim in AGGREGATE_DIMENSIONS:
+        values = df[dim] if dim in df.columns else pd.Series("", index=df.index)
+        out[dim] = _take_text(values, rows)
+    out["rooms"] = rooms[rows]
+    out["revenue"] = (rate * rooms)[rows].round(2)
+
+    return pd.DataFrame(out, columns=_NIGHT_COLUMNS)
+
+
+@dataclass
+class AggregateBatch:
+    """
+    Cambios de un export para las tablas diarias, pendientes de aplicar.
+
+    Se arma mientras se procesa el archivo (también dentro de un worker:
+    es picklable y no toca la base) y se aplica con `DailyAggregates.apply`
+    en el proceso principal, de a un export y en orden de export.
+
+    Uso:
+    - `observe(df)` con cada DataFrame/bloque crudo (antes del filtro
+      incremental): registra todas las reservas que trae el export
+    - `add(df)` con cada DataFrame/bloque ya transformado
+
+    Attributes
+    ----------
+    frames : list[pd.DataFrame]
+        Reservas transformadas (solo AGGREGATE_INPUT_COLUMNS).
+    keys : list[np.ndarray]
+        confirmation_number (texto) de todas las reservas del export.
+    properties : set[str]
+        Propiedades que trae el export.
+    window_start, window_end : pd.Timestamp | None
+        Primera y última llegada del export. Las reservas guardadas que
+        faltan en el export se borran solo si son de una de sus
+        propiedades y llegan dentro de ese rango: las demás simplemente
+        no las cubre este export (salieron del reporte, son de otra
+        propiedad o están más allá de su horizonte).
+    """
+
+    frames: list[pd.DataFrame] = field(default_factory=list)
+    keys: list[np.ndarray] = field(default_factory=list)
+    properties: set[str] = field(default_factory=set)
+    window_start: pd.Timestamp | None = None
+    window_end: pd.Timestamp | None = None
+
+    def observe(self, df: pd.DataFrame) -> None:
+        # Columnas por su nombre normalizado (el DataFrame todavía viene crudo)
+        columns = {c: raw for raw, c in header_mapping(tuple(df.columns)).items()}
+        if "confirmation_number" not in columns or "arrival" not in columns or "property" not in columns:
+            return
+
+        keys = pd.to_numeric(df[columns["confirmation_number"]], errors="coerce").dropna()
+        self.keys.append(keys.astype(np.int64).astype(str).to_numpy())
+
+        # Mismo texto con que se guardan en stay_nights (ver _take_text)
+        self.properties.update(df[columns["property"]].astype("string").fillna("").unique().tolist())
+
+        arrival = _as_dates(df[columns["arrival"]])
+        first, last = arrival.min(), arrival.max()
+        if pd.notna(first) and (self.window_start is None or first < self.window_start):
+            self.window_start = first
+        if pd.notna(last) and (self.window_end is None or last > self.window_end):
+            self.window_end = last
+
+    def add(self, df: pd.DataFrame) -> None:
+        self.frames.append(df[[c for c in AGGREGATE_INPUT_COLUMNS if c in df.columns]])
+
+
+class DailyAggregates:
+    """
+    Tablas diarias (SQLite) de room nights, revenue y ADR por fecha de estadía.
+
+    Guarda dos tablas:
+    - `stay_nights`: una fila por reserva y noche (la contribución actual
+      de cada confirmation_number).
+    - `daily`: room nights, revenue y reservas por fecha de estadía,
+      propiedad, tipo de habitación y agencia.
+
+    Cada export es una foto completa del libro de reservas, así que se
+    aplican en orden de export (`apply`, ver `AggregateBatch`): un export
+    anterior al último aplicado se omite, y las reservas que desaparecen
+    de un export (canceladas) se borran, solo dentro de las propiedades y
+    fechas de llegada que cubre ese export (ver `AggregateBatch`).
+
+    `update(df)` reemplaza las noches solo de las reservas nuevas o
+    modificadas y marca sus fechas (antiguas y nuevas) como pendientes;
+    `commit()` recalcula la tabla diaria solo para esas fechas. Las fechas
+    pendientes se guardan en la base junto con las noches, así un archivo
+    que falla a mitad de camino se termina de recalcular en la próxima
+    corrida. El Excel de la tabla diaria se reescribe solo si cambió
+    alguna fecha (`needs_export`).
+    """
+
+    def __init__(self, state_dir: Path):
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self.path = state_dir / AGGREGATES_DB_NAME
+
+        # timeout: con --workers varios procesos pueden escribir a la vez
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS stay_nights (
+                confirmation_number TEXT NOT NULL,
+                stay_date TEXT NOT NULL,
+                property TEXT NOT NULL,
+                room_type TEXT NOT NULL,
+                travel_agent TEXT NOT NULL,
+                rooms INTEGER NOT NULL,
+                revenue REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS stay_nights_confirmation ON stay_nights (confirmation_number);
+            CREATE INDEX IF NOT EXISTS stay_nights_date ON stay_nights (stay_date);
+
+            CREATE TABLE IF NOT EXISTS daily (
+                stay_date TEXT NOT NULL,
+                property TEXT NOT NULL,
+                room_type TEXT NOT NULL,
+                travel_agent TEXT NOT NULL,
+                room_nights INTEGER NOT NULL,
+                revenue REAL NOT NULL,
+                reservations INTEGER NOT NULL,
+                PRIMARY KEY (stay_date, property, room_type, travel_agent)
+            );
+
+            CREATE TABLE IF NOT EXISTS dirty_dates (stay_date TEXT PRIMARY KEY);
+
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            """
+        )
+        self._conn.commit()
+
+        self.stats = AggregateStats()
+
+    def _meta(self, key: str) -> int | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: int) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def _stored_nights(self, confirmations: list[str]) -> pd.DataFrame:
+        """
+        Lee las noches guardadas de las reservas indicadas (tabla temporal + JOIN).
+        """
+        cur = self._conn.cursor()
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (confirmation_number TEXT PRIMARY KEY)")
+        cur.execute("DELETE FROM incoming")
+        cur.executemany("INSERT OR IGNORE INTO incoming VALUES (?)", ((c,) for c in confirmations))
+        rows = cur.execute(
+            f"""
+            SELECT {', '.join('s.' + c for c in _NIGHT_COLUMNS)}
+            FROM incoming i
+            JOIN stay_nights s USING (confirmation_number)
+            """
+        ).fetchall()
+        self._conn.commit()
+        return pd.DataFrame(rows, columns=_NIGHT_COLUMNS)
+
+    def update(self, df: pd.DataFrame) -> None:
+        """
+        Actualiza las noches de las reservas del DataFrame que cambiaron.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame o bloque ya transformado.
+        """
+        df = df[df["confirmation_number"].notna()]
+        if df.empty:
+            return
+
+        # Si una confirmación viene repetida en el archivo, vale la última versión
+        df = df.drop_duplicates(subset="confirmation_number", keep="last")
+
+        new = expand_stay_nights(df)
+        confirmations = df["confirmation_number"].astype("string").unique().tolist()
+        old = self._stored_nights(confirmations)
+
+        # Una reserva cambió si alguna de sus noches no está igual en ambos lados
+        merged = new.astype({"rooms": "int64"}).merge(
+            old.astype({"rooms": "int64", "revenue": "float64"}),
+            how="outer",
+            on=_NIGHT_COLUMNS,
+            indicator=True,
+        )
+        changed = set(merged.loc[merged["_merge"] != "both", "confirmation_number"])
+        self.stats.changed += len(changed)
+        self.stats.unchanged += len(confirmations) - len(changed)
+
+        if not changed:
+            return
+
+        new = new[new["confirmation_number"].isin(changed)]
+        touched = set(new["stay_date"]) | set(old.loc[old["confirmation_number"].isin(changed), "stay_date"])
+
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM stay_nights WHERE confirmation_number = ?",
+                ((c,) for c in changed),
+            )
+            self._conn.executemany(
+                f"INSERT INTO stay_nights ({', '.join(_NIGHT_COLUMNS)}) VALUES ({', '.join('?' * len(_NIGHT_COLUMNS))})",
+                new.itertuples(index=False, name=None),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO dirty_dates VALUES (?)",
+                ((d,) for d in touched),
+            )
+
+    def _remove_missing(self, batch: AggregateBatch) -> None:
+        """
+        Borra las reservas guardadas que el export cubre pero no trae
+        (de sus propiedades, con llegada entre su primera y su última
+        llegada) y marca sus fechas.
+        """
+        cur = self._conn.cursor()
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS present (confirmation_number TEXT PRIMARY KEY)")
+        cur.execute("DELETE FROM present")
+        cur.executemany("INSERT OR IGNORE INTO present VALUES (?)", ((k,) for k in np.concatenate(batch.keys).tolist()))
+
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS covered_properties (property TEXT PRIMARY KEY)")
+        cur.execute("DELETE FROM covered_properties")
+        cur.executemany("INSERT INTO covered_properties VALUES (?)", ((p,) for p in sorted(batch.properties)))
+
+        # La primera noche de cada reserva es su llegada
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS missing (confirmation_number TEXT PRIMARY KEY)")
+        cur.execute("DELETE FROM missing")
+        cur.execute(
+            """
+            INSERT INTO missing
+            SELECT confirmation_number FROM stay_nights
+            WHERE confirmation_number NOT IN (SELECT confirmation_number FROM present)
+              AND property IN (SELECT property FROM covered_properties)
+            GROUP BY confirmation_number
+            HAVING MIN(stay_date) BETWEEN ? AND ?
+            """,
+            (batch.window_start.strftime("%Y-%m-%d"), batch.window_end.strftime("%Y-%m-%d")),
+        )
+        self.stats.removed += cur.execute("SELECT COUNT(*) FROM missing").fetchone()[0]
+
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT OR IGNORE INTO dirty_dates
+                SELECT DISTINCT stay_date FROM stay_nights
+                WHERE confirmation_number IN (SELECT confirmation_number FROM missing)
+                """
+            )
+            self._conn.execute(
+                "DELETE FROM stay_nights WHERE confirmation_number IN (SELECT confirmation_number FROM missing)"
+            )
+
+    def apply(self, batch: AggregateBatch, export_time: int) -> bool:
+        """
+        Aplica los cambios de un export, si no es anterior al último aplicado.
+
+        Parameters
+        ----------
+        batch : AggregateBatch
+            Reservas del export (ver `AggregateBatch`).
+        export_time : int
+            Fecha del export en nanosegundos (ver `src.files.export_time`).
+
+        Returns
+        -------
+        bool
+            False si el export es anterior al último aplicado (no se toca nada).
+        """
+        last = self._meta("last_export_time")
+        if last is not None and export_time < last:
+            return False
+
+        if batch.frames:
+            self.update(pd.concat(batch.frames, ignore_index=True))
+
+        if batch.keys and batch.window_start is not None:
+            self._remove_missing(batch)
+
+        with self._conn:
+            self._set_meta("last_export_time", export_time)
+        return True
+
+    @property
+    def needs_export(self) -> bool:
+        """
+        Si la tabla diaria cambió desde el último `export`.
+        """
+        return bool(self._meta("export_pending"))
+
+    def commit(self) -> None:
+        """
+        Recalcula la tabla diaria solo para las fechas pendientes.
+        """
+        dims = ", ".join(AGGREGATE_DIMENSIONS)
+        with self._conn:
+            self.stats.dates = self._conn.execute("SELECT COUNT(*) FROM dirty_dates").fetchone()[0]
+            if not self.stats.dates:
+                return
+
+            self._conn.execute("DELETE FROM daily WHERE stay_date IN (SELECT stay_date FROM dirty_dates)")
+            self._conn.execute(
+                f"""
+                INSERT INTO daily (stay_date, {dims}, room_nights, revenue, reservations)
+                SELECT s.stay_date, {', '.join('s.' + d for d in AGGREGATE_DIMENSIONS)},
+                       SUM(s.rooms), ROUND(SUM(s.revenue), 2), COUNT(DISTINCT s.confirmation_number)
+                FROM stay_nights s
+                WHERE s.stay_date IN (SELECT stay_date FROM dirty_dates)
+                GROUP BY s.stay_date, {', '.join('s.' + d for d in AGGREGATE_DIMENSIONS)}
+                """
+            )
+            self._conn.execute("DELETE FROM dirty_dates")
+            self._set_meta("export_pending", 1)
+
+    def daily_table(self) -> pd.DataFrame:
+        """
+        Tabla diaria completa, con ADR (revenue / room nights).
+        """
+        df = pd.read_sql_query(
+            f"SELECT * FROM daily ORDER BY stay_date, {', '.join(AGGREGATE_DIMENSIONS)}",
+            self._conn,
+        )
+        df["stay_date"] = pd.to_datetime(df["stay_date"])
+        df["adr"] = (df["revenue"] / df["room_nights"].where(df["room_nights"] > 0)).round(2)
+        return df
+
+    def export(self, output_dir: Path) -> Path:
+        """
+        Escribe la tabla diaria en output_dir (siempre el mismo archivo).
+
+        Parameters
+        ----------
+        output_dir : Path
+            Directorio de salida.
+
+        Returns
+        -------
+        Path
+            Ruta del Excel generado.
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / DAILY_OUTPUT_NAME
+        tmp_path = output_dir / f".{path.stem}.{os.getpid()}.tmp.xlsx"
+
+        # Escritura atómica: quien tenga el archivo abierto sigue viendo la versión anterior
+        self.daily_table().to_excel(tmp_path, index=False, sheet_name="daily")
+        os.replace(tmp_path, path)
+
+        with self._conn:
+            self._set_meta("export_pending", 0)
+        return path
+
+    def close(self) -> None:
+        self._conn.close()
@@ -53,6 +53,49 @@ def _parse_outlook_path(value: str) -> list[str]:
     return [p.strip() for p in value.split("/") if p.strip()]
 
 
+def _parse_optional_int(value: str | None) -> int | None:
+    """
+    Convierte una variable de entorno en un entero positivo opcional.
+
+    Valores vacíos, None o <= 0 se interpretan como "no definido".
+
+    Parameters
+    ----------
+    value : str | None
+        Valor crudo leído desde una variable de entorno.
+
+    Returns
+    -------
+    int | None
+        Entero positivo, o None si no aplica.
+    """
+    if value is None or not value.strip():
+        return None
+    parsed = int(value)
+    return parsed if parsed > 0 else None
+
+
+def _parse_name_list(value: str) -> tuple[str, ...]:
+    """
+    Convierte una lista separada por coma en una tupla de nombres.
+
+    Ejemplo:
+    "Excel, parquet" -> ("excel", "parquet")
+
+    Parameters
+    ----------
+    value : str
+        String crudo desde la variable de entorno.
+
+    Returns
+    -------
+    tuple[str, ...]
+        Nombres en minúsculas, sin repetidos y en el orden original.
+    """
+    parts = [p.strip().lower() for p in value.split(",") if p.strip()]
+    return tuple(dict.fromkeys(parts))
+
+
 def _parse_ext_list(value: str) -> set[str]:
     """
     Convierte una lista de extensiones separadas por coma en un set.
@@ -100,7 +143,8 @@ class Settings:
     log_dir : Path
         Directorio donde se guardan los logs de ejecución.
     opera_pattern : str
-        Patrón de nombre para identificar archivos de Opera.
+        Patrón de nombre para identificar archivos de Opera. Acepta varios
+        separados por coma (por defecto CSV y Excel).
     enable_outlook_download : bool
         Indica si la descarga de adjuntos desde Outlook está habilitada.
     outlook_folder_path : list[str]
@@ -117,6 +161,39 @@ class Settings:
         desde Outlook.
     mail_archive_dir: Path
         Directorio donde se archivan los adjuntos históricos
+    read_chunksize : int | None
+        Filas por bloque al leer exportaciones. Si es None, cada archivo
+        se lee completo en memoria.
+    output_formats : tuple[str, ...]
+        Formatos de salida a generar: "excel", "excel_by_property" (una
+        hoja por propiedad), "csv" y/o "parquet".
+        Parquet alimenta el histórico acumulado en output_dir/reservations.
+    state_dir : Path
+        Directorio de estado persistente entre corridas (índices locales).
+    incremental_ingest : bool
+        Si está habilitado, solo se transforman y escriben las reservas
+        nuevas o modificadas según el índice por confirmation_number.
+    enable_guest_index : bool
+        Si está habilitado, cada reserva recibe un guest_id estable desde
+        el índice local de huéspedes (detección de clientes recurrentes).
+        Desactivado por defecto (ENABLE_GUEST_INDEX=1 para activarlo).
+    enable_daily_aggregates : bool
+        Si está habilitado, se mantienen las tablas diarias de room nights,
+        revenue y ADR (output_dir/daily_aggregates.xlsx).
+        Desactivado por defecto (ENABLE_DAILY_AGGREGATES=1).
+    enable_pace_report : bool
+        Si está habilitado, cada export se compara con el anterior
+        (pickup / pace) y se genera output_dir/pace_<archivo>.xlsx.
+        Desactivado por defecto (ENABLE_PACE_REPORT=1).
+    rate_rules_file : Path | None
+        JSON con la tabla de reglas de tarifa (rate code / travel agent ->
+        desayuno, canal, reembolsable). None = reglas por defecto
+        (ver src.rate_rules.DEFAULT_RATE_RULES).
+    known_properties : tuple[str, ...]
+        Códigos de propiedad válidos. Filas con otra propiedad van a
+        cuarentena; vacío = no se valida la propiedad.
+    watch_interval : float
+        Segundos entre pasadas en el modo `--watch`.
     """
 
     input_dir: Path
@@ -133,6 +210,28 @@ class Settings:
     mail_archive_dir: Path
     mail_allowed_ext: set[str] 
 
+    # lectura por bloques (archivos muy grandes)
+    read_chunksize: int | None = None
+
+    # formatos de salida (ver src.load.OUTPUT_BACKENDS)
+    output_formats: tuple[str, ...] = ("excel",)
+
+    # estado persistente / ingesta incremental
+    state_dir: Path = Path("state")
+    incremental_ingest: bool = False
+    enable_guest_index: bool = False
+    enable_daily_aggregates: bool = False
+    enable_pace_report: bool = False
+
+    # reglas de tarifa (ver src.rate_rules)
+    rate_rules_file: Path | None = None
+
+    # validación por fila (ver src.validation)
+    known_properties: tuple[str, ...] = ("ALMASPDV", "ALMASPUQ", "ALMASPUQX")
+
+    # modo watch (ver src.watch)
+    watch_interval: float = 60.0
+
 def get_settings() -> Settings:
     """
     Carga la configuración del proyecto desde variables de entorno.
@@ -163,15 +262,23 @@ def get_settings() -> Settings:
     mail_input_dir = Path(os.environ.get("MAIL_INPUT_DIR", os.environ["INPUT_DIR"]))
     mail_archive_dir = Path(os.environ.get("MAIL_ARCHIVE_DIR", os.environ["ARCHIVE_DIR"]))
 
+    output_dir = Path(os.environ["OUTPUT_DIR"])
+    state_dir = Path(os.environ.get("STATE_DIR", output_dir / "state"))
+
+    rate_rules_raw = os.environ.get("RATE_RULES_FILE", "").strip()
+    rate_rules_file = Path(rate_rules_raw) if rate_rules_raw else None
+
     ext_raw = os.environ.get("MAIL_ALLOWED_EXT", ".csv,.xlsx,.xls")
     mail_allowed_ext = _parse_ext_list(ext_raw)
 
     return Settings(
         input_dir=Path(os.environ["INPUT_DIR"]),
         archive_dir=Path(os.environ["ARCHIVE_DIR"]),
-        output_dir=Path(os.environ["OUTPUT_DIR"]),
+        output_dir=output_dir,
         log_dir=Path(os.environ["LOG_DIR"]),
-        opera_pattern=os.environ.get("OPERA_PATTERN", "opera_export_*.csv"),     # Considerar cambiar patrón de ser necesario.
+        opera_pattern=os.environ.get(
+            "OPERA_PATTERN", "opera_export_*.csv,opera_export_*.xlsx,opera_export_*.xls"
+        ),     # Considerar cambiar patrón de ser necesario.
 
         enable_outlook_download=enable_outlook,
         outlook_folder_path=outlook_folder_path,
@@ -179,4 +286,20 @@ def get_settings() -> Settings:
         mail_input_dir=mail_input_dir,
         mail_archive_dir=mail_archive_dir,
         mail_allowed_ext=mail_allowed_ext,    
+
+        read_chunksize=_parse_optional_int(os.environ.get("READ_CHUNKSIZE")),
+        output_formats=_parse_name_list(os.environ.get("OUTPUT_FORMATS", "excel")),
+
+        state_dir=state_dir,
+        incremental_ingest=_parse_bool(os.environ.get("INCREMENTAL_INGEST", "0")),
+        enable_guest_index=_parse_bool(os.environ.get("ENABLE_GUEST_INDEX", "0")),
+        enable_daily_aggregates=_parse_bool(os.environ.get("ENABLE_DAILY_AGGREGATES", "0")),
+        enable_pace_report=_parse_bool(os.environ.get("ENABLE_PACE_REPORT", "0")),
+
+        rate_rules_file=rate_rules_file,
+        known_properties=tuple(
+            p.upper() for p in _parse_name_list(os.environ.get("KNOWN_PROPERTIES", "ALMASPDV,ALMASPUQ,ALMASPUQX"))
+        ),
+
+        watch_interval=float(os.environ.get("WATCH_INTERVAL_SECONDS", "60")),
     )
\ No newline at end of file
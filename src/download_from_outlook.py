@@ -1,11 +1,178 @@
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+import hashlib
+import json
 import logging
-import win32com.client
+import os
+import queue
+import threading
+import time
 
 # Extensiones permitidas para descargar
 
 DEFAULT_ALLOWED_EXT = {".csv", ".xlsx", ".xls"}
 
+# Índice de hashes de adjuntos ya descargados (vive dentro de la carpeta de descarga)
+DIGEST_INDEX_NAME = ".attachment_digests.json"
+
+# Formato de fecha para filtros DASL de Items.Restrict (Outlook espera MM/dd/yyyy, en UTC)
+RESTRICT_DATE_FORMAT = "%m/%d/%Y %I:%M %p"
+
+
+# Marca de agua de la descarga (vive en state_dir)
+WATERMARK_FILE_NAME = "outlook_watermark.json"
+
+# Margen hacia atrás al filtrar por fecha: cubre la resolución en minutos del
+# filtro y correos que Outlook registra con algo de atraso. Los correos dentro
+# del margen que ya se procesaron se reconocen por EntryID.
+WATERMARK_OVERLAP = timedelta(hours=1)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """
+    Normaliza una fecha a UTC (fechas sin zona se asumen en hora local).
+    """
+    return value.astimezone(timezone.utc)
+
+
+@dataclass
+class OutlookWatermark:
+    """
+    Estado persistente de la descarga desde Outlook.
+
+    Guarda la fecha de recepción del último correo revisado y los EntryID
+    ya revisados dentro de la ventana de solape. Así cada corrida solo
+    pide a Outlook correos nuevos, sin depender de que sigan sin leer ni
+    de que se hayan movido a la carpeta de procesados.
+
+    Attributes
+    ----------
+    path : Path
+        Archivo JSON donde se persiste el estado.
+    last_received : datetime | None
+        ReceivedTime (UTC) más reciente revisado. None en la primera corrida.
+    entries : dict[str, str]
+        EntryID -> ReceivedTime (ISO, UTC) de los correos ya revisados.
+    """
+
+    path: Path
+    last_received: datetime | None = None
+    entries: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, state_dir: Path) -> "OutlookWatermark":
+        path = state_dir / WATERMARK_FILE_NAME
+        if not path.exists():
+            return cls(path=path)
+
+        data = json.loads(path.read_text(encoding="utf-8"))
+        last = data.get("last_received")
+        return cls(
+            path=path,
+            last_received=datetime.fromisoformat(last) if last else None,
+            entries=data.get("entries", {}),
+        )
+
+    @property
+    def since(self) -> datetime | None:
+        """
+        Fecha desde la que hay que pedir correos (con margen de solape).
+        """
+        if self.last_received is None:
+            return None
+        return self.last_received - WATERMARK_OVERLAP
+
+    def seen(self, entry_id: str) -> bool:
+        return entry_id in self.entries
+
+    def mark(self, entry_id: str, received: datetime) -> None:
+        received = _as_utc(received)
+        self.entries[entry_id] = received.isoformat()
+        if self.last_received is None or received > self.last_received:
+            self.last_received = received
+
+    def save(self) -> None:
+        """
+        Persiste el estado, descartando EntryIDs anteriores a la ventana de solape.
+        """
+        since = self.since
+        if since is not None:
+            self.entries = {
+                k: v for k, v in self.entries.items()
+                if datetime.fromisoformat(v) >= since
+            }
+
+        data = {
+            "last_received": self.last_received.isoformat() if self.last_received else None,
+            "entries": self.entries,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def build_restrict_filter(
+        since: datetime | None = None,
+        unread_only: bool = True,
+        with_attachments: bool = True,
+) -> str | None:
+    """
+    Construye un filtro DASL para `Items.Restrict`.
+
+    El filtro lo evalúa Outlook (lado servidor/almacén), así solo viajan
+    por COM los correos que interesan en vez de toda la carpeta.
+
+    Parameters
+    ----------
+    since : datetime | None
+        Si se entrega, solo correos recibidos desde esa fecha. Fechas sin
+        zona horaria se interpretan como hora local.
+    unread_only : bool
+        Solo correos no leídos.
+    with_attachments : bool
+        Solo correos con adjuntos.
+
+    Returns
+    -------
+    str | None
+        Filtro "@SQL=..." o None si no hay condiciones.
+    """
+    conditions = []
+
+    if unread_only:
+        conditions.append('"urn:schemas:httpmail:read" = 0')
+
+    if with_attachments:
+        conditions.append('"urn:schemas:httpmail:hasattachment" = 1')
+
+    if since is not None:
+        # DASL compara datereceived en UTC
+        since_utc = since.astimezone(timezone.utc)
+        conditions.append(
+            f'"urn:schemas:httpmail:datereceived" >= \'{since_utc.strftime(RESTRICT_DATE_FORMAT)}\''
+        )
+
+    if not conditions:
+        return None
+
+    return "@SQL=" + " AND ".join(conditions)
+
+
+def iter_items(items):
+    """
+    Recorre una colección Items de Outlook de forma lazy (GetFirst/GetNext).
+
+    A diferencia de `list(items)`, no trae todos los correos por COM de
+    una vez: cada MailItem se obtiene recién cuando se necesita.
+    """
+    msg = items.GetFirst()
+    while msg is not None:
+        yield msg
+        msg = items.GetNext()
+
 def ensure_dir(p: Path) -> None:
     """
     Asegura que un directorio exista.
@@ -21,6 +188,102 @@ def ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
 
+def _file_digest(path: Path) -> str:
+    """
+    Calcula el SHA-256 de un archivo leyéndolo por bloques.
+    """
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _load_digest_index(output_dir: Path, allowed_ext: set[str]) -> dict:
+    """
+    Carga el índice persistente de adjuntos descargados.
+
+    Estructura:
+    - "digests": sha256 -> {"file": nombre guardado, "saved_at": fecha,
+      "received": ReceivedTime del correo (UTC)}
+    - "counters": nombre original -> último número de _dupN usado
+      (0 = se guardó con su nombre original)
+
+    Si el índice aún no existe, se inicializa con los archivos que ya
+    están en la carpeta, para no volver a guardar copias de ellos.
+    """
+    index_path = output_dir / DIGEST_INDEX_NAME
+    if index_path.exists():
+        return json.loads(index_path.read_text(encoding="utf-8"))
+
+    index = {"digests": {}, "counters": {}}
+    for p in output_dir.iterdir():
+        if p.is_file() and p.suffix.lower() in allowed_ext:
+            index["digests"].setdefault(_file_digest(p), {"file": p.name, "saved_at": None})
+            index["counters"].setdefault(p.name, 0)
+    return index
+
+
+def _prune_digest_index(output_dir: Path, index: dict, since: datetime) -> int:
+    """
+    Descarta del índice los adjuntos recibidos antes de `since` que ya no
+    están en la carpeta (ya se procesaron y archivaron).
+
+    Esos correos quedan fuera de la marca de agua y no se vuelven a
+    revisar, así que el índice no crece con cada descarga. Los que siguen
+    en la carpeta conservan su entrada: su fecha de recepción ordena los
+    pendientes (ver `src.files.export_time`). Los contadores de nombres se
+    conservan (ver `_unique_dest`).
+
+    Returns
+    -------
+    int
+        Entradas descartadas.
+    """
+    stale = [
+        digest for digest, entry in index["digests"].items()
+        if (not entry.get("received") or datetime.fromisoformat(entry["received"]) < since)
+        and not (output_dir / entry["file"]).exists()
+    ]
+    for digest in stale:
+        del index["digests"][digest]
+    return len(stale)
+
+
+def _save_digest_index(output_dir: Path, index: dict) -> None:
+    """
+    Guarda el índice de adjuntos de forma atómica (temporal + replace).
+    """
+    index_path = output_dir / DIGEST_INDEX_NAME
+    tmp_path = index_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(index, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, index_path)
+
+
+def _unique_dest(output_dir: Path, name: str, counters: dict[str, int]) -> Path:
+    """
+    Elige un nombre libre para un adjunto nuevo.
+
+    La primera vez se usa el nombre original; las siguientes,
+    `<stem>_dup1<ext>`, `<stem>_dup2<ext>`, ... El contador se persiste,
+    así la numeración sigue creciendo aunque las copias anteriores ya se
+    hayan movido a la carpeta de archivo (y no choquen allá).
+    """
+    dest = output_dir / name
+    last = counters.get(name)
+
+    if last is None and not dest.exists():
+        counters[name] = 0
+        return dest
+
+    n = (last or 0) + 1
+    while (output_dir / f"{dest.stem}_dup{n}{dest.suffix}").exists():
+        n += 1
+
+    counters[name] = n
+    return output_dir / f"{dest.stem}_dup{n}{dest.suffix}"
+
+
 def _find_subfolder(parent, name: str):
     target = name.strip().lower()
     for f in parent.Folders:
@@ -30,7 +293,137 @@ def _find_subfolder(parent, name: str):
     return None
 
 
-def get_outlook_folder(namespace, path_parts: list[str]):
+# Caché de carpetas de Outlook resueltas (vive en state_dir)
+FOLDER_CACHE_NAME = "outlook_folders.json"
+
+
+def walk_folders(folder, prefix: str = ""):
+    """
+    Recorre recursivamente las subcarpetas de una carpeta de Outlook.
+
+    Yields
+    ------
+    tuple[str, folder]
+        Ruta "Padre/Hijo/..." y objeto Folder de cada subcarpeta.
+    """
+    for sub in folder.Folders:
+        path = f"{prefix}/{sub.Name}" if prefix else sub.Name
+        yield path, sub
+        yield from walk_folders(sub, path)
+
+
+@dataclass
+class OutlookFolderCache:
+    """
+    Caché persistente de carpetas de Outlook: ruta -> (EntryID, StoreID).
+
+    Resolver una carpeta por nombre obliga a recorrer `Folders` nivel por
+    nivel (y buscar en todos los stores, en los scripts de diagnóstico).
+    Con el EntryID/StoreID guardado, `namespace.GetFolderFromID` la obtiene
+    en una sola llamada. Si el ID ya no sirve (carpeta movida, renombrada
+    o borrada) se vuelve a recorrer y se actualiza la caché.
+
+    Attributes
+    ----------
+    path : Path
+        Archivo JSON donde se persiste la caché.
+    paths : dict[str, dict]
+        Rutas lógicas del pipeline (ej: "inbox/opera test") -> IDs.
+    tree : dict[str, dict]
+        Índice completo "Store/Carpeta/..." -> IDs, usado por los scripts
+        de búsqueda. Vacío hasta que se construye con `all_folders`.
+    """
+
+    path: Path
+    paths: dict[str, dict] = field(default_factory=dict)
+    tree: dict[str, dict] = field(default_factory=dict)
+    dirty: bool = False
+
+    @classmethod
+    def load(cls, state_dir: Path) -> "OutlookFolderCache":
+        path = state_dir / FOLDER_CACHE_NAME
+        if not path.exists():
+            return cls(path=path)
+
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(path=path, paths=data.get("paths", {}), tree=data.get("tree", {}))
+
+    @staticmethod
+    def _ids(folder) -> dict:
+        return {"entry_id": folder.EntryID, "store_id": folder.StoreID}
+
+    @staticmethod
+    def _open(namespace, ids: dict, expected_name: str | None = None):
+        """
+        Abre una carpeta por ID. Devuelve None si el ID quedó obsoleto.
+        """
+        try:
+            folder = namespace.GetFolderFromID(ids["entry_id"], ids["store_id"])
+        except Exception:
+            return None
+
+        if expected_name is not None and folder.Name.strip().lower() != expected_name.strip().lower():
+            return None
+        return folder
+
+    def get(self, namespace, path_parts: list[str]):
+        """
+        Carpeta cacheada para una ruta lógica, o None si no está o está obsoleta.
+        """
+        key = "/".join(p.strip().lower() for p in path_parts)
+        ids = self.paths.get(key)
+        if ids is None:
+            return None
+
+        folder = self._open(namespace, ids, expected_name=path_parts[-1])
+        if folder is None:
+            del self.paths[key]
+            self.dirty = True
+        return folder
+
+    def put(self, path_parts: list[str], folder) -> None:
+        key = "/".join(p.strip().lower() for p in path_parts)
+        self.paths[key] = self._ids(folder)
+        self.dirty = True
+
+    def all_folders(self, namespace, refresh: bool = False) -> dict[str, dict]:
+        """
+        Índice "Store/Carpeta/..." -> IDs de todas las carpetas de todos los stores.
+
+        Se construye recorriendo los stores solo la primera vez (o con
+        refresh=True); después se lee de la caché.
+        """
+        if self.tree and not refresh:
+            return self.tree
+
+        tree = {}
+        for root in namespace.Folders:
+            for path, folder in walk_folders(root, prefix=root.Name):
+                tree[path] = self._ids(folder)
+
+        self.tree = tree
+        self.dirty = True
+        return tree
+
+    def open(self, namespace, ids: dict):
+        """
+        Abre una carpeta del índice completo (None si el ID quedó obsoleto).
+        """
+        return self._open(namespace, ids)
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        data = {"paths": self.paths, "tree": self.tree}
+        tmp_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def get_outlook_folder(namespace, path_parts: list[str], cache: OutlookFolderCache | None = None):
     """
     Obtiene una carpeta específica de Outlook a partir de su ruta lógica.
 
@@ -39,7 +432,9 @@ def get_outlook_folder(namespace, path_parts: list[str]):
     - ["ROOT", "Carpeta", ...]      -> parte desde el root del store default (namespace.Folders[0])
 
     Este helper navega por la jerarquía de carpetas de Outlook
-    usando la API COM.
+    usando la API COM. Si se entrega `cache`, primero intenta abrir la
+    carpeta por su EntryID/StoreID guardado y solo recorre la jerarquía
+    si no está en caché o el ID quedó obsoleto.
 
     Parameters
     ----------
@@ -47,6 +442,8 @@ def get_outlook_folder(namespace, path_parts: list[str]):
         Namespace MAPI de Outlook (obtenido desde GetNamespace("MAPI")).
     path_parts : list[str]
         Ruta lógica de la carpeta en Outlook.
+    cache : OutlookFolderCache | None
+        Caché de carpetas resueltas (el caller la guarda con `save()`).
 
     Returns
     -------
@@ -56,14 +453,19 @@ def get_outlook_folder(namespace, path_parts: list[str]):
     Raises
     ------
     ValueError
-        Si la ruta no comienza en Inbox (limitación intencional del ejemplo).
+        Si la ruta no comienza en Inbox o ROOT, o alguna subcarpeta no existe.
     """
     if not path_parts:
         raise ValueError("path_parts no puede estar vacío")
 
+    if cache is not None and len(path_parts) > 1:
+        folder = cache.get(namespace, path_parts)
+        if folder is not None:
+            return folder
+
     root_token = path_parts[0].strip().lower()
     
-    if root_token == "Inbox":
+    if root_token == "inbox":
         # 6 corresponde a la carpeta Inbox por defecto
         folder = namespace.GetDefaultFolder(6)
         remaining = path_parts[1:]
@@ -87,6 +489,9 @@ def get_outlook_folder(namespace, path_parts: list[str]):
             )
         folder = sub
 
+    if cache is not None and remaining:
+        cache.put(path_parts, folder)
+
     return folder
 
     # # VERSIÓN ANTIGUA AQUÍ ABAJO:
@@ -107,10 +512,38 @@ def get_outlook_folder(namespace, path_parts: list[str]):
     # return folder
 
 
-def save_attachments_from_folder(folder, output_dir: Path, allowed_ext: set[str]) -> int:
+def download_attachments(
+        folder,
+        output_dir: Path,
+        allowed_ext: set[str],
+        logger: logging.Logger | None = None,
+        since: datetime | None = None,
+        unread_only: bool = True,
+        watermark: OutlookWatermark | None = None,
+        on_saved: Callable[[Path], None] | None = None,
+) -> tuple[int, list]:
     """
     Guarda adjuntos permitidos de los correos contenidos en una carpeta de Outlook.
 
+    No modifica los correos: devuelve los que se procesaron para que el
+    caller los marque como leídos y/o los mueva en un solo paso
+    (ver `finalize_messages`).
+
+    La carpeta se filtra con `Items.Restrict` (no leídos, con adjuntos y,
+    opcionalmente, recibidos desde `since`) y se recorre con
+    GetFirst/GetNext, así solo se materializan los correos candidatos.
+
+    Cada adjunto se guarda primero en un archivo temporal y se hashea
+    (SHA-256). Si el contenido ya se descargó antes (según el índice
+    persistente en `output_dir`), se descarta y se registra en el log.
+    Los adjuntos nuevos con nombre repetido reciben nombres únicos
+    numerados (`<stem>_dup1`, `<stem>_dup2`, ...), y su fecha de
+    modificación queda en la de recepción del correo.
+
+    El índice se escribe una vez al final de la pasada (también si falla
+    a mitad de camino), descartando con `watermark` las entradas que ya
+    quedaron fuera de la ventana de solape (ver `_prune_digest_index`).
+
     Parameters
     ----------
     folder :
@@ -119,124 +552,269 @@ def save_attachments_from_folder(folder, output_dir: Path, allowed_ext: set[str]
         Directorio local donde se guardarán los adjuntos.
     allowed_ext : set[str]
         Conjunto de extensiones permitidas (ej: {".csv", ".xlsx"}).
+    logger : logging.Logger | None
+        Logger opcional para registrar duplicados omitidos.
+    since : datetime | None
+        Marca de agua: solo se revisan correos recibidos desde esta fecha.
+    unread_only : bool
+        Si es True (default), solo se revisan correos no leídos.
+    watermark : OutlookWatermark | None
+        Estado persistente de descargas anteriores. Si trae fecha, reemplaza
+        a `since` y a `unread_only`: se revisan los correos recibidos desde
+        la marca (leídos o no) que no estén ya registrados por EntryID.
+        Cada correo revisado se registra en el watermark (el caller lo guarda).
+    on_saved : Callable[[Path], None] | None
+        Callback opcional que se llama con la ruta final de cada adjunto
+        nuevo apenas queda guardado (ej: `queue.Queue.put`, para procesarlo
+        mientras sigue la descarga). No se llama para duplicados.
 
     Returns
     -------
-    int
-        Número total de adjuntos guardados.
+    tuple[int, list]
+        Número total de adjuntos guardados (sin contar duplicados) y
+        correos procesados (MailItems con al menos un adjunto guardado
+        o ya existente).
     """
 
     ensure_dir(output_dir)
     count = 0
 
-    # Obtiene todos los ítems de la carpeta
+    index = _load_digest_index(output_dir, allowed_ext)
+
+    # Obtiene solo los ítems candidatos de la carpeta (filtro evaluado por Outlook)
     items = folder.Items
 
-    # Ordena por fecha de recepción (Más recientes primero)
-    items.Sort("[ReceivedTime]", True)
+    if watermark is not None and watermark.since is not None:
+        since = watermark.since
+        unread_only = False
 
-    # se convierte a lista para evitar problemas
-    # al modificar correos mientras se itera
-    for msg in list(items):
+    restrict = build_restrict_filter(since=since, unread_only=unread_only)
+    if restrict:
+        items = items.Restrict(restrict)
 
-        # 43 = MailItem (descarta reuniones, notificaciones, etc.)
-        if msg.Class != 43:
-            continue
+    # Ordena por fecha de recepción (más antiguos primero): los adjuntos se
+    # guardan y encolan en orden de export, que es el que espera el pace
+    items.Sort("[ReceivedTime]", False)
 
-        attachments = msg.Attachments
-        if attachments.Count == 0:
-            continue
+    # Correos procesados. Se marcan/mueven al final: cambiar UnRead
+    # mientras se itera una colección filtrada por UnRead la altera
+    # y GetNext se saltaría correos.
+    handled_msgs = []
 
-        saved_any = False
+    try:
+        for msg in iter_items(items):
+
+            # 43 = MailItem (descarta reuniones, notificaciones, etc.)
+            if msg.Class != 43:
+                continue
 
-        # Outlook indexa adjuntos desde 1, no desde 0
-        for i in range(1, attachments.Count + 1):
-            att = attachments.Item(i)
+            received = msg.ReceivedTime
 
-            # En Outlook COM suele ser FileName (no Filename)
-            name = att.FileName
-            ext = Path(name).suffix.lower()
+            if watermark is not None:
+                entry_id = msg.EntryID
+                if watermark.seen(entry_id):
+                    continue
+                watermark.mark(entry_id, received)
 
-            # Ignora adjuntos no permitidos
-            if ext not in allowed_ext:
+            attachments = msg.Attachments
+            if attachments.Count == 0:
                 continue
 
-            dest = output_dir / name
+            handled_any = False
+
+            # Outlook indexa adjuntos desde 1, no desde 0
+            for i in range(1, attachments.Count + 1):
+                att = attachments.Item(i)
+
+                # En Outlook COM suele ser FileName (no Filename)
+                name = att.FileName
+                ext = Path(name).suffix.lower()
+
+                # Ignora adjuntos no permitidos
+                if ext not in allowed_ext:
+                    continue
+
+                # Guarda el adjunto en un temporal (oculto para find_pending_files)
+                tmp_path = output_dir / f".att_{os.getpid()}_{i}.tmp"
+
+                try:
+                    att.SaveAsFile(str(tmp_path))
+                    digest = _file_digest(tmp_path)
+
+                    known = index["digests"].get(digest)
+                    if known is not None:
+                        # Mismo contenido que un adjunto anterior: no se vuelve a procesar
+                        tmp_path.unlink()
+                        if logger:
+                            logger.info(f"Outlook: adjunto duplicado omitido '{name}' (igual a '{known['file']}')")
+                        handled_any = True
+                        continue
+
+                    # Evita sobrescribir archivos existentes
+                    dest = _unique_dest(output_dir, name, index["counters"])
+                    os.replace(tmp_path, dest)
 
-            # Evita sobrescribir archivos existentes
-            if dest.exists():
-                dest = output_dir / f"{dest.stem}_dup{dest.suffix}"
+                    # Fecha del export aunque el índice se escriba al final de la pasada:
+                    # el archivo se procesa apenas se encola (ver src.files.export_time)
+                    received_ns = int(_as_utc(received).timestamp() * 1_000_000) * 1000
+                    os.utime(dest, ns=(received_ns, received_ns))
+                finally:
+                    tmp_path.unlink(missing_ok=True)
 
-            # Guarda el adjunto en disco
-            att.SaveAsFile(str(dest))
+                index["digests"][digest] = {
+                    "file": dest.name,
+                    "saved_at": datetime.now().isoformat(timespec="seconds"),
+                    # Fecha del export: ordena los snapshots (ver src.files.export_time)
+                    "received": _as_utc(received).isoformat(),
+                }
+
+                count += 1
+                handled_any = True
+
+                if on_saved is not None:
+                    on_saved(dest)
+
+            if handled_any:
+                handled_msgs.append(msg)
+    finally:
+        # Una escritura por pasada, no por adjunto
+        pruned = 0
+        if watermark is not None and watermark.since is not None:
+            pruned = _prune_digest_index(output_dir, index, watermark.since)
+        if count or pruned or not (output_dir / DIGEST_INDEX_NAME).exists():
+            _save_digest_index(output_dir, index)
+
+    return count, handled_msgs
+
+def finalize_messages(messages: list, dst_folder=None) -> tuple[int, int]:
+    """
+    Marca como leídos (y opcionalmente mueve) los correos procesados en un solo paso.
+
+    Por correo se hace una sola escritura en el almacén:
+    - sin carpeta destino: UnRead = False + Save
+    - con carpeta destino: UnRead = False + Move (Move persiste el cambio,
+      no hace falta un Save previo ni volver a guardar la copia movida)
+
+    Si un Move falla, el correo igual se guarda como leído y se cuenta
+    como fallido; no detiene al resto del lote.
+
+    Parameters
+    ----------
+    messages : list
+        MailItems devueltos por `download_attachments`.
+    dst_folder :
+        Carpeta de Outlook destino, o None para solo marcarlos como leídos.
+
+    Returns
+    -------
+    tuple[int, int]
+        (correos movidos, correos cuyo movimiento falló).
+    """
+    moved = 0
+    failed = 0
 
-            count += 1
-            saved_any = True
+    for msg in messages:
+        msg.UnRead = False
 
-        # Si se guardó al menos un adjunto,
-        # se marca el correo como leído
-        if saved_any:
-            msg.UnRead = False
+        if dst_folder is None:
             msg.Save()
-    
-    return count
+            continue
+
+        try:
+            msg.Move(dst_folder)
+            moved += 1
+        except Exception:
+            failed += 1
+            msg.Save()
+
+    return moved, failed
+
 
-def move_processed_emails(src_folder, dst_folder_name: str):
+def save_attachments_from_folder(
+        folder,
+        output_dir: Path,
+        allowed_ext: set[str],
+        logger: logging.Logger | None = None,
+        since: datetime | None = None,
+        unread_only: bool = True,
+        watermark: OutlookWatermark | None = None,
+) -> int:
     """
-    Mueve correos procesados desde una carpeta de Outlook
-    a otra carpeta (por ejemplo, 'Processed').
+    Guarda adjuntos permitidos de una carpeta de Outlook y marca como
+    leídos los correos procesados.
 
-    Se asume que los correos ya procesados están marcados
-    como leídos.
+    Atajo de `download_attachments` + `finalize_messages` sin mover
+    correos. Los parámetros son los de `download_attachments`.
+
+    Returns
+    -------
+    int
+        Número total de adjuntos guardados (sin contar duplicados).
+    """
+    count, handled = download_attachments(
+        folder,
+        output_dir,
+        allowed_ext,
+        logger=logger,
+        since=since,
+        unread_only=unread_only,
+        watermark=watermark,
+    )
+    finalize_messages(handled)
+    return count
+
+def get_processed_folder(src_folder, dst_folder_name: str):
+    """
+    Busca la carpeta de procesados al mismo nivel que la carpeta origen.
 
     Parameters
     ----------
     src_folder :
         Carpeta origen de Outlook.
     dst_folder_name : str
-        Nombre de la carpeta destino (hermana de la carpeta origen).
-    """
+        Nombre de la carpeta destino (case-insensitive).
+
+    Returns
+    -------
+    folder :
+        Carpeta destino.
 
-    # La carpeta destino busca al mismo nivel que la carpeta origen
-        # Buscar destino con match tolerante (case-insensitive)
-    dst_folder = src_folder.Parent.Folders[dst_folder_name]
+    Raises
+    ------
+    ValueError
+        Si la carpeta no existe.
+    """
+    parent = src_folder.Parent
+    dst_folder = _find_subfolder(parent, dst_folder_name)
     if dst_folder is None:
-        available = [f.Name for f in src_folder.Parent.Folders]
+        available = [f.Name for f in parent.Folders]
         raise ValueError(
-            f"No se encontró carpeta destino '{dst_folder_name}' dentro de '{src_folder.Parent.Name}'."
+            f"No se encontró carpeta destino '{dst_folder_name}' dentro de '{parent.Name}'."
             f"Disponibles: {available}"
         )
+    return dst_folder
 
-    items = src_folder.Items
-    items.Sort("[ReceivedTime]", True)
-
-    for msg in list(items):
-        if msg.Class != 43:
-            continue
-
-        # Convención: correo leído = ya procesado
-        if msg.UnRead is False:
-            moved = msg.Move(dst_folder)
-            # Asegura que el item en destino quede leído
-            moved.UnRead = False
-            moved.Save()
 
 def fetch_mail_attachments(
         outlook_folder_path: list[str],
         output_dir: Path,
         allowed_ext: set[str] | None = None,
         processed_folder_name: str | None = None,
-        logger: logging.Logger | None = None
+        logger: logging.Logger | None = None,
+        since: datetime | None = None,
+        state_dir: Path | None = None,
+        on_saved: Callable[[Path], None] | None = None,
+        namespace=None,
 ) -> int:
     """
     Descarga adjuntos desde una carpeta de Outlook y los guarda localmente.
 
     Flujo:
-    - Conecta a Outlook vía COM (MAPI).
+    - Conecta a Outlook vía COM (MAPI), o usa `namespace` si se entrega.
     - Accede a la carpeta indicada (ej: ["Inbox", "Opera test"]).
     - Descarga adjuntos con extensiones permitidas a output_dir.
-    - Marca como leídos los correos donde descargó adjuntos.
-    - (Opcional) mueve correos leídos a una carpeta de procesados.
+    - Marca como leídos los correos donde descargó adjuntos y
+      (opcional) los mueve a una carpeta de procesados, en un solo lote.
 
     Parameters
     ----------
@@ -250,6 +828,18 @@ def fetch_mail_attachments(
         Si se entrega, mueve correos procesados a esta carpeta (misma jerarquía).
     logger : logging.Logger | None
         Logger opcional para registrar eventos. Si es None, no loggea.
+    since : datetime | None
+        Si se entrega, solo revisa correos recibidos desde esa fecha.
+    state_dir : Path | None
+        Si se entrega, usa (y actualiza) la marca de agua persistente de
+        esa carpeta: cada corrida solo revisa correos nuevos. También
+        guarda ahí la caché de carpetas resueltas.
+    on_saved : Callable[[Path], None] | None
+        Se llama con cada adjunto nuevo apenas queda guardado
+        (ver `download_attachments`).
+    namespace :
+        Namespace MAPI ya abierto (ver `OutlookSession`). Si es None, se
+        conecta acá (`connect_outlook`).
 
     Returns
     -------
@@ -259,30 +849,220 @@ def fetch_mail_attachments(
 
     allowed_ext = allowed_ext or DEFAULT_ALLOWED_EXT
 
-    # Conecta con Outlook vía COM
-    outlook = win32com.client.Dispatch("Outlook.Application").GetNamespace("MAPI")
+    outlook = namespace if namespace is not None else connect_outlook()
+
+    folder_cache = OutlookFolderCache.load(state_dir) if state_dir is not None else None
 
     # Resuleve carpeta origen (donde tu regla mueve los correos)
-    src_folder = get_outlook_folder(outlook, outlook_folder_path)
+    src_folder = get_outlook_folder(outlook, outlook_folder_path, cache=folder_cache)
 
     if logger:
         logger.info(f"Outlook: leyendo carpeta {'/'.join(outlook_folder_path)})")
 
-    # Descarga adjuntos
-    saved = save_attachments_from_folder(src_folder, output_dir, allowed_ext)
+    watermark = OutlookWatermark.load(state_dir) if state_dir is not None else None
 
-    if logger:
-        logger.info(f"Outlook: adjuntos guardados = {saved}")
-    
-    # Opcional: mover correos procesados (leídos) a subcarpetas de archivo
+    if logger and watermark is not None and watermark.last_received is not None:
+        logger.info(f"Outlook: revisando correos desde {watermark.since.isoformat()}")
+
+    # Carpeta de procesados: se resuelve antes de descargar. Si no existe,
+    # los correos igual se marcan como leídos (no matamos el pipeline)
+    dst_folder = None
     if processed_folder_name:
         try:
-            move_processed_emails(src_folder, processed_folder_name)
-            if logger:
-                logger.info(f"Outlook: correos procesados movidos a '{processed_folder_name}'")
+            if len(outlook_folder_path) > 1:
+                # Hermana de la carpeta origen: misma ruta lógica, pasa por la caché
+                processed_path = [*outlook_folder_path[:-1], processed_folder_name]
+                dst_folder = get_outlook_folder(outlook, processed_path, cache=folder_cache)
+            else:
+                dst_folder = get_processed_folder(src_folder, processed_folder_name)
         except Exception as e:
-            # No matamos el pipeline por fallo de archivado de correos
             if logger:
                 logger.warning(f"Outlook: no se pudieron mover correos procesados: {e}")
 
-    return saved
\ No newline at end of file
+    if folder_cache is not None:
+        folder_cache.save()
+
+    # Descarga adjuntos (una sola pasada por la carpeta, sin tocar los correos)
+    saved, handled = download_attachments(
+        src_folder,
+        output_dir,
+        allowed_ext,
+        logger=logger,
+        since=since,
+        watermark=watermark,
+        on_saved=on_saved,
+    )
+
+    # Se guarda apenas termina la descarga, antes de mover correos: si el
+    # movimiento falla, la próxima corrida igual no vuelve a revisarlos
+    if watermark is not None:
+        watermark.save()
+
+    if logger:
+        logger.info(f"Outlook: adjuntos guardados = {saved}")
+
+    # Marca como leídos y (opcional) mueve los correos procesados, en un solo lote
+    moved, failed = finalize_messages(handled, dst_folder)
+
+    if logger and dst_folder is not None:
+        logger.info(f"Outlook: correos procesados movidos a '{processed_folder_name}' = {moved}")
+        if failed:
+            # No matamos el pipeline por fallo de archivado de correos
+            logger.warning(f"Outlook: no se pudieron mover {failed} correos procesados (quedan marcados como leídos)")
+
+    return saved
+
+
+def connect_outlook():
+    """
+    Abre el namespace MAPI de Outlook vía COM.
+
+    pywin32 se importa acá (solo existe en Windows) para que el resto del
+    módulo se pueda usar con objetos falsos.
+    """
+    import win32com.client
+
+    return win32com.client.Dispatch("Outlook.Application").GetNamespace("MAPI")
+
+
+class OutlookSession:
+    """
+    Conexión a Outlook de larga vida, con su propio hilo COM.
+
+    Los objetos COM solo se pueden usar desde el apartamento (hilo) que los
+    creó, así que todo el trabajo con Outlook se encola a este hilo, que
+    inicializa COM y conecta (`Dispatch`) una sola vez y reutiliza el
+    namespace en cada pedido. Pensado para el modo `--watch`: cada pasada
+    usa la misma conexión en vez de volver a pagar CoInitialize/Dispatch.
+
+    Si un pedido falla (ej: Outlook se cerró), se descarta la conexión
+    (`reset`) y el pedido siguiente vuelve a conectar.
+
+    Se usa como context manager; al salir se detiene el hilo y se libera COM.
+    """
+
+    def __init__(self):
+        self._jobs: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="outlook-session", daemon=True)
+        self._namespace = None
+
+    def _run(self) -> None:
+        # pywin32 solo existe en Windows; sin él (objetos falsos) no hay apartamento que iniciar
+        try:
+            import pythoncom
+        except ImportError:
+            pythoncom = None
+
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+        try:
+            # None = cerrar la sesión
+            while (job := self._jobs.get()) is not None:
+                job()
+        finally:
+            self._namespace = None
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+
+    @property
+    def namespace(self):
+        """
+        Namespace MAPI (se conecta en el primer uso). Solo desde el hilo de la sesión.
+        """
+        if self._namespace is None:
+            self._namespace = connect_outlook()
+        return self._namespace
+
+    def reset(self) -> None:
+        """
+        Descarta la conexión: el próximo pedido vuelve a conectar.
+        """
+        self._namespace = None
+
+    def submit(self, job: Callable[[], None]) -> None:
+        """
+        Encola `job` para ejecutarlo en el hilo de la sesión.
+        """
+        if not self._thread.is_alive():
+            self._thread.start()
+        self._jobs.put(job)
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._jobs.put(None)
+            self._thread.join()
+
+    def __enter__(self) -> "OutlookSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class AttachmentProducer:
+    """
+    Descarga de adjuntos en el hilo de Outlook, publicados en una cola acotada.
+
+    Todo el trabajo COM (enumerar correos, `SaveAsFile`, marcar/mover) ocurre
+    en el hilo de una `OutlookSession`. El hilo principal consume la cola y
+    procesa cada archivo apenas llega, en vez de esperar a que termine la
+    pasada completa por la carpeta. Si no se entrega `session`, se abre una
+    solo para esta descarga y se cierra al terminar.
+
+    Como la cola es acotada, si el procesamiento va más lento que la descarga
+    el hilo se bloquea en `put` (no se acumulan archivos sin procesar).
+
+    Al terminar (bien o con error) siempre deja `None` en la cola como marca
+    de fin.
+
+    Attributes
+    ----------
+    file_queue : queue.Queue
+        Cola donde se publican las rutas de los adjuntos guardados.
+    session : OutlookSession | None
+        Sesión de Outlook compartida (modo watch).
+    fetch_kwargs : dict
+        Argumentos para `fetch_mail_attachments` (sin `on_saved` ni `namespace`).
+    saved : int
+        Adjuntos guardados (válido al terminar la descarga).
+    elapsed : float
+        Segundos que tomó la descarga (incluye esperas por cola llena).
+    error : Exception | None
+        Error de la descarga, si hubo. No se propaga: el caller decide.
+    """
+
+    def __init__(self, file_queue: queue.Queue, session: OutlookSession | None = None, **fetch_kwargs):
+        self.file_queue = file_queue
+        self.session = session
+        self.fetch_kwargs = fetch_kwargs
+        self.saved = 0
+        self.elapsed = 0.0
+        self.error: Exception | None = None
+        self._own_session = session is None
+        self._done = threading.Event()
+
+    def start(self) -> None:
+        if self._own_session:
+            self.session = OutlookSession()
+        self.session.submit(self.run)
+
+    def run(self) -> None:
+        t0 = time.perf_counter()
+        try:
+            self.saved = fetch_mail_attachments(
+                namespace=self.session.namespace,
+                on_saved=self.file_queue.put,
+                **self.fetch_kwargs,
+            )
+        except Exception as e:
+            self.error = e
+            self.session.reset()
+        finally:
+            self.elapsed = time.perf_counter() - t0
+            self.file_queue.put(None)
+            self._done.set()
+
+    def join(self, timeout: float | None = None) -> None:
+        self._done.wait(timeout)
+        if self._own_session and self._done.is_set():
+            self.session.close()
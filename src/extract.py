@@ -1,84 +1,390 @@
+from collections.abc import Iterator
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
+import importlib.util
+import numpy as np
 import pandas as pd
 
-def find_latest_file(input_dir: Path, pattern: str) -> Path | None:
+# Búsqueda de archivos: vive en src.files (sin pandas) y se re-exporta acá
+from src.files import find_latest_file, find_pending_files, matches_pattern
+from src.transform import (
+    DATE_DTYPE,
+    NORMALIZED_DATE_COLUMNS,
+    NORMALIZED_DTYPES,
+    OPERA_DATE_FORMAT,
+    coerce_schema,
+    header_mapping,
+)
+
+# pyarrow es opcional: si está instalado se usa su lector CSV (multihilo)
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# python-calamine es opcional: lector de Excel nativo (Rust), bastante más
+# rápido que openpyxl y el único de los dos que abre .xls
+HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
+
+EXCEL_EXTENSIONS = {".xlsx", ".xlsm", ".xls"}
+
+# Filas por DataFrame intermedio al leer un Excel completo: acota la
+# memoria en objetos Python (tuplas de celdas) a un bloque a la vez
+EXCEL_BATCH_ROWS = 50_000
+
+
+def _schema(header: tuple) -> tuple[list[str], dict[str, str], dict[str, str], list[str]]:
+    """
+    Columnas conocidas y sus tipos a partir de la fila de encabezados.
     """
-    Busca el archivo más reciente en un directorio que coincida con un patrón.
+    mapping = header_mapping(header)
 
-    Parameters
-    ----------
-    input_dir : Path
-        Directorio donde buscar archivos.
-    pattern : str
-        Patrón de búsqueda (ej: 'opera_*.csv').
+    schema = {raw: NORMALIZED_DTYPES[c] for raw, c in mapping.items() if c in NORMALIZED_DTYPES}
+    parse_dtype = {c: t for c, t in schema.items() if t != "Int64"}
+    int_cast = {c: t for c, t in schema.items() if t == "Int64"}
+    date_columns = [raw for raw, c in mapping.items() if c in NORMALIZED_DATE_COLUMNS]
+    return list(mapping), parse_dtype, int_cast, date_columns
 
-    Returns
-    -------
-    Path | None
-        Ruta del archivo más reciente encontrado, o None si no hay coincidencias.
-    """
-    # input_dir.glob(pattern)
-    # → devuelve un iterable con todos los archivos que calzan con el patrón
-    #   ejemplo: [Path("opera_export_2026-01-20.csv"), Path("opera_export_2026-01-21.csv")]
-    
-    # sorted(..., key=..., reverse=True)
-    # → ordena la lista resultante usando como criterio el tiempo de modificación del archivo
-    
-    # lambda p: p.stat().st_mtime
-    # → para cada archivo (p), obtiene su metadata del sistema
-    # → st_mtime = "modification time" (timestamp en segundos)
-    # → mientras más grande, más reciente es el archivo
-
-    files = sorted(
-        input_dir.glob(pattern),          # lista de archivos que coinciden con el patrón
-        key=lambda p: p.stat().st_mtime,   # criterio: fecha de última modificación
-        reverse=True                       # orden descendente (más reciente primero)
-    )
-
-    # Si la lista no está vacía:
-    # - files[0] es el archivo más reciente
-    # Si no hay archivos:
-    # - devuelve None (para que el caller lo maneje)
-    
-    return files[0] if files else None
-
-def find_pending_files(input_dir: Path, pattern: str) -> list[Path]:
-    """
-    Retorna todos los archivos que coinciden con el patrón, ordenados
-    por fecha de modificación (más antiguos primero).
 
-    Parameters
-    ----------
-    input_dir : Path
-        Directorio donde buscar.
-    pattern : str
-        Patrón glob (ej: "*.csv", "opera_export_*.csv").
+def _csv_schema(path: Path) -> tuple[list[str], dict[str, str], dict[str, str], list[str]]:
+    """
+    Columnas a leer y sus tipos según el esquema de Opera.
+
+    Solo lee la fila de encabezados. Las columnas se ubican por su nombre
+    canónico (ver `src.transform.header_mapping`), así da lo mismo si el
+    export trae "ConfirmationNumber" o "Confirmation Number", y un export
+    con columnas de más o de menos no rompe la lectura tipada.
 
     Returns
     -------
-    list[Path]
-        Lista de archivos ordenada (oldest -> newest).
+    tuple[list[str], dict[str, str], dict[str, str], list[str]]
+        (columnas conocidas a leer, tipos para el parser, enteros
+        nullable a aplicar después, columnas de fecha).
+        Los Int64 se castean después de leer porque el motor C es
+        bastante más lento parseando directo a enteros nullable.
+    """
+    header = pd.read_csv(path, encoding="utf-8", sep=",", nrows=0).columns
+    return _schema(tuple(header))
+
+
+def _as_text_numbers(dtype: dict[str, str]) -> dict[str, str]:
+    """
+    Tipos para releer un CSV con las columnas numéricas como texto.
     """
-    files = list(input_dir.glob(pattern))
-    files.sort(key=lambda p: p.stat().st_mtime)     # Más antiguo primero
-    return files
+    return {c: t if t == "category" else "object" for c, t in dtype.items()}
+
+
+def _keep_raw(values: pd.Series, dtype: str) -> pd.Series:
+    """
+    Columna con el tipo del esquema, o tal como vino si alguna celda no calza.
+
+    Una celda mala (ej: Rate "abc", Nights "x", Arrival "31-02-2026") no
+    hace fallar el archivo ni se pierde como nulo: la columna queda como
+    texto, `RowValidator` rechaza esas filas (la cuarentena guarda el
+    valor original) y `src.transform.cast_schema` convierte el resto.
+    """
+    converted, failed = coerce_schema(values, dtype)
+    return values if failed.any() else converted
+
 
-def read_export(path: Path) -> pd.DataFrame:
+def _apply_schema(
+        df: pd.DataFrame, dtype: dict[str, str], int_cast: dict[str, str], date_columns: list[str]
+) -> pd.DataFrame:
+    """
+    Completa el esquema después de leer: números, enteros nullable y fechas.
+
+    Las fechas se convierten con el formato dd-mm-YYYY explícito, lo que
+    evita que pandas adivine (y confunda día con mes). Una columna con
+    valores que no calzan con su tipo queda como texto (ver `_keep_raw`).
+    """
+    numbers = {c: t for c, t in dtype.items() if t != "category"}
+    for c, t in {**numbers, **int_cast}.items():
+        if df[c].dtype != t:
+            df[c] = _keep_raw(df[c], t)
+
+    for c in date_columns:
+        df[c] = _keep_raw(df[c], DATE_DTYPE)
+    return df
+
+
+def _read_csv(path: Path, usecols: list[str], dtype: dict[str, str]) -> pd.DataFrame:
+    """
+    Lee un CSV completo: motor pyarrow si está instalado, si no (o si no
+    puede con el archivo) el motor C.
+    """
+    if HAS_PYARROW:
+        try:
+            return pd.read_csv(path, encoding="utf-8", sep=",", usecols=usecols, dtype=dtype, engine="pyarrow")
+        except pd.errors.ParserError:
+            # pyarrow exige que todas las filas tengan todas las columnas;
+            # Opera omite las vacías al final de la fila (ej: "Linked Name"),
+            # caso que el motor C sí tolera (rellena con NaN)
+            pass
+
+    return pd.read_csv(path, encoding="utf-8", sep=",", usecols=usecols, dtype=dtype)
+
+
+def _iter_csv_chunks(path: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Itera un CSV en bloques de `chunksize` filas.
+
+    El `with` garantiza que el archivo se cierre aunque el consumidor
+    deje de iterar a mitad de camino (ej: error en una transformación),
+    lo que en Windows es necesario para poder moverlo después.
+
+    Si un bloque trae una celda numérica que no calza (ej: Rate "abc"),
+    el resto del archivo se relee desde ese bloque con esas columnas como
+    texto (ver `_apply_schema`).
+    """
+    usecols, dtype, int_cast, date_columns = _csv_schema(path)
+    done = 0
+
+    for parse_dtype in (dtype, _as_text_numbers(dtype)):
+        # El motor pyarrow no soporta chunksize: por bloques siempre se usa el motor C
+        with pd.read_csv(
+                path, encoding="utf-8", sep=",", usecols=usecols, dtype=parse_dtype, chunksize=chunksize,
+                skiprows=range(1, done + 1),
+        ) as reader:
+            while True:
+                try:
+                    chunk = next(reader)
+                except StopIteration:
+                    return
+                except ValueError:
+                    if parse_dtype is not dtype:
+                        raise
+                    break
+
+                done += len(chunk)
+                yield _apply_schema(chunk, dtype, int_cast, date_columns)
+
+
+def _iter_excel_rows(path: Path) -> Iterator[tuple | list]:
+    """
+    Itera las filas (solo valores) de la primera hoja de un Excel,
+    encabezado incluido.
+
+    Con python-calamine la hoja se parsea en código nativo y se entregan
+    filas de una a la vez; si no está instalado se usa openpyxl en modo
+    `read_only`, que lee el XML en streaming en vez de armar el libro
+    completo en memoria. El libro se cierra aunque el consumidor deje de
+    iterar a mitad de camino.
+    """
+    if HAS_CALAMINE:
+        from python_calamine import CalamineWorkbook
+
+        workbook = CalamineWorkbook.from_path(str(path))
+        try:
+            yield from workbook.get_sheet_by_index(0).iter_rows()
+        finally:
+            workbook.close()
+        return
+
+    if path.suffix.lower() == ".xls":
+        # openpyxl solo entiende el formato XML (.xlsx/.xlsm)
+        raise ValueError(f"Leer archivos .xls requiere python-calamine: {path.name}")
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        width = None
+        for row in sheet.iter_rows(values_only=True):
+            # En modo read_only las filas pueden venir más cortas que el
+            # encabezado (si el archivo no declara el tamaño de la hoja)
+            if width is None:
+                width = max(sheet.max_column or 0, len(row))
+            yield row if len(row) >= width else row + (None,) * (width - len(row))
+    finally:
+        workbook.close()
+
+
+def _cell_text(value) -> str:
+    """
+    Texto de una celda de Excel: los números enteros pierden el ".0"
+    (ej: habitación 101.0 -> "101"), igual que se verían en el CSV.
+    """
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _excel_dates(values: pd.Series) -> pd.Series:
+    """
+    Fechas de una columna de Excel. Pueden venir como celdas de fecha
+    (datetime/date) o como texto dd-mm-YYYY, incluso mezcladas. Se
+    convierte cada valor distinto una sola vez.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    codes, uniques = pd.factorize(values)
+    parsed = [
+        pd.Timestamp(v) if hasattr(v, "year")
+        else pd.to_datetime(str(v), format=OPERA_DATE_FORMAT, errors="coerce")
+        for v in uniques
+    ]
+    dates = pd.DatetimeIndex(parsed + [pd.NaT]).take(codes)     # código -1 (vacío) -> NaT
+    return pd.Series(dates, index=values.index, name=values.name)
+
+
+def _excel_text(values: pd.Series, categorical: bool = False) -> pd.Series:
+    """
+    Columna de texto (o categoría) a partir de celdas de Excel, que
+    pueden traer números donde el CSV traería texto. Se convierte cada
+    valor distinto una sola vez.
+    """
+    codes, uniques = pd.factorize(values)
+    remap, categories = pd.factorize(pd.Index([_cell_text(v) for v in uniques], dtype=object))
+    # 101.0 y "101" pasan a ser la misma categoría; el código -1 (vacío) se mantiene
+    codes = np.append(remap, -1)[codes]
+
+    text = pd.Categorical.from_codes(codes, categories=categories)
+    return pd.Series(text if categorical else text.astype(object), index=values.index, name=values.name)
+
+
+def _type_excel_frame(
+        df: pd.DataFrame,
+        parse_dtype: dict[str, str],
+        int_cast: dict[str, str],
+        date_columns: list[str],
+) -> pd.DataFrame:
+    """
+    Aplica el esquema de Opera a un DataFrame armado con celdas de Excel.
+
+    Deja los mismos tipos que la lectura del CSV: celdas vacías como
+    faltantes, categorías y textos como texto, números, enteros nullable
+    y fechas. Igual que en el CSV, una columna con alguna celda que no
+    calza con su tipo queda como texto (ver `_keep_raw`).
+    """
+    # calamine entrega "" para las celdas vacías; openpyxl, None
+    df = df.mask(df.eq(""))
+    # Filas con formato pero sin datos al final de la hoja
+    df = df.dropna(how="all")
+
+    for c in df.columns:
+        if c in date_columns:
+            dates = _excel_dates(df[c])
+            if (dates.isna() & df[c].notna()).any():
+                # Alguna celda no es fecha: columna como texto (las fechas
+                # como dd-mm-YYYY), igual que la del CSV
+                dates = dates.dt.strftime(OPERA_DATE_FORMAT).fillna(_excel_text(df[c]))
+            df[c] = dates
+        elif c in int_cast or parse_dtype.get(c, "").startswith(("float", "int")):
+            converted, failed = coerce_schema(df[c], int_cast.get(c) or parse_dtype[c])
+            df[c] = _excel_text(df[c]) if failed.any() else converted
+        else:
+            df[c] = _excel_text(df[c], categorical=parse_dtype.get(c) == "category")
+
+    return df
+
+
+def _iter_excel_frames(path: Path, batch_rows: int) -> Iterator[tuple[pd.DataFrame, tuple]]:
+    """
+    Itera un Excel en DataFrames (sin tipar) de a lo más `batch_rows` filas.
+
+    Solo se conservan las columnas conocidas del export: cada fila se
+    recorta con un `itemgetter` antes de guardarla, así las columnas que
+    no se usan no llegan a ocupar memoria.
+
+    Yields
+    ------
+    tuple[pd.DataFrame, tuple]
+        (bloque, esquema como lo devuelve `_schema`).
+    """
+    rows = _iter_excel_rows(path)
+    try:
+        header = next(rows, None) or ()
+        header = tuple("" if h is None else str(h).strip() for h in header)
+        schema = _schema(header)
+        usecols = schema[0]
+
+        indices = [header.index(c) for c in usecols]
+        if len(indices) > 1:
+            pick = itemgetter(*indices)
+        elif indices:
+            pick = lambda row, i=indices[0]: (row[i],)
+        else:
+            pick = lambda row: ()
+
+        emitted = False
+        while batch := list(map(pick, islice(rows, batch_rows))):
+            emitted = True
+            yield pd.DataFrame.from_records(batch, columns=usecols), schema
+
+        if not emitted:
+            yield pd.DataFrame(columns=usecols, dtype=object), schema
+    finally:
+        rows.close()
+
+
+def _iter_excel_chunks(path: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Itera un Excel en bloques tipados de `chunksize` filas.
+    """
+    frames = _iter_excel_frames(path, chunksize)
+    try:
+        for df, (_, parse_dtype, int_cast, date_columns) in frames:
+            yield _type_excel_frame(df, parse_dtype, int_cast, date_columns)
+    finally:
+        frames.close()
+
+
+def _read_excel(path: Path) -> pd.DataFrame:
+    """
+    Lee un Excel completo. Se arma por bloques sin tipar y se tipa una sola
+    vez al final (tipar por bloque obligaría a unificar categorías).
+    """
+    frames = list(_iter_excel_frames(path, EXCEL_BATCH_ROWS))
+    _, parse_dtype, int_cast, date_columns = frames[0][1]
+    df = frames[0][0] if len(frames) == 1 else pd.concat([f for f, _ in frames], ignore_index=True)
+    del frames
+    return _type_excel_frame(df, parse_dtype, int_cast, date_columns)
+
+
+def read_export(path: Path, chunksize: int | None = None) -> pd.DataFrame | Iterator[pd.DataFrame]:
     """
     Lee un archivo de exportación desde disco y lo carga en un DataFrame.
 
-    Actualmente asume formato CSV, pero puede extenderse a Excel
-    u otros formatos según la fuente.
+    El formato se elige por la extensión: CSV o Excel (.xlsx/.xlsm/.xls,
+    los adjuntos que acepta la descarga de Outlook). Los Excel se leen
+    con python-calamine si está instalado y si no con openpyxl en modo
+    `read_only` (este último no abre .xls).
+
+    Solo se leen las columnas conocidas del export (ver
+    `src.transform.CANONICAL_COLUMNS`), con el esquema declarado en
+    `src.transform` (categorías, enteros nullable y fechas dd-mm-YYYY). Si pyarrow está
+    instalado se intenta primero su motor CSV.
+
+    Si se indica `chunksize`, el archivo no se carga completo: se devuelve
+    un iterador de DataFrames de a lo más `chunksize` filas, de modo que
+    la memoria usada depende del tamaño del bloque y no del archivo.
 
     Parameters
     ----------
     file_path : Path
         Ruta del archivo a leer.
+    chunksize : int | None, optional
+        Filas por bloque. Si es None (o 0), lee el archivo completo.
 
     Returns
     -------
-    pd.DataFrame
-        DataFrame con los datos del archivo.
+    pd.DataFrame | Iterator[pd.DataFrame]
+        DataFrame con los datos del archivo, o iterador de bloques
+        si se usó `chunksize`.
     """
-    # asume CSV; Si fuera Excel, usar pd.read_excel
-    return pd.read_csv(path, encoding="utf-8", sep=",")
+    if path.suffix.lower() in EXCEL_EXTENSIONS:
+        return _iter_excel_chunks(path, chunksize) if chunksize else _read_excel(path)
+
+    if chunksize:
+        return _iter_csv_chunks(path, chunksize)
+
+    usecols, dtype, int_cast, date_columns = _csv_schema(path)
+
+    try:
+        df = _read_csv(path, usecols, dtype)
+    except ValueError:
+        # Alguna celda numérica no calza (ej: Rate "abc"): se relee con las
+        # columnas numéricas como texto y la validación por fila decide
+        df = _read_csv(path, usecols, _as_text_numbers(dtype))
+
+    return _apply_schema(df, dtype, int_cast, date_columns)
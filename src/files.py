@@ -0,0 +1,134 @@
+from datetime import datetime
+from pathlib import Path
+import fnmatch
+import json
+
+from src.download_from_outlook import DIGEST_INDEX_NAME
+
+# Este módulo no importa pandas: src.main lo usa para decidir si hay algo
+# que procesar antes de cargar las dependencias pesadas.
+
+
+def find_latest_file(input_dir: Path, pattern: str) -> Path | None:
+    """
+    Busca el archivo más reciente en un directorio que coincida con un patrón.
+
+    Parameters
+    ----------
+    input_dir : Path
+        Directorio donde buscar archivos.
+    pattern : str
+        Patrón de búsqueda (ej: 'opera_*.csv').
+
+    Returns
+    -------
+    Path | None
+        Ruta del archivo más reciente encontrado, o None si no hay coincidencias.
+    """
+    # input_dir.glob(pattern)
+    # → devuelve un iterable con todos los archivos que calzan con el patrón
+    #   ejemplo: [Path("opera_export_2026-01-20.csv"), Path("opera_export_2026-01-21.csv")]
+    
+    # sorted(..., key=..., reverse=True)
+    # → ordena la lista resultante usando como criterio el tiempo de modificación del archivo
+    
+    # lambda p: p.stat().st_mtime
+    # → para cada archivo (p), obtiene su metadata del sistema
+    # → st_mtime = "modification time" (timestamp en segundos)
+    # → mientras más grande, más reciente es el archivo
+
+    files = sorted(
+        input_dir.glob(pattern),          # lista de archivos que coinciden con el patrón
+        key=lambda p: p.stat().st_mtime,   # criterio: fecha de última modificación
+        reverse=True                       # orden descendente (más reciente primero)
+    )
+
+    # Si la lista no está vacía:
+    # - files[0] es el archivo más reciente
+    # Si no hay archivos:
+    # - devuelve None (para que el caller lo maneje)
+    
+    return files[0] if files else None
+
+def received_times(directory: Path) -> dict[str, int]:
+    """
+    Fecha de recepción del correo de cada adjunto descargado en `directory`.
+
+    Sale del índice de adjuntos que mantiene la descarga de Outlook (ver
+    `src.download_from_outlook.download_attachments`). Archivos dejados a
+    mano (o descargados antes de que el índice guardara la fecha) no
+    aparecen.
+
+    Returns
+    -------
+    dict[str, int]
+        Nombre de archivo -> ReceivedTime en nanosegundos desde epoch (UTC).
+    """
+    try:
+        digests = json.loads((directory / DIGEST_INDEX_NAME).read_text(encoding="utf-8"))["digests"]
+    except (OSError, KeyError, ValueError):
+        return {}
+
+    return {
+        entry["file"]: int(datetime.fromisoformat(entry["received"]).timestamp() * 1_000_000) * 1000
+        for entry in digests.values()
+        if entry.get("received")
+    }
+
+
+def export_time(path: Path, received: dict[str, int] | None = None) -> int:
+    """
+    Momento del export (nanosegundos desde epoch), para ordenar snapshots.
+
+    Es la fecha de recepción del correo del que se descargó el archivo,
+    según el índice de adjuntos. La descarga también deja esa fecha como
+    fecha de modificación (el índice se escribe al final de la pasada y
+    el archivo se procesa apenas se guarda), pero una copia la pierde: por
+    eso el índice manda. Si el archivo no viene de Outlook se usa su
+    fecha de modificación.
+
+    Parameters
+    ----------
+    path : Path
+        Archivo de entrada (todavía en su directorio de descarga).
+    received : dict[str, int] | None
+        Resultado de `received_times` para el directorio del archivo, si
+        ya se leyó (ej: al ordenar varios archivos).
+    """
+    if received is None:
+        received = received_times(path.parent)
+    return received.get(path.name) or path.stat().st_mtime_ns
+
+
+def find_pending_files(input_dir: Path, pattern: str) -> list[Path]:
+    """
+    Retorna todos los archivos que coinciden con el patrón, ordenados
+    por fecha del export (más antiguos primero, ver `export_time`).
+
+    Parameters
+    ----------
+    input_dir : Path
+        Directorio donde buscar.
+    pattern : str
+        Patrón glob (ej: "*.csv", "opera_export_*.csv"). Acepta varios
+        separados por coma (ej: "opera_export_*.csv,opera_export_*.xlsx").
+
+    Returns
+    -------
+    list[Path]
+        Lista de archivos ordenada (oldest -> newest).
+    """
+    files = {f for p in _split_patterns(pattern) for f in input_dir.glob(p)}
+    received = received_times(input_dir)
+    return sorted(files, key=lambda p: export_time(p, received))     # Más antiguo primero
+
+def _split_patterns(pattern: str) -> list[str]:
+    return [p.strip() for p in pattern.split(",") if p.strip()]
+
+
+def matches_pattern(name: str, pattern: str) -> bool:
+    """
+    Indica si un nombre de archivo calza con el patrón (o alguno de los
+    patrones separados por coma). Mismo criterio que `find_pending_files`.
+    """
+    return any(fnmatch.fnmatch(name, p) for p in _split_patterns(pattern))
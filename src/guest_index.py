@@ -0,0 +1,500 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.names import CONFIDENCE_HIGH, CONFIDENCE_LOW, CONFIDENCE_MEDIUM, CONFIDENCE_NONE
+
+# Nombre del archivo SQLite dentro de state_dir
+GUEST_DB_NAME = "guest_index.sqlite"
+
+# Similitud mínima entre keys de nombre para considerar que son el mismo huésped
+NAME_MATCH_THRESHOLD = 0.88
+
+# Con la misma membresía basta un nombre razonablemente parecido (ej: iniciales)
+MEMBERSHIP_NAME_THRESHOLD = 0.6
+
+# Columnas (ya normalizadas) que se usan como señales adicionales si vienen en el export
+MEMBERSHIP_COLUMN = "membership_number"
+COMPANY_COLUMN = "company"
+
+# Orden de los niveles de confianza (ver src.names)
+_CONFIDENCE_LEVELS = [CONFIDENCE_NONE, CONFIDENCE_LOW, CONFIDENCE_MEDIUM, CONFIDENCE_HIGH]
+
+# Tabla de Soundex (letras sin código: vocales, h, w, y)
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def soundex(word: str) -> str:
+    """
+    Código fonético Soundex de una palabra (ej: "perez" -> "p620").
+
+    Palabras que no empiezan con una letra a-z (ej: nombres en otros
+    alfabetos) devuelven sus primeros 4 caracteres tal cual.
+    """
+    if not word or not ("a" <= word[0] <= "z"):
+        return word[:4]
+
+    code = word[0]
+    previous = _SOUNDEX_CODES.get(word[0], "")
+    for ch in word[1:]:
+        digit = _SOUNDEX_CODES.get(ch, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h y w no separan letras con el mismo código
+        if ch not in "hw":
+            previous = digit
+
+    return code.ljust(4, "0")
+
+
+def block_key(customer_key: str) -> str:
+    """
+    Key de bloqueo de un huésped: Soundex del primer apellido + inicio del nombre.
+
+    Solo se comparan entre sí huéspedes del mismo bloque, así el costo
+    de la comparación difusa no crece de forma cuadrática con el histórico.
+    Del Soundex se usan 3 caracteres (letra + 2 dígitos): con 4, una letra
+    de más o de menos al final ("liagouri" / "liagouris") cambia el bloque.
+    Del nombre se usan las 2 primeras letras, para que los apellidos
+    comunes no formen bloques enormes.
+    """
+    last, _, first = customer_key.partition("|")
+    last_words = last.split()
+    return f"{soundex(last_words[0])[:3] if last_words else ''}|{first[:2]}"
+
+
+@lru_cache(maxsize=65536)
+def _key_parts(customer_key: str) -> tuple[frozenset[str], str]:
+    # (palabras del apellido, primer nombre) de una key; se repiten mucho entre comparaciones
+    last, _, first = customer_key.partition("|")
+    first_words = first.split()
+    return frozenset(last.split()), first_words[0] if first_words else ""
+
+
+def _contained_name(a: str, b: str) -> bool:
+    # Mismo primer nombre (o uno es la inicial del otro: "j" / "jose") y
+    # apellidos de una key contenidos en los de la otra
+    words_a, first_a = _key_parts(a)
+    words_b, first_b = _key_parts(b)
+
+    if not first_a or not first_b:
+        return False
+    if len(first_a) == 1 or len(first_b) == 1:
+        if first_a[0] != first_b[0]:
+            return False
+    elif first_a != first_b:
+        return False
+
+    return bool(words_a and words_b) and (words_a <= words_b or words_b <= words_a)
+
+
+def name_similarity(a: str, b: str) -> float:
+    """
+    Similitud (0 a 1) entre dos keys "apellido|nombre".
+
+    Combina la similitud de texto (difflib) con una regla para el caso
+    típico de apellidos o nombres incompletos: si el primer nombre
+    coincide (o es la inicial del otro) y las palabras del apellido de una
+    key están contenidas en las de la otra ("perez|jose" vs
+    "perez soto|j"), se considera coincidencia.
+    """
+    if a == b:
+        return 1.0
+    if _contained_name(a, b):
+        return NAME_MATCH_THRESHOLD
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def best_match(key: str, candidates: list[str]) -> tuple[str | None, float]:
+    """
+    Busca la key más parecida a `key` dentro de un bloque.
+
+    Equivale a aplicar `name_similarity` contra cada candidato, pero
+    reutiliza el mismo SequenceMatcher (el análisis de `key` se hace una
+    vez) y descarta candidatos con las cotas baratas de difflib
+    (`real_quick_ratio`, `quick_ratio`) antes de calcular `ratio`.
+
+    Returns
+    -------
+    tuple[str | None, float]
+        (mejor candidato con similitud >= NAME_MATCH_THRESHOLD o None, similitud).
+    """
+    matcher = SequenceMatcher(None, autojunk=False)
+    matcher.set_seq2(key)
+
+    best_key, best_score = None, 0.0
+    for other in candidates:
+        if other == key:
+            return other, 1.0
+
+        if _contained_name(key, other):
+            score = NAME_MATCH_THRESHOLD
+        else:
+            # Cotas superiores de ratio(): si no alcanzan, no vale la pena calcularlo
+            bound = max(best_score, NAME_MATCH_THRESHOLD)
+            matcher.set_seq1(other)
+            if matcher.real_quick_ratio() < bound or matcher.quick_ratio() < bound:
+                continue
+            score = matcher.ratio()
+
+        if score >= NAME_MATCH_THRESHOLD and score > best_score:
+            best_key, best_score = other, score
+
+    return best_key, best_score
+
+
+def _upgrade(confidence: str, levels: int) -> str:
+    # Sube `levels` niveles de confianza, sin pasar de "high"
+    position = _CONFIDENCE_LEVELS.index(confidence) if confidence in _CONFIDENCE_LEVELS else 0
+    return _CONFIDENCE_LEVELS[min(position + levels, len(_CONFIDENCE_LEVELS) - 1)]
+
+
+@dataclass
+class GuestStats:
+    """
+    Conteo de huéspedes vistos desde que se abrió el índice.
+
+    Attributes
+    ----------
+    new : int
+        Huéspedes creados (primera vez que aparecen).
+    returning : set[int]
+        IDs de huéspedes vistos con más de una reserva distinta (la misma
+        reserva en otro export, o el mismo archivo reprocesado, no cuenta).
+    """
+
+    new: int = 0
+    returning: set[int] = field(default_factory=set)
+
+
+@dataclass
+class _Guest:
+    """
+    Huésped conocido (cargado desde el índice o creado en esta corrida).
+    """
+
+    guest_id: int
+    membership: str | None = None
+    properties: set[str] = field(default_factory=set)
+    company: str | None = None
+    source_file: str = ""
+    reservations: set[str] = field(default_factory=set)
+    dirty: bool = False
+
+
+class GuestIndex:
+    """
+    Índice local (SQLite) de huéspedes para detectar clientes recurrentes.
+
+    Asigna un `guest_id` estable a cada reserva según su key de nombre
+    (`customer_key_name`) y, si vienen en el export, número de membresía,
+    propiedad y empresa:
+
+    - Misma key ya vista -> mismo huésped ("exact").
+    - Misma membresía y nombre parecido -> mismo huésped ("membership").
+    - Key parecida dentro del mismo bloque (ver `block_key`) -> mismo
+      huésped ("fuzzy"); la key nueva queda como alias.
+    - Si no, huésped nuevo ("new").
+
+    Cuando varias señales coinciden (membresía, propiedad o empresa ya
+    vistas para ese huésped) se sube `customer_key_confidence`.
+
+    Cada huésped guarda sus confirmation_number: como la misma reserva
+    viene en exports sucesivos (y un archivo se puede reprocesar), solo
+    una reserva distinta lo marca como recurrente o confirma sus señales.
+
+    Cada llamada a `assign` es una transacción: los IDs nuevos se guardan
+    de inmediato, así reprocesar un archivo devuelve los mismos IDs y los
+    workers en paralelo no asignan el mismo ID a huéspedes distintos.
+    """
+
+    def __init__(self, state_dir: Path):
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self.path = state_dir / GUEST_DB_NAME
+
+        # isolation_level=None: las transacciones se abren a mano (BEGIN IMMEDIATE)
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS guests (
+                guest_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                membership_number TEXT,
+                properties TEXT NOT NULL DEFAULT '',
+                company TEXT,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                source_file TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS guests_membership ON guests (membership_number);
+
+            CREATE TABLE IF NOT EXISTS guest_keys (
+                customer_key TEXT PRIMARY KEY,
+                block_key TEXT NOT NULL,
+                guest_id INTEGER NOT NULL REFERENCES guests (guest_id)
+            );
+            CREATE INDEX IF NOT EXISTS guest_keys_block ON guest_keys (block_key);
+
+            CREATE TABLE IF NOT EXISTS guest_reservations (
+                guest_id INTEGER NOT NULL REFERENCES guests (guest_id),
+                confirmation_number TEXT NOT NULL,
+                PRIMARY KEY (guest_id, confirmation_number)
+            );
+            """
+        )
+
+        self.stats = GuestStats()
+
+    def _load_candidates(self, blocks: list[str], memberships: list[str]):
+        """
+        Carga las keys de los bloques indicados y los huéspedes involucrados.
+
+        Igual que en los otros índices, los valores buscados se cargan en
+        tablas temporales y se cruzan con un JOIN.
+        """
+        cur = self._conn.cursor()
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS incoming_blocks (block_key TEXT PRIMARY KEY)")
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS incoming_members (membership_number TEXT PRIMARY KEY)")
+        cur.execute("DELETE FROM incoming_blocks")
+        cur.execute("DELETE FROM incoming_members")
+        cur.executemany("INSERT OR IGNORE INTO incoming_blocks VALUES (?)", ((b,) for b in blocks))
+        cur.executemany("INSERT OR IGNORE INTO incoming_members VALUES (?)", ((m,) for m in memberships))
+
+        # Huéspedes candidatos: los de los bloques y los de las membresías del archivo
+        cur.execute("DROP TABLE IF EXISTS temp.candidates")
+        cur.execute(
+            """
+            CREATE TEMP TABLE candidates AS
+            SELECT k.guest_id FROM incoming_blocks b JOIN guest_keys k USING (block_key)
+            UNION
+            SELECT g.guest_id FROM incoming_members m JOIN guests g USING (membership_number)
+            """
+        )
+
+        key_rows = cur.execute(
+            """
+            SELECT k.customer_key, k.block_key, k.guest_id
+            FROM candidates c
+            JOIN guest_keys k USING (guest_id)
+            """
+        ).fetchall()
+
+        guest_rows = cur.execute(
+            """
+            SELECT g.guest_id, g.membership_number, g.properties, g.company, g.source_file
+            FROM candidates c
+            JOIN guests g USING (guest_id)
+            """
+        ).fetchall()
+
+        guests = {
+            gid: _Guest(gid, membership, set(filter(None, properties.split(","))), company, source_file)
+            for gid, membership, properties, company, source_file in guest_rows
+        }
+
+        reservation_rows = cur.execute(
+            """
+            SELECT r.guest_id, r.confirmation_number
+            FROM candidates c
+            JOIN guest_reservations r USING (guest_id)
+            """
+        ).fetchall()
+        for gid, confirmation in reservation_rows:
+            guests[gid].reservations.add(confirmation)
+
+        return key_rows, guests
+
+    def assign(self, df: pd.DataFrame, source_name: str) -> pd.DataFrame:
+        """
+        Agrega `guest_id` y `guest_match` al DataFrame y ajusta la confianza.
+
+        Trabaja sobre combinaciones únicas de (key, membresía, propiedad,
+        empresa) y vuelve a expandir el resultado a todas las filas.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame ya transformado (con 'customer_key_name' y
+            'customer_key_confidence').
+        source_name : str
+            Archivo de origen (queda registrado en los huéspedes nuevos).
+
+        Returns
+        -------
+        pd.DataFrame
+            El mismo DataFrame con las columnas 'guest_id' (Int64),
+            'guest_match' ("new", "exact", "fuzzy", "membership" o nulo)
+            y 'customer_key_confidence' actualizada.
+        """
+        if df.empty:
+            df["guest_id"] = pd.array([], dtype="Int64")
+            df["guest_match"] = pd.Series(dtype=object)
+            return df
+
+        def column(name):
+            # Señales opcionales: se usan solo si el export las trae
+            if name not in df.columns:
+                return pd.Series("", index=df.index, dtype="string")
+            return df[name].astype("string").str.strip().fillna("")
+
+        identities = pd.MultiIndex.from_arrays(
+            [
+                df["customer_key_name"].astype("string").fillna("|"),
+                df["customer_key_confidence"].astype("string").fillna(CONFIDENCE_NONE),
+                column(MEMBERSHIP_COLUMN),
+                column("property"),
+                column(COMPANY_COLUMN),
+            ]
+        )
+        codes, uniques = identities.factorize()
+
+        # Reservas de cada combinación única (para no contar la misma reserva dos veces)
+        pairs = pd.DataFrame({"code": codes, "confirmation": column("confirmation_number")})
+        pairs = pairs[pairs["confirmation"] != ""].drop_duplicates()
+        reservations_by_code = pairs.groupby("code")["confirmation"].agg(set).to_dict()
+
+        blocks = {key: block_key(key) for key in dict.fromkeys(uniques.get_level_values(0))}
+        memberships = [m for m in dict.fromkeys(uniques.get_level_values(2)) if m]
+
+        now = datetime.now().isoformat(timespec="seconds")
+        cur = self._conn.cursor()
+
+        # Bloquea la base para escritura durante toda la asignación (workers en paralelo)
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            key_rows, guests = self._load_candidates(list(set(blocks.values())), memberships)
+
+            key_to_guest = {key: gid for key, _, gid in key_rows}
+            keys_by_block: dict[str, list[str]] = {}
+            keys_by_guest: dict[int, list[str]] = {}
+            for key, block, gid in key_rows:
+                keys_by_block.setdefault(block, []).append(key)
+                keys_by_guest.setdefault(gid, []).append(key)
+
+            by_membership = {g.membership: g.guest_id for g in guests.values() if g.membership}
+            new_keys = []
+            new_reservations = []
+
+            results = []
+            for code, (key, confidence, membership, prop, company) in enumerate(uniques):
+                reservations = reservations_by_code.get(code, set())
+                usable_name = confidence in (CONFIDENCE_MEDIUM, CONFIDENCE_HIGH)
+                guest_id, match = key_to_guest.get(key), "exact"
+
+                # Membresía: señal fuerte, pero solo si el nombre también se parece
+                if guest_id is None and membership and membership in by_membership:
+                    candidate = by_membership[membership]
+                    known_keys = keys_by_guest.get(candidate, [])
+                    if not known_keys or max(name_similarity(key, k) for k in known_keys) >= MEMBERSHIP_NAME_THRESHOLD:
+                        guest_id, match = candidate, "membership"
+
+                # Comparación difusa solo dentro del bloque y con nombres completos
+                if guest_id is None and usable_name:
+                    best_key, _ = best_match(key, keys_by_block.get(blocks[key], []))
+                    if best_key is not None:
+                        guest_id, match = key_to_guest[best_key], "fuzzy"
+
+                if guest_id is None:
+                    # Sin nombre utilizable ni membresía conocida: no se asigna huésped
+                    if confidence == CONFIDENCE_NONE:
+                        results.append((pd.NA, None, confidence))
+                        continue
+
+                    cur.execute(
+                        "INSERT INTO guests (first_seen, last_seen, source_file) VALUES (?, ?, ?)",
+                        (now, now, source_name),
+                    )
+                    guest_id, match = cur.lastrowid, "new"
+                    guests[guest_id] = _Guest(guest_id, source_file=source_name)
+                    self.stats.new += 1
+
+                guest = guests[guest_id]
+
+                if len(guest.reservations | reservations) > 1:
+                    self.stats.returning.add(guest_id)
+
+                # Solo cuenta lo visto en otra reserva del huésped: la misma
+                # reserva en otro export (o el mismo archivo reprocesado) no
+                # debe "confirmarse" a sí misma
+                independent = bool(guest.reservations - reservations)
+
+                # Señales que coinciden con lo ya visto para este huésped
+                signals = 0
+                if independent and (match == "membership" or (membership and membership == guest.membership)):
+                    signals += 2
+                if independent and match != "new":
+                    if prop and prop in guest.properties:
+                        signals += 1
+                    if company and company == guest.company:
+                        signals += 1
+                if match == "fuzzy":
+                    # La coincidencia difusa ya consume una señal
+                    signals = max(signals - 1, 0)
+
+                results.append((guest_id, match, _upgrade(confidence, min(signals, 2))))
+
+                # Actualiza lo conocido del huésped para las filas siguientes
+                if key not in key_to_guest and confidence != CONFIDENCE_NONE:
+                    key_to_guest[key] = guest_id
+                    keys_by_block.setdefault(blocks[key], []).append(key)
+                    keys_by_guest.setdefault(guest_id, []).append(key)
+                    new_keys.append((key, blocks[key], guest_id))
+                if membership and guest.membership is None:
+                    guest.membership = membership
+                    by_membership[membership] = guest_id
+                    guest.dirty = True
+                if prop and prop not in guest.properties:
+                    guest.properties.add(prop)
+                    guest.dirty = True
+                if company and guest.company is None:
+                    guest.company = company
+                    guest.dirty = True
+                if match != "new":
+                    guest.dirty = True
+                new_reservations.extend((guest_id, c) for c in reservations - guest.reservations)
+                guest.reservations |= reservations
+
+            cur.executemany("INSERT OR IGNORE INTO guest_keys VALUES (?, ?, ?)", new_keys)
+            cur.executemany("INSERT OR IGNORE INTO guest_reservations VALUES (?, ?)", new_reservations)
+            cur.executemany(
+                """
+                UPDATE guests
+                SET membership_number = ?, properties = ?, company = ?, last_seen = ?
+                WHERE guest_id = ?
+                """,
+                (
+                    (g.membership, ",".join(sorted(g.properties)), g.company, now, g.guest_id)
+                    for g in guests.values() if g.dirty
+                ),
+            )
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+        # Una fila por combinación única -> se expande a todas las filas con los códigos
+        table = np.array(results, dtype=object).reshape(-1, 3)[codes]
+
+        df["guest_id"] = pd.array(table[:, 0], dtype="Int64")
+        df["guest_match"] = table[:, 1]
+        df["customer_key_confidence"] = table[:, 2]
+
+        return df
+
+    def close(self) -> None:
+        self._conn.close()
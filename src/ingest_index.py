@@ -0,0 +1,217 @@
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.transform import normalize_header
+
+# Nombre del archivo SQLite dentro de state_dir
+INDEX_DB_NAME = "reservation_index.sqlite"
+
+# Columna (ya normalizada) que identifica una reserva
+KEY_COLUMN = "confirmation_number"
+
+
+@dataclass
+class IngestStats:
+    """
+    Conteo de reservas por estado al compararlas contra el índice.
+
+    Attributes
+    ----------
+    inserted : int
+        Reservas que no estaban en el índice.
+    updated : int
+        Reservas conocidas cuyo contenido cambió.
+    unchanged : int
+        Reservas idénticas a la última versión vista (se omiten).
+    """
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Calcula un hash de contenido (int64) por fila.
+
+    Se hashea la representación en texto de cada celda, con las columnas
+    en orden alfabético, para que el resultado no dependa del dtype que
+    pandas infiera en cada archivo (ej: columna vacía como float vs texto).
+    """
+    cols = sorted(df.columns)
+    hashes = pd.util.hash_pandas_object(df[cols].astype(str), index=False)
+    # SQLite guarda enteros con signo de 64 bits
+    return hashes.to_numpy().view(np.int64)
+
+
+class ReservationIndex:
+    """
+    Índice local (SQLite) de reservas ya ingeridas.
+
+    Guarda, por `confirmation_number`, el hash del contenido de la última
+    versión vista, cuándo se vio por primera/última vez y en qué archivo.
+    Permite que `process_file` transforme y escriba solo las reservas
+    nuevas o modificadas, haciendo la ingesta idempotente aunque los
+    exports de Opera se solapen día a día.
+
+    Uso:
+    - `filter_new_or_changed(df)` por cada DataFrame/bloque leído
+    - `take_pending()` una vez que el output se escribió bien
+    - `commit(source_name, hashes)` al confirmar el archivo, en orden de
+      export (ver `src.main.commit_file_state`)
+    - `close()` siempre al final
+
+    Los cambios quedan en memoria hasta `commit`, así un archivo que falla
+    a mitad de camino no marca sus reservas como procesadas, y la escritura
+    a SQLite es una transacción corta (no bloquea a otros workers). Con
+    --workers los hashes viajan de vuelta al proceso principal y se
+    confirman ahí, así el índice termina con la versión del export más
+    reciente aunque los workers terminen en otro orden.
+    """
+
+    def __init__(self, state_dir: Path):
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self.path = state_dir / INDEX_DB_NAME
+
+        # timeout: con --workers varios procesos pueden escribir a la vez
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS reservations (
+                confirmation_number TEXT PRIMARY KEY,
+                content_hash INTEGER NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                source_file TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+        self._pending: dict[str, int] = {}
+        self.stats = IngestStats()
+
+    def _stored_hashes(self, keys: list[str]) -> dict[str, int]:
+        """
+        Obtiene los hashes guardados para las keys indicadas.
+
+        Las keys se cargan en una tabla temporal y se cruzan con un JOIN,
+        para no armar un IN (...) gigante ni leer el índice completo.
+        """
+        cur = self._conn.cursor()
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (confirmation_number TEXT PRIMARY KEY)")
+        cur.execute("DELETE FROM incoming")
+        cur.executemany("INSERT OR IGNORE INTO incoming VALUES (?)", ((k,) for k in keys))
+        rows = cur.execute(
+            """
+            SELECT r.confirmation_number, r.content_hash
+            FROM incoming i
+            JOIN reservations r USING (confirmation_number)
+            """
+        ).fetchall()
+        self._conn.commit()
+        return dict(rows)
+
+    def filter_new_or_changed(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Deja solo las filas nuevas o modificadas respecto del índice.
+
+        Funciona sobre el DataFrame crudo (antes de transformar), ubicando
+        la columna de confirmación con la misma normalización de headers
+        del pipeline. Filas sin número de confirmación pasan siempre.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame o bloque recién leído.
+
+        Returns
+        -------
+        pd.DataFrame
+            Filas nuevas o modificadas (el mismo objeto si no se descarta nada).
+
+        Raises
+        ------
+        ValueError
+            Si el archivo no trae columna de confirmación.
+        """
+        key_col = next((c for c in df.columns if normalize_header(c) == KEY_COLUMN), None)
+        if key_col is None:
+            raise ValueError(f"Falta columna requerida para el índice de ingesta: '{KEY_COLUMN}'")
+
+        key_values = df[key_col]
+        keys = key_values.astype(str).where(key_values.notna(), None).tolist()
+        hashes = _row_hashes(df).tolist()
+
+        stored = self._stored_hashes([k for k in dict.fromkeys(keys) if k is not None and k not in self._pending])
+
+        keep = np.ones(len(df), dtype=bool)
+        for i, (key, h) in enumerate(zip(keys, hashes)):
+            if key is None:
+                continue
+
+            previous = self._pending.get(key, stored.get(key))
+            if previous is None:
+                self.stats.inserted += 1
+            elif previous != h:
+                self.stats.updated += 1
+            else:
+                self.stats.unchanged += 1
+                keep[i] = False
+
+            self._pending[key] = h
+
+        if keep.all():
+            return df
+        return df.take(np.flatnonzero(keep))
+
+    def take_pending(self) -> dict[str, int]:
+        """
+        Entrega (y olvida) los hashes vistos desde el último commit.
+
+        Returns
+        -------
+        dict[str, int]
+            Hash de contenido por número de confirmación, listo para
+            `commit` (es picklable: puede volver desde un worker).
+        """
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def commit(self, source_name: str, hashes: dict[str, int] | None = None) -> None:
+        """
+        Persiste en el índice las reservas vistas desde el último commit.
+
+        Parameters
+        ----------
+        source_name : str
+            Nombre del archivo de origen (queda registrado como último visto).
+        hashes : dict[str, int] | None
+            Hashes a persistir (ver `take_pending`). Si es None, los
+            pendientes de esta instancia.
+        """
+        if hashes is None:
+            hashes = self.take_pending()
+
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO reservations (confirmation_number, content_hash, first_seen, last_seen, source_file)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(confirmation_number) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    last_seen = excluded.last_seen,
+                    source_file = excluded.source_file
+                """,
+                ((k, h, now, now, source_name) for k, h in hashes.items()),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
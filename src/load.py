@@ -1,14 +1,511 @@
+from collections.abc import Iterable
 from pathlib import Path
 from datetime import datetime
+import glob
+import importlib.util
+import os
 import shutil
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+from src.transform import NORMALIZED_DTYPES, NORMALIZED_DATE_COLUMNS
+from src.rate_rules import RATE_ATTRIBUTE_DTYPES
+
+# xlsxwriter es opcional: escribe el Excel bastante más rápido que openpyxl
+HAS_XLSXWRITER = importlib.util.find_spec("xlsxwriter") is not None
+
+# Formato de salida por defecto (ver OUTPUT_BACKENDS)
+DEFAULT_OUTPUT_FORMATS = ("excel",)
+
+# Carpeta (dentro de output_dir) del histórico acumulado en Parquet
+RESERVATION_STORE_DIRNAME = "reservations"
+
+# Límite de filas de datos por hoja de Excel (1.048.576 menos el encabezado)
+EXCEL_MAX_ROWS = 1_048_575
+
+# Filas que se convierten a objetos Python a la vez al escribir el Excel
+EXCEL_WRITE_BATCH = 10_000
+
+# Formatos de número de la salida Excel (mismo formato de fecha que Opera)
+EXCEL_DATE_FORMAT = "dd-mm-yyyy"
+EXCEL_AMOUNT_FORMAT = "#,##0.00"
+EXCEL_AMOUNT_COLUMNS = {"rate", "balance"}
+
+# Día 0 de las fechas de Excel (sistema 1900, con el 29-02-1900 ficticio)
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+
+# Tipos fijos del histórico: columnas del export + columnas derivadas numéricas/booleanas
+STORE_DTYPES = {**NORMALIZED_DTYPES, "guest_id": "Int64", **RATE_ATTRIBUTE_DTYPES}
+
+
+def _claim_output_path(output_dir: Path, stem: str, suffix: str) -> Path:
+    """
+    Reserva un nombre de archivo libre en output_dir.
+
+    Si `stem + suffix` ya existe, prueba `stem_2`, `stem_3`, ... El nombre
+    se reserva creando el archivo vacío en modo exclusivo ("x"), así dos
+    workers que escriben el mismo día nunca obtienen el mismo nombre.
+
+    Parameters
+    ----------
+    output_dir : Path
+        Directorio de salida (debe existir).
+    stem : str
+        Nombre base sin extensión (ej: "opera_clean_2026-01-21").
+    suffix : str
+        Extensión con punto (ej: ".xlsx").
+
+    Returns
+    -------
+    Path
+        Ruta reservada (archivo vacío que el writer reemplaza al cerrar).
+    """
+    n = 1
+    while True:
+        name = f"{stem}{suffix}" if n == 1 else f"{stem}_{n}{suffix}"
+        candidate = output_dir / name
+        try:
+            with open(candidate, "x"):
+                pass
+            return candidate
+        except FileExistsError:
+            n += 1
+
+
+def _sheet_title(title: str, taken: list[str]) -> str:
+    """
+    Nombre de hoja válido para Excel: sin caracteres prohibidos, de a lo
+    más 31 caracteres y distinto de las hojas existentes.
+    """
+    title = title.translate(str.maketrans({c: "_" for c in "[]:*?/\\"})).strip("'")[:31] or "unknown"
+    candidate, n = title, 2
+    while candidate.lower() in {t.lower() for t in taken}:
+        suffix = f"~{n}"
+        candidate, n = title[:31 - len(suffix)] + suffix, n + 1
+    return candidate
+
+
+def _daily_stem(prefix: str = "opera_clean") -> str:
+    """
+    Nombre base del output del día (ej: opera_clean_2026-01-21).
+    """
+    date_str = datetime.now().strftime("%Y-%m-%d")
+    return f"{prefix}_{date_str}"
+
+
+class ExcelOutput:
+    """
+    Salida Excel (presentación), escrita por bloques.
+
+    Las filas se vuelcan a disco a medida que llegan (xlsxwriter en modo
+    `constant_memory` si está instalado, si no openpyxl en modo
+    write-only) y cada bloque se convierte a objetos Python de a
+    `EXCEL_WRITE_BATCH` filas, por lo que la memoria no depende del total
+    de filas (tampoco cuando llega el archivo completo como un único
+    bloque).
+
+    Fechas y montos se escriben con formato de número: el formato se
+    define una vez por columna y se reutiliza en todas las celdas, en vez
+    de resolverlo celda a celda. Las fechas van como número de serie de
+    Excel, calculado por columna.
+
+    Si una hoja llega al máximo de filas de Excel se continúa en otra
+    ("Sheet1 (2)", ...). `ExcelByPropertyOutput` además separa una hoja
+    por propiedad.
+    """
+
+    # Una hoja por valor de "property" (ver ExcelByPropertyOutput)
+    split_by_property = False
+    # Prefijo del nombre de archivo (ver _daily_stem)
+    file_prefix = "opera_clean"
+
+    def __init__(self, output_dir: Path, source_name: str, export_time: int | None = None):
+        self.path = _claim_output_path(output_dir, _daily_stem(self.file_prefix), ".xlsx")
+        self._tmp_path = output_dir / f".{self.path.stem}.{os.getpid()}.tmp.xlsx"
+        if HAS_XLSXWRITER:
+            import xlsxwriter
+
+            self._wb = xlsxwriter.Workbook(str(self._tmp_path), {
+                "constant_memory": True,
+                # Texto tal cual (ej: un nombre que empieza con "=")
+                "strings_to_formulas": False,
+                "strings_to_urls": False,
+            })
+        else:
+            self._wb = Workbook(write_only=True)
+
+        self._columns: list[str] | None = None
+        self._formats: dict[int, str] = {}
+        self._titles: list[str] = []
+        # clave (propiedad o "Sheet1") -> [hoja actual, formatos por columna, filas, número de hoja]
+        self._sheets: dict[str, list] = {}
+
+    def _prepare(self, chunk: pd.DataFrame) -> None:
+        """
+        Columnas de la salida y formato de número por columna (posición).
+        """
+        self._columns = list(chunk.columns)
+        for j, c in enumerate(self._columns):
+            if pd.api.types.is_datetime64_any_dtype(chunk[c]):
+                self._formats[j] = EXCEL_DATE_FORMAT
+            elif c in EXCEL_AMOUNT_COLUMNS:
+                self._formats[j] = EXCEL_AMOUNT_FORMAT
+
+    def _open_sheet(self, key: str, part: int) -> list:
+        title = _sheet_title(key if part == 1 else f"{key} ({part})", self._titles)
+        self._titles.append(title)
+
+        if HAS_XLSXWRITER:
+            ws = self._wb.add_worksheet(title)
+            ws.write_row(0, 0, self._columns)
+            # Un objeto Format por columna, compartido por todas sus celdas
+            styles = {j: self._wb.add_format({"num_format": f}) for j, f in self._formats.items()}
+        else:
+            ws = self._wb.create_sheet(title)
+            ws.append(self._columns)
+            # Una celda con formato por columna, reutilizada en todas las filas:
+            # openpyxl escribe cada fila al recibirla, así que no se pisan
+            styles = {}
+            for j, number_format in self._formats.items():
+                styles[j] = WriteOnlyCell(ws)
+                styles[j].number_format = number_format
+
+        return [ws, styles, 0, part]
+
+    def _excel_values(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fechas -> número de serie de Excel (días desde 1899-12-30).
+        """
+        data = chunk.copy(deep=False)
+        for j, number_format in self._formats.items():
+            if number_format == EXCEL_DATE_FORMAT:
+                c = self._columns[j]
+                data[c] = (data[c] - EXCEL_EPOCH) / pd.Timedelta(days=1)
+        return data
+
+    @staticmethod
+    def _write_rows(ws, styles: dict, rows: Iterable[tuple], first_row: int) -> None:
+        if HAS_XLSXWRITER:
+            # write_row no acepta formato por celda: se escribe celda a celda
+            for r, row in enumerate(rows, first_row):
+                for j, value in enumerate(row):
+                    if value is None:
+                        continue
+                    if j in styles:
+                        ws.write_number(r, j, value, styles[j])
+                    else:
+                        ws.write(r, j, value)
+            return
+
+        for row in rows:
+            if styles:
+                row = list(row)
+                for j, cell in styles.items():
+                    if row[j] is not None:
+                        cell.value = row[j]
+                        row[j] = cell
+            ws.append(row)
+
+    def _append(self, key: str, data: pd.DataFrame) -> None:
+        sheet = self._sheets.get(key)
+        if sheet is None:
+            sheet = self._sheets[key] = self._open_sheet(key, 1)
+
+        start = 0
+        while start < len(data):
+            ws, styles, rows, part = sheet
+            if rows >= EXCEL_MAX_ROWS:
+                sheet = self._sheets[key] = self._open_sheet(key, part + 1)
+                continue
+
+            batch = data.iloc[start:start + min(EXCEL_WRITE_BATCH, EXCEL_MAX_ROWS - rows)]
+            # NaN/NaT -> celda vacía (igual que to_excel)
+            values = batch.astype(object).where(batch.notna(), None)
+            self._write_rows(ws, styles, values.itertuples(index=False, name=None), rows + 1)
+
+            sheet[2] += len(batch)
+            start += len(batch)
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self._columns is None:
+            self._prepare(chunk)
+
+        data = self._excel_values(chunk)
+        if not self.split_by_property or "property" not in chunk.columns:
+            self._append("Sheet1", data)        # mismo nombre de hoja que df.to_excel
+            return
+
+        prop = chunk["property"].astype("string").fillna("unknown")
+        for key, part in data.groupby(prop, sort=False):
+            self._append(key, part)
+
+    def close(self) -> Path:
+        if not self._sheets:
+            # Solo bloques vacíos: igual se deja la hoja con encabezados
+            self._open_sheet("Sheet1", 1)
+
+        # Escritura atómica: se guarda en un temporal y se reemplaza el nombre reservado
+        if HAS_XLSXWRITER:
+            self._wb.close()
+        else:
+            self._wb.save(self._tmp_path)
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self._tmp_path.unlink(missing_ok=True)
+        self.path.unlink(missing_ok=True)
+
+
+class ExcelByPropertyOutput(ExcelOutput):
+    """
+    Salida Excel con una hoja por propiedad (formato "excel_by_property").
+
+    Usa su propio nombre (opera_clean_by_property_<fecha>.xlsx) para no
+    tomar el número siguiente de la salida "excel" del mismo día.
+    """
+
+    split_by_property = True
+    file_prefix = "opera_clean_by_property"
+
+
+class CsvOutput:
+    """
+    Salida CSV plana, escrita por bloques (append).
+    """
+
+    def __init__(self, output_dir: Path, source_name: str, export_time: int | None = None):
+        self.path = _claim_output_path(output_dir, _daily_stem(), ".csv")
+        self._tmp_path = output_dir / f".{self.path.stem}.{os.getpid()}.tmp.csv"
+        self._header_written = False
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        chunk.to_csv(
+            self._tmp_path,
+            mode="a" if self._header_written else "w",
+            header=not self._header_written,
+            index=False,
+            encoding="utf-8",
+        )
+        self._header_written = True
+
+    def close(self) -> Path:
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self._tmp_path.unlink(missing_ok=True)
+        self.path.unlink(missing_ok=True)
+
+
+class ParquetStoreOutput:
+    """
+    Histórico acumulado de reservas en Parquet, particionado por
+    propiedad y mes de llegada (formato "hive"):
+
+        reservations/property=ALMASPDV/arrival_month=2026-01/<export>-<archivo>-0000.parquet
+
+    Es un log de solo agregado: cada export suma sus filas y la misma
+    reserva queda una vez por export en que aparece. Cada fila lleva
+    `source_file` (archivo de origen) y `exported_at` (fecha del export,
+    UTC) para quedarse con la versión vigente al leer (ver
+    `read_reservation_store`).
+
+    Cada export escribe sus propias partes, nombradas por la fecha del
+    export (nanosegundos) y el archivo de origen: reprocesar el mismo
+    export las reemplaza en vez de duplicarlas, y un export posterior que
+    reutiliza el nombre de archivo (ej: adjunto diario de Outlook) no toca
+    las de los anteriores. Con ingesta incremental ese export escribe solo
+    las reservas que cambiaron, y las demás siguen vigentes en las partes
+    anteriores.
+
+    El esquema es fijo: columnas numéricas/fecha según el esquema de Opera y
+    el resto como texto, para que todas las partes se puedan leer juntas.
+    """
+
+    def __init__(self, output_dir: Path, source_name: str, export_time: int | None = None):
+        self.path = output_dir / RESERVATION_STORE_DIRNAME
+        self._source_name = source_name
+        self._exported_at = (
+            pd.Timestamp(export_time, unit="ns", tz="UTC") if export_time is not None
+            else pd.Timestamp.now(tz="UTC")
+        )
+        # Prefijo de las partes: identifica el export, no solo el nombre del archivo
+        self._part_prefix = f"{self._exported_at.value}-{source_name}"
+        self._chunk_no = 0
+        self._written: list[Path] = []
+
+    @staticmethod
+    def _with_store_schema(chunk: pd.DataFrame) -> pd.DataFrame:
+        casts = {}
+        for c in chunk.columns:
+            if c in NORMALIZED_DATE_COLUMNS:
+                continue
+            dtype = STORE_DTYPES.get(c)
+            casts[c] = dtype if dtype in ("Int64", "float64", "boolean") else "string"
+        return chunk.astype(casts)
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        data = self._with_store_schema(chunk)
+
+        arrival = chunk["arrival"] if "arrival" in chunk.columns else pd.Series(pd.NaT, index=chunk.index)
+        month = pd.to_datetime(arrival, errors="coerce").dt.strftime("%Y-%m").fillna("unknown")
+        prop = data["property"].fillna("unknown")
+
+        # La propiedad va en la ruta, no dentro del archivo
+        data = data.drop(columns=["property"])
+        data["source_file"] = pd.Series(self._source_name, index=data.index, dtype="string")
+        data["exported_at"] = self._exported_at
+
+        for (prop_value, month_value), part in data.groupby([prop, month], sort=False, observed=True):
+            part_dir = self.path / f"property={prop_value}" / f"arrival_month={month_value}"
+            part_dir.mkdir(parents=True, exist_ok=True)
+
+            part_path = part_dir / f"{self._part_prefix}-{self._chunk_no:04d}.parquet"
+            tmp_path = part_dir / f".{part_path.name}.{os.getpid()}.tmp"
+            part.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, part_path)
+
+            self._written.append(part_path)
+
+        self._chunk_no += 1
+
+    def _stale_parts(self) -> list[Path]:
+        # Partes de una corrida anterior del mismo export que esta vez no se escribieron
+        written = set(self._written)
+        pattern = f"*/*/{glob.escape(self._part_prefix)}-*.parquet"
+        return [
+            p for p in self.path.glob(pattern)
+            # El prefijo exacto: "opera" no debe tomar las partes de "opera-2"
+            if p.stem.rsplit("-", 1)[0] == self._part_prefix and p not in written
+        ]
+
+    def close(self) -> Path:
+        for p in self._stale_parts():
+            p.unlink(missing_ok=True)
+        return self.path
+
+    def abort(self) -> None:
+        for p in self._written:
+            p.unlink(missing_ok=True)
+
+
+def read_reservation_store(output_dir: Path) -> pd.DataFrame:
+    """
+    Lee el histórico Parquet dejando la última versión de cada reserva.
+
+    El histórico guarda una fila por reserva y export (ver
+    `ParquetStoreOutput`); acá se deja, por confirmation_number, la fila
+    del export más reciente. Una reserva que desaparece de los exports
+    posteriores (ej: cancelada) conserva su última versión.
+
+    Parameters
+    ----------
+    output_dir : Path
+        Directorio de salida (el histórico vive en output_dir/reservations).
+
+    Returns
+    -------
+    pd.DataFrame
+        Reservas vigentes, con `property` y `arrival_month` tomadas de la ruta.
+    """
+    df = pd.read_parquet(output_dir / RESERVATION_STORE_DIRNAME)
+
+    # Filas sin confirmation_number no se pueden versionar: se dejan todas
+    df = df.sort_values(["exported_at", "source_file"], kind="stable")
+    keyed = df["confirmation_number"].notna()
+    latest = df[keyed].drop_duplicates("confirmation_number", keep="last")
+    return pd.concat([latest, df[~keyed]]).sort_index().reset_index(drop=True)
+
+
+OUTPUT_BACKENDS = {
+    "excel": ExcelOutput,
+    "excel_by_property": ExcelByPropertyOutput,
+    "csv": CsvOutput,
+    "parquet": ParquetStoreOutput,
+}
+
+
+def write_outputs(
+        chunks: Iterable[pd.DataFrame],
+        output_dir: Path,
+        formats: Iterable[str] = DEFAULT_OUTPUT_FORMATS,
+        source_name: str = "output",
+        export_time: int | None = None,
+) -> tuple[dict[str, Path], int]:
+    """
+    Escribe los datos procesados en uno o más formatos de salida.
+
+    Recibe bloques de filas (un DataFrame completo es simplemente un único
+    bloque) y los va pasando a cada backend, por lo que funciona igual con
+    la lectura completa y con la lectura por bloques.
+
+    Si no llega ningún bloque no se genera ningún archivo. Si algo falla
+    a mitad de camino, se descartan los archivos parciales de todos los
+    backends y se relanza la excepción.
+
+    Parameters
+    ----------
+    chunks : Iterable[pd.DataFrame]
+        Bloques ya transformados, todos con las mismas columnas.
+    output_dir : Path
+        Directorio de salida.
+    formats : Iterable[str], optional
+        Formatos a generar: "excel", "csv" y/o "parquet".
+    source_name : str, optional
+        Nombre del archivo de origen (sin extensión). Identifica las partes
+        del histórico Parquet.
+    export_time : int | None, optional
+        Fecha del export en nanosegundos (ver `src.files.export_time`).
+        Versiona las filas del histórico Parquet; None = ahora.
+
+    Returns
+    -------
+    tuple[dict[str, Path], int]
+        Ruta generada por formato (vacío si no hubo bloques) y total de
+        filas escritas.
+
+    Raises
+    ------
+    ValueError
+        Si se pide un formato desconocido.
+    """
+    unknown = set(formats) - set(OUTPUT_BACKENDS)
+    if unknown:
+        raise ValueError(f"Formatos de salida desconocidos: {sorted(unknown)}")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    writers = {}
+    rows = 0
+    try:
+        for chunk in chunks:
+            # Los writers se crean con el primer bloque: sin bloques no hay archivos
+            if not writers:
+                for fmt in formats:
+                    writers[fmt] = OUTPUT_BACKENDS[fmt](output_dir, source_name, export_time)
+
+            for writer in writers.values():
+                writer.write(chunk)
+            rows += len(chunk)
+
+        paths = {fmt: writer.close() for fmt, writer in writers.items()}
+    except Exception:
+        for writer in writers.values():
+            writer.abort()
+        raise
+
+    return paths, rows
+
 
 def save_output(df: pd.DataFrame, output_dir: Path) -> Path:
     """
-    Guarda el DataFrame procesado como archivo de salida.
+    Guarda el DataFrame procesado como archivo Excel de salida.
 
     El nombre del archivo incluye la fecha para facilitar
-    la trazabilidad diaria.
+    la trazabilidad diaria. Si ya existe un output del día,
+    se agrega un sufijo numérico (_2, _3, ...) en vez de sobrescribirlo.
 
     Parameters
     ----------
@@ -22,25 +519,9 @@ def save_output(df: pd.DataFrame, output_dir: Path) -> Path:
     Path
         Ruta del archivo generado.
     """
-    # Crea el directorio de salida si no existe
-    # parents=True permite crear carpetas intermedias
-    # exist_ok=True evita error si ya existe
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Obtiene la fecha actual en formato YYYY-MM-DD
-    # Se usa para versionar el output por día
-    date_str = datetime.now().strftime("%Y-%m-%d")
-
-    # Construye la ruta completa del archivo de salida
-    # Ejemplo: opera_clean_2026-01-21.xlsx
-    output_path = output_dir / f"opera_clean_{date_str}.xlsx"
-
-    # Escribe el DataFrame a un archivo Excel
-    # index=False evita que se escriba el índice del DataFrame
-    df.to_excel(output_path, index=False)
+    paths, _ = write_outputs([df], output_dir, formats=("excel",))
+    return paths["excel"]
 
-    # Devuelve la ruta del archivo generado
-    return output_path
 
 def archive_file(file_path: Path, archive_dir:Path) -> Path:
     """
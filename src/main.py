@@ -1,93 +1,785 @@
+import argparse
+import logging
+import os
+import queue
+from collections import deque
+from dataclasses import dataclass
+from logging.handlers import BufferingHandler
+from pathlib import Path
+
+# Solo módulos livianos al cargar: pandas, openpyxl y los índices se importan
+# recién al procesar un archivo (ver process_file), y Outlook y el pool de
+# procesos recién al usarlos, así una corrida sin pendientes termina en
+# milisegundos (ver scripts/bench_startup.py)
 from src.config import get_settings
-from src.download_from_outlook import fetch_mail_attachments
-from src.utils_logging import setup_logger
-from src.extract import find_pending_files, read_export
-from src.transform import normalize_columns, validate, basic_clean, split_name, build_customer_key_name
-from src.load import save_output, archive_file
+from src.utils_logging import log_file_path, setup_logger
+from src.files import export_time, find_pending_files, matches_pattern
+from src.metrics import RunMetrics
+from src.watch import AlreadyRunningError, InstanceLock, ShutdownRequest, watch_loop
+
+# Adjuntos descargados que pueden esperar en cola antes de que el hilo de
+# Outlook se bloquee (ver process_streaming)
+STREAM_QUEUE_SIZE = 8
+
+# Archivos enviados al pool por worker a la vez (ver process_files_parallel)
+PARALLEL_IN_FLIGHT = 2
+
+@dataclass
+class FileState:
+    """
+    Lo que queda de un archivo procesado para confirmar en orden de export.
+
+    El pace compara cada export contra el anterior, y las tablas diarias y
+    el índice de ingesta toman cada export como la foto vigente del libro
+    de reservas, así que se confirman de a un archivo y en orden de export, siempre en el
+    proceso principal (ver `commit_file_state`). Con --workers cada worker
+    devuelve su FileState (es picklable) en vez de confirmarlo él mismo.
 
-def process_file(file_path, settings, logger, archive_dir):
+    Attributes
+    ----------
+    file_path : Path
+        Archivo de entrada (se archiva al confirmar).
+    export_time : int
+        Fecha del export en nanosegundos (ver `src.files.export_time`).
+    snapshot : Snapshot | None
+        Snapshot compacto para el pace (None si el pace está desactivado).
+    aggregates : AggregateBatch | None
+        Reservas para las tablas diarias (None si están desactivadas).
+    ingest_hashes : dict[str, int] | None
+        Hashes para el índice de ingesta (None si la ingesta incremental
+        está desactivada; ver `src.ingest_index.ReservationIndex`).
+    """
+
+    file_path: Path
+    export_time: int
+    snapshot: "Snapshot | None" = None
+    aggregates: "AggregateBatch | None" = None
+    ingest_hashes: "dict[str, int] | None" = None
+
+
+def process_file(file_path, settings, logger, archive_dir, metrics=None, defer_commit=False):
     """
     Procesa un archivo individual (CSV/XLSX):
     - lee
     - transforma/valida
     - genera output
-    - archiva input
+    - confirma índice de ingesta, pace y tablas diarias, y archiva input
+      (ver `commit_file_state`)
+
+    Cada etapa queda medida en `metrics` (tiempo, filas y pico de RSS).
+
+    Con `defer_commit=True` (workers del pool) no se confirman el índice de
+    ingesta, el pace ni las tablas diarias ni se archiva el archivo: se devuelve el `FileState` para que el proceso
+    principal lo confirme en orden de export.
+
+    Returns
+    -------
+    FileState | None
+        Estado pendiente de confirmar si `defer_commit`, si no None.
     """
+    from src.aggregates import AggregateBatch
+    from src.extract import read_export
+    from src.guest_index import GuestIndex
+    from src.ingest_index import ReservationIndex
+    from src.load import write_outputs
+    from src.names import NameMemo
+    from src.pace import PaceTracker
+    from src.rate_rules import load_rate_rules
+    from src.transform import transform_export
+    from src.validation import Quarantine, RowValidator
+
     logger.info(f"Procesando archivo: {file_path.name}")
 
-    df = read_export(file_path)
-    logger.info(f"Filas leídas: {len(df)}")
+    metrics = metrics if metrics is not None else RunMetrics()
+    name = file_path.name
 
-    df = normalize_columns(df)
-    validate(df)
-    df = basic_clean(df)
+    # Índice de reservas ya ingeridas (solo si la ingesta incremental está activa)
+    index = ReservationIndex(settings.state_dir) if settings.incremental_ingest else None
 
-    df = split_name(df)
-    df = build_customer_key_name(df)
+    # Nombres ya normalizados en corridas anteriores (huéspedes frecuentes)
+    name_memo = NameMemo(settings.state_dir)
 
-    output_path = save_output(df, settings.output_dir)
-    logger.info(f"Output generado: {output_path}")
+    # Reglas de tarifa (desayuno, canal, reembolsable), compiladas una vez por archivo
+    rate_rules = load_rate_rules(settings.rate_rules_file)
 
-    archived_path = archive_file(file_path, archive_dir)
-    logger.info(f"Archivo archivado en: {archived_path}")
+    # Validación por fila: las filas rechazadas van a output_dir/quarantine_<archivo>.csv
+    validator = RowValidator(settings.known_properties)
+    quarantine = Quarantine(settings.output_dir, file_path.stem)
+
+    # Índice de huéspedes (guest_id estable entre archivos)
+    guests = GuestIndex(settings.state_dir) if settings.enable_guest_index else None
+
+    # Tablas diarias de ocupación y revenue (se aplican al confirmar el archivo)
+    aggregates = AggregateBatch() if settings.enable_daily_aggregates else None
+
+    # Pickup / pace contra el snapshot anterior (fecha del export, antes de archivarlo)
+    pace = PaceTracker(settings.state_dir) if settings.enable_pace_report else None
+    state = FileState(file_path, export_time(file_path))
+
+    try:
+        if settings.read_chunksize:
+            output_paths = _process_file_chunked(
+                file_path, settings, logger, index, name_memo, guests, aggregates, pace, rate_rules,
+                validator, quarantine, metrics, state.export_time,
+            )
+        else:
+            with metrics.stage("read_export", name) as m:
+                df = read_export(file_path)
+                m.add_rows(rows_out=len(df))
+            logger.info(f"Filas leídas: {len(df)}")
+
+            # El pace y las tablas diarias ven el export completo, antes del filtro incremental
+            if pace is not None:
+                with metrics.stage("pace", name):
+                    pace.observe(df)
+
+            if aggregates is not None:
+                with metrics.stage("daily_aggregates", name):
+                    aggregates.observe(df)
+
+            if index is not None:
+                with metrics.stage("ingest_index", name) as m:
+                    m.add_rows(rows_in=len(df))
+                    df = index.filter_new_or_changed(df)
+                    m.add_rows(rows_out=len(df))
+
+            # normalize -> validate -> clean -> split -> key, sin copias intermedias
+            with metrics.stage("transform_export", name) as m:
+                m.add_rows(rows_in=len(df))
+                df = transform_export(
+                    df, name_memo=name_memo, rate_rules=rate_rules, validator=validator, quarantine=quarantine
+                )
+                m.add_rows(rows_out=len(df))
+
+            if guests is not None:
+                with metrics.stage("guest_index", name):
+                    df = guests.assign(df, file_path.name)
+
+            if aggregates is not None:
+                with metrics.stage("daily_aggregates", name):
+                    aggregates.add(df)
+
+            # Con ingesta incremental, sin reservas nuevas no se genera output
+            chunks = [df] if index is None or len(df) else []
+
+            with metrics.stage("write_outputs", name) as m:
+                output_paths, rows_written = write_outputs(
+                    chunks,
+                    settings.output_dir,
+                    formats=settings.output_formats,
+                    source_name=file_path.stem,
+                    export_time=state.export_time,
+                )
+                m.add_rows(rows_in=len(df), rows_out=rows_written)
 
+        quarantine_path = quarantine.close()
+        if quarantine_path is not None:
+            reasons = ", ".join(f"{r}: {n}" for r, n in quarantine.reasons.most_common())
+            logger.warning(f"Filas en cuarentena: {quarantine.rows} ({reasons}) -> {quarantine_path}")
 
+        # Etapa propia: es escritura en SQLite, no parte de la transformación
+        with metrics.stage("name_memo", name):
+            name_memo.commit()
 
-def main() -> None:
+        state.aggregates = aggregates
+        if pace is not None:
+            with metrics.stage("pace", name):
+                state.snapshot = pace.snapshot()
+
+        # El índice se actualiza recién cuando el output quedó escrito (al confirmar)
+        if index is not None:
+            state.ingest_hashes = index.take_pending()
+            stats = index.stats
+            logger.info(
+                f"Reservas nuevas: {stats.inserted} | modificadas: {stats.updated} "
+                f"| sin cambios: {stats.unchanged}"
+            )
+
+        if guests is not None:
+            logger.info(
+                f"Huéspedes nuevos: {guests.stats.new} | recurrentes: {len(guests.stats.returning)}"
+            )
+    finally:
+        quarantine.abort()
+        name_memo.close()
+        if guests is not None:
+            guests.close()
+        if index is not None:
+            index.close()
+
+    if not output_paths:
+        logger.info("Sin reservas nuevas o modificadas: no se genera output")
+
+    for fmt, output_path in output_paths.items():
+        logger.info(f"Output generado ({fmt}): {output_path}")
+
+    if defer_commit:
+        return state
+
+    commit_file_state(state, settings, logger, archive_dir, metrics)
+    return None
+
+
+def commit_file_state(state, settings, logger, archive_dir, metrics=None) -> None:
     """
-    Punto de entrada principal del pipeline de automatización.
+    Confirma índice de ingesta, tablas diarias y pace de un archivo ya procesado, y lo archiva.
 
-    Orquesta el flujo completo:
-    - carga configuración
-    - inicializa logging
-    - detecta archivo de entrada
-    - extrae datos
-    - transforma y valida
-    - genera output
-    - archiva input
-    - registra todo en logs
+    Corre en el proceso principal, de a un archivo y en orden de export
+    (el de `find_pending_files` y el de la cola de Outlook): así cada
+    export se compara contra el anterior, y el índice de ingesta y las
+    tablas diarias quedan con el export más reciente aunque los workers
+    terminen en otro orden. El archivo se archiva recién al final, de modo que si algo
+    falla queda en el directorio de entrada para la próxima corrida.
     """
-    settings = get_settings()                                           # Carga configuración desde .env (rutas, patrones, etc.)
-    logger = setup_logger(settings.log_dir)                             # Inicializa logger y define dónde se guardarán los logs
+    from src.aggregates import DailyAggregates
+    from src.ingest_index import ReservationIndex
+    from src.load import archive_file
+    from src.pace import PaceTracker
 
-    logger.info("Inicio de ejecución del pipeline")
-    
-    # descargar adjuntos desde Outlook a carpeta local
-    if settings.enable_outlook_download:
+    metrics = metrics if metrics is not None else RunMetrics()
+    file_path = state.file_path
+    name = file_path.name
+
+    if state.ingest_hashes is not None:
+        index = ReservationIndex(settings.state_dir)
         try:
-            saved = fetch_mail_attachments(
-                outlook_folder_path=settings.outlook_folder_path,
-                output_dir=settings.mail_input_dir,
-                allowed_ext=settings.mail_allowed_ext,
-                processed_folder_name=settings.outlook_processed_folder,
-                logger=logger,
+            with metrics.stage("ingest_index", name):
+                index.commit(name, state.ingest_hashes)
+        finally:
+            index.close()
+
+    if state.aggregates is not None:
+        aggregates = DailyAggregates(settings.state_dir)
+        try:
+            with metrics.stage("daily_aggregates", name):
+                applied = aggregates.apply(state.aggregates, state.export_time)
+                aggregates.commit()
+
+            stats = aggregates.stats
+            if applied:
+                logger.info(
+                    f"Agregados diarios: reservas modificadas {stats.changed} | eliminadas {stats.removed} "
+                    f"| fechas recalculadas {stats.dates}"
+                )
+            else:
+                logger.warning("Agregados diarios: hay un export más reciente ya aplicado; se omite este archivo")
+
+            if aggregates.needs_export:
+                try:
+                    with metrics.stage("daily_aggregates", name):
+                        daily_path = aggregates.export(settings.output_dir)
+                    logger.info(f"Tabla diaria actualizada: {daily_path}")
+                except OSError as e:
+                    # Ej: el Excel está abierto en otro equipo; se reintenta en el próximo archivo
+                    logger.warning(f"No se pudo escribir {e.filename}: {e}")
+        finally:
+            aggregates.close()
+
+    if state.snapshot is not None:
+        try:
+            with metrics.stage("pace", name):
+                pace_path = PaceTracker(settings.state_dir).commit(
+                    state.snapshot, file_path.stem, state.export_time, settings.output_dir
+                )
+        except OSError as e:
+            pace_path = None
+            logger.warning(f"No se pudo escribir {e.filename}: {e}")
+
+        if pace_path is not None:
+            logger.info(f"Reporte de pace generado: {pace_path}")
+        else:
+            logger.info("Sin snapshot anterior: el pace se calcula desde el próximo archivo")
+
+    with metrics.stage("archive_file", name):
+        archived_path = archive_file(file_path, archive_dir)
+    logger.info(f"Archivo archivado en: {archived_path}")
+
+
+def _process_file_chunked(
+        file_path, settings, logger, index=None, name_memo=None, guests=None, aggregates=None, pace=None,
+        rate_rules=None, validator=None, quarantine=None, metrics=None, export_time=None
+):
+    """
+    Lectura/transformación/escritura por bloques para archivos grandes.
+
+    Lee el archivo en bloques de `settings.read_chunksize` filas, transforma
+    cada bloque y lo escribe de inmediato en el output, sin tener nunca el
+    archivo completo en memoria.
+
+    Si se entrega `index`, cada bloque se filtra dejando solo reservas
+    nuevas o modificadas; los bloques que quedan vacíos se omiten.
+    Si se entrega `name_memo`, los nombres se normalizan una vez por
+    archivo (y por corrida) aunque se repitan entre bloques. Si se entrega
+    `guests`, cada bloque recibe sus guest_id antes de escribirse, y si se
+    entregan `aggregates` (AggregateBatch) o `pace`, cada bloque se suma
+    al lote de agregados / snapshot del archivo (ambos ven el bloque
+    completo, antes del filtro incremental; el caller hace los commits).
+    `rate_rules` agrega a cada bloque los atributos de tarifa, y las
+    filas que `validator` rechaza se escriben en `quarantine`.
+    Cada etapa se acumula por bloque en `metrics` ("write_outputs" mide
+    solo la escritura: lectura y transformaciones quedan en sus etapas).
+
+    Returns
+    -------
+    dict[str, Path]
+        Ruta del output generado por formato.
+    """
+    from src.extract import read_export
+    from src.load import write_outputs
+    from src.transform import transform_export
+
+    logger.info(f"Lectura por bloques de {settings.read_chunksize} filas")
+
+    metrics = metrics if metrics is not None else RunMetrics()
+    name = file_path.name
+    rows_read = 0
+
+    def transformed_chunks():
+        nonlocal rows_read
+        chunks = read_export(file_path, chunksize=settings.read_chunksize)
+        for chunk in metrics.iter_stage("read_export", name, chunks):
+            rows_read += len(chunk)
+
+            if pace is not None:
+                with metrics.stage("pace", name):
+                    pace.observe(chunk)
+
+            if aggregates is not None:
+                with metrics.stage("daily_aggregates", name):
+                    aggregates.observe(chunk)
+
+            if index is not None:
+                with metrics.stage("ingest_index", name) as m:
+                    m.add_rows(rows_in=len(chunk))
+                    chunk = index.filter_new_or_changed(chunk)
+                    m.add_rows(rows_out=len(chunk))
+                if chunk.empty:
+                    continue
+
+            with metrics.stage("transform_export", name) as m:
+                m.add_rows(rows_in=len(chunk))
+                chunk = transform_export(
+                    chunk, name_memo=name_memo, rate_rules=rate_rules, validator=validator, quarantine=quarantine
+                )
+                m.add_rows(rows_out=len(chunk))
+
+            if guests is not None:
+                with metrics.stage("guest_index", name):
+                    chunk = guests.assign(chunk, file_path.name)
+
+            if aggregates is not None:
+                with metrics.stage("daily_aggregates", name):
+                    aggregates.add(chunk)
+
+            yield chunk
+
+    with metrics.stage("write_outputs", name) as m:
+        output_paths, rows_written = write_outputs(
+            transformed_chunks(),
+            settings.output_dir,
+            formats=settings.output_formats,
+            source_name=file_path.stem,
+            export_time=export_time,
+        )
+        m.add_rows(rows_out=rows_written)
+    logger.info(f"Filas leídas: {rows_read}")
+    logger.info(f"Filas escritas: {rows_written}")
+
+    return output_paths
+
+
+class _RecordBuffer(BufferingHandler):
+    """
+    Handler que acumula los LogRecords emitidos dentro de un worker.
+
+    Los records se dejan "serializables" (mensaje ya formateado, sin args
+    ni exc_info) para poder devolverlos al proceso padre vía pickle y
+    re-emitirlos en el logger principal.
+    """
+
+    def __init__(self):
+        super().__init__(capacity=0)
+
+    def shouldFlush(self, record) -> bool:
+        # Nunca se vacía solo: el buffer completo vuelve al proceso padre
+        return False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Igual que QueueHandler.prepare: congela el mensaje y el traceback
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.buffer.append(record)
+
+
+def _process_file_worker(file_path, settings, archive_dir):
+    """
+    Ejecuta `process_file` dentro de un proceso del pool.
+
+    El archivo no se archiva acá: el proceso principal confirma el
+    `FileState` devuelto (ver `commit_file_state`).
+
+    Returns
+    -------
+    tuple[list[logging.LogRecord], list[StageMetric], str | None, FileState | None]
+        Records de log generados, métricas por etapa, mensaje de error
+        (None si terminó bien) y estado pendiente de confirmar.
+    """
+    # Logger propio del worker: no propaga para no escribir directo
+    # en los handlers heredados del padre (fork en Linux)
+    logger = logging.getLogger(f"hotel_automation.worker.{os.getpid()}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.handlers.clear()
+
+    buffer = _RecordBuffer()
+    logger.addHandler(buffer)
+
+    metrics = RunMetrics()
+    error = None
+    state = None
+    try:
+        state = process_file(
+            file_path=file_path,
+            settings=settings,
+            logger=logger,
+            archive_dir=archive_dir,
+            metrics=metrics,
+            defer_commit=True,
+        )
+    except Exception as e:
+        # Mismo criterio que la corrida secuencial: el archivo queda sin archivar
+        error = str(e)
+    finally:
+        logger.removeHandler(buffer)
+
+    return buffer.buffer, metrics.records, error, state
+
+
+def _worker_pool(workers: int, stop=None):
+    """
+    Pool de procesos para los workers de archivos.
+
+    Con `stop` (apagado ordenado, modo watch) los workers ignoran las
+    señales de apagado: las atiende solo el proceso principal, que deja de
+    enviar archivos, y cada worker termina el que tiene en curso.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    initializer = ShutdownRequest.ignore_signals if stop is not None else None
+    return ProcessPoolExecutor(max_workers=workers, initializer=initializer)
+
+
+def process_files_parallel(
+        pending_files, settings, logger, archive_dir, workers: int, metrics=None, stop=None
+) -> list[Path]:
+    """
+    Procesa varios archivos en paralelo usando un pool de procesos.
+
+    Cada archivo conserva la semántica de la corrida secuencial: si falla,
+    se registra el error y el archivo no se archiva. Los logs de cada
+    worker se re-emiten en el logger principal en el mismo orden de
+    `pending_files`, por lo que el log final se lee igual que uno secuencial,
+    y en ese mismo orden (el del export) se confirma cada archivo en este
+    proceso (ver `commit_file_state`), sin importar qué worker termine antes.
+
+    Los archivos se envían al pool a medida que hay lugar (a lo más
+    PARALLEL_IN_FLIGHT por worker), no todos de una vez: así, si se activa
+    `stop`, no se envían más y el apagado espera solo los que ya están en
+    curso (los enviados que el pool aún no empezó se cancelan).
+
+    Parameters
+    ----------
+    pending_files : list[Path]
+        Archivos a procesar (oldest -> newest).
+    settings : Settings
+        Configuración del pipeline.
+    logger : logging.Logger
+        Logger principal ("hotel_automation").
+    archive_dir : Path
+        Directorio donde se archivan los inputs procesados.
+    workers : int
+        Número máximo de procesos.
+    metrics : RunMetrics | None
+        Métricas de la corrida; recibe las de cada worker.
+    stop : threading.Event | None
+        Si se activa, no se envían más archivos (apagado ordenado).
+
+    Returns
+    -------
+    list[Path]
+        Archivos enviados al pool (los que se intentaron procesar).
+    """
+    submitted = []
+    in_flight = deque()
+
+    with _worker_pool(workers, stop) as pool:
+        for f in pending_files:
+            # Se esperan en orden de envío (no de término): orden del log y del export
+            if len(in_flight) >= workers * PARALLEL_IN_FLIGHT:
+                _log_worker_result(*in_flight.popleft(), settings, logger, archive_dir, metrics)
+
+            if stop is not None and stop.is_set():
+                break
+
+            in_flight.append((f, pool.submit(_process_file_worker, f, settings, archive_dir)))
+            submitted.append(f)
+
+        while in_flight:
+            f, future = in_flight.popleft()
+            # Con apagado pedido, los que aún esperan en el pool no se empiezan
+            if stop is not None and stop.is_set() and future.cancel():
+                submitted.remove(f)
+                continue
+            _log_worker_result(f, future, settings, logger, archive_dir, metrics)
+
+    return submitted
+
+
+def _process_one(file_path, settings, logger, archive_dir, metrics=None) -> None:
+    """
+    Procesa un archivo en el proceso actual, registrando el error si falla.
+    """
+    try:
+        process_file(
+            file_path=file_path,
+            settings=settings,
+            logger=logger,
+            archive_dir=archive_dir,
+            metrics=metrics,
+        )
+    except Exception as e:
+        # No matamos toda la corrida por un archivo malo
+        logger.error(f"Error procesando {file_path.name}: {e}")
+
+
+def _log_worker_result(file_path, future, settings, logger, archive_dir, metrics=None) -> None:
+    """
+    Espera el resultado de un worker, re-emite sus logs en el logger
+    principal, incorpora sus métricas y confirma su `FileState`.
+    """
+    try:
+        records, stage_metrics, error, state = future.result()
+    except Exception as e:
+        # Ej: BrokenProcessPool si un worker muere
+        logger.error(f"Error procesando {file_path.name}: {e}")
+        return
+
+    for record in records:
+        logger.handle(record)
+
+    if metrics is not None:
+        metrics.extend(stage_metrics)
+
+    if error is not None:
+        logger.error(f"Error procesando {file_path.name}: {error}")
+        return
+
+    try:
+        commit_file_state(state, settings, logger, archive_dir, metrics)
+    except Exception as e:
+        logger.error(f"Error procesando {file_path.name}: {e}")
+
+
+def process_streaming(
+        settings, logger, archive_dir, workers: int, metrics=None, session=None, stop=None
+) -> set[Path]:
+    """
+    Descarga adjuntos de Outlook y procesa cada uno apenas queda guardado.
+
+    El hilo de Outlook (`AttachmentProducer`) hace todo el trabajo COM y
+    publica cada adjunto nuevo en una cola acotada; este hilo los consume a
+    medida que llegan. Así el primer output sale tras descargar el primer
+    adjunto, no tras recorrer la carpeta completa.
+
+    Con `workers > 1` cada archivo se envía al pool de procesos apenas llega;
+    los logs de los workers se re-emiten, y cada archivo se confirma (ver
+    `commit_file_state`), en orden de llegada: el de los correos, del más
+    antiguo al más reciente.
+
+    Parameters
+    ----------
+    settings : Settings
+        Configuración del pipeline.
+    logger : logging.Logger
+        Logger principal ("hotel_automation").
+    archive_dir : Path
+        Directorio donde se archivan los inputs procesados.
+    workers : int
+        Número máximo de procesos (1 = en este mismo proceso).
+    metrics : RunMetrics | None
+        Métricas de la corrida (descarga de Outlook y cada archivo).
+    session : OutlookSession | None
+        Conexión a Outlook reutilizada entre pasadas (modo watch). Si es
+        None, se conecta solo para esta descarga.
+    stop : threading.Event | None
+        Si se activa, los adjuntos que siguen llegando no se procesan:
+        quedan en el directorio de entrada para la próxima corrida.
+
+    Returns
+    -------
+    set[Path]
+        Archivos que se intentaron procesar (con o sin éxito), para no
+        repetirlos al revisar los pendientes del directorio.
+    """
+    from src.download_from_outlook import AttachmentProducer
+
+    file_queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+
+    producer = AttachmentProducer(
+        file_queue,
+        session=session,
+        outlook_folder_path=settings.outlook_folder_path,
+        output_dir=settings.mail_input_dir,
+        allowed_ext=settings.mail_allowed_ext,
+        processed_folder_name=settings.outlook_processed_folder,
+        logger=logger,
+        state_dir=settings.state_dir,
+    )
+    producer.start()
+
+    attempted = set()
+    pool = _worker_pool(workers, stop) if workers > 1 else None
+    in_flight = deque()
+
+    try:
+        # None = el hilo de Outlook terminó (bien o con error)
+        while (file_path := file_queue.get()) is not None:
+            # Mismo criterio que find_pending_files: solo exports de Opera.
+            # Con apagado pedido se sigue vaciando la cola (el hilo de Outlook no se bloquea)
+            if not matches_pattern(file_path.name, settings.opera_pattern):
+                continue
+            if stop is not None and stop.is_set():
+                continue
+
+            attempted.add(file_path)
+
+            if pool is None:
+                _process_one(file_path, settings, logger, archive_dir, metrics)
+                continue
+
+            in_flight.append(
+                (file_path, pool.submit(_process_file_worker, file_path, settings, archive_dir))
             )
-            logger.info(f"Adjuntos descargados desde Outlook: {saved}")                     # Marca inicio de ejecución (útil para auditoría y debugging)
-        except Exception as e:
-            # Para mockup, NO matar todo el pipeline por falla Outlook.
-            logger.warning(f"Falla al descargar adjuntos desde Outlook: {e}")
-    
-    # downloaded = fetch_mail_attachments(
-    #     outlook_folder_path=settings.outlook_folder_path,
-    #     output_dir=settings.mail_input_dir,
-    #     allowed_ext=settings.mail_allowed_ext,
-    #     logger=logger
-    # )
 
-    # if downloaded:
-    #     logger.info(f"Adjuntos descargados desde Outlook: {downloaded}")
+            # Re-emite los logs (y confirma) los que ya terminaron, sin bloquear la cola
+            while in_flight and in_flight[0][1].done():
+                _log_worker_result(*in_flight.popleft(), settings, logger, archive_dir, metrics)
 
-    # fetch_mail_attachments(
-    #     outlook_folder_path=settings.outlook_folder_path,
-    #     output_dir=settings.mail_input_dir,  # O settings.mail_input_dir si lo separamos
-    #     allowed_ext=settings.mail_allowed_ext,
-    #     processed_folder_name=settings.outlook_processed_folder,
-    #     logger=logger
-    # )
+        while in_flight:
+            _log_worker_result(*in_flight.popleft(), settings, logger, archive_dir, metrics)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    producer.join()
+
+    if metrics is not None:
+        # Tiempo del hilo de Outlook (corre en paralelo al procesamiento)
+        metrics.record("outlook", producer.elapsed)
+
+    if producer.error is not None:
+        # Para mockup, NO matar todo el pipeline por falla Outlook.
+        logger.warning(f"Falla al descargar adjuntos desde Outlook: {producer.error}")
+    else:
+        logger.info(f"Adjuntos descargados desde Outlook: {producer.saved}")
+
+    return attempted
+
+
+def _write_run_metrics(metrics, logger) -> None:
+    """
+    Registra la línea de resumen y escribe las métricas junto al log de la corrida.
+    """
+    logger.info(f"Resumen: {metrics.summary()}")
+
+    log_path = log_file_path(logger)
+    if log_path is None:
+        return
+
+    try:
+        json_path, _ = metrics.write(log_path)
+        logger.info(f"Métricas de la corrida: {json_path}")
+    except OSError as e:
+        # Las métricas no deben tumbar una corrida que ya terminó
+        logger.warning(f"No se pudieron escribir las métricas: {e}")
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Interpreta los argumentos de línea de comandos.
+
+    Parameters
+    ----------
+    argv : list[str] | None
+        Argumentos a interpretar. Si es None, usa sys.argv.
+
+    Returns
+    -------
+    argparse.Namespace
+        Argumentos interpretados.
+    """
+    parser = argparse.ArgumentParser(description="Pipeline de reportes Opera")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Procesos en paralelo para los archivos pendientes (1 = secuencial)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Queda corriendo y revisa Outlook y el directorio de entrada cada --interval segundos",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=None,
+        help="Segundos entre pasadas en modo --watch (por defecto WATCH_INTERVAL_SECONDS)",
+    )
+    args = parser.parse_args(argv)
 
-    # Decide desde qué carpeta leer archivos:
-    # - Si Outlook está habilitado → usa carpeta de adjuntos descargados
-    # - Si no → usa input_dir tradicional
+    if args.workers < 1:
+        parser.error("--workers debe ser >= 1")
+    if args.interval is not None and args.interval <= 0:
+        parser.error("--interval debe ser > 0")
+
+    return args
+
+
+def run_once(
+        settings, logger, workers: int, metrics, skip=frozenset(), quiet: bool = False, stop=None, session=None
+) -> set[Path]:
+    """
+    Una pasada del pipeline: adjuntos de Outlook (si está activo) y luego
+    los archivos pendientes del directorio de entrada.
+
+    Parameters
+    ----------
+    settings : Settings
+        Configuración del pipeline.
+    logger : logging.Logger
+        Logger principal ("hotel_automation").
+    workers : int
+        Procesos en paralelo (1 = secuencial).
+    metrics : RunMetrics
+        Métricas de la corrida.
+    skip : set[Path], optional
+        Pendientes a ignorar (en modo watch: los que ya fallaron y no cambiaron).
+    quiet : bool, optional
+        No avisar cuando no hay nada que procesar (modo watch).
+    stop : threading.Event | None, optional
+        Si se activa, no se empiezan más archivos pendientes (apagado ordenado).
+    session : OutlookSession | None, optional
+        Conexión a Outlook compartida entre pasadas (modo watch).
+
+    Returns
+    -------
+    set[Path]
+        Archivos que se intentaron procesar (con o sin éxito).
+    """
     effective_input_dir = (
         settings.mail_input_dir
         if settings.enable_outlook_download
@@ -100,28 +792,167 @@ def main() -> None:
         else settings.archive_dir
     )
 
-    # Busca todos los archivos pendientes y procésalos
-    pending_files = find_pending_files(effective_input_dir, settings.opera_pattern)
+    # descargar adjuntos desde Outlook a carpeta local (se procesan mientras se descargan)
+    streamed = set()
+    if settings.enable_outlook_download:
+        streamed = process_streaming(
+            settings=settings,
+            logger=logger,
+            archive_dir=effective_archive_dir,
+            workers=workers,
+            metrics=metrics,
+            session=session,
+            stop=stop,
+        )
+
+    # Pendientes que ya estaban en el directorio (ej: corridas anteriores que fallaron)
+    pending_files = [
+        f for f in find_pending_files(effective_input_dir, settings.opera_pattern)
+        if f not in streamed and f not in skip
+    ]
 
     if not pending_files:
-        logger.warning("No se encontraron archivos para procesar")
-        return
+        if not streamed and not quiet:
+            logger.warning("No se encontraron archivos para procesar")
+        return streamed
 
     logger.info(f"Archivos pendientes: {len(pending_files)}")
 
-    for f in pending_files:
-        try:
-            process_file(
-                file_path=f,
-                settings=settings,
-                logger=logger,
-                archive_dir=effective_archive_dir,
-            )
-        except Exception as e:
-            # No matamos toda la corrida por un archivo malo
-            logger.error(f"Error procesando {f.name}: {e}")
+    workers = min(workers, len(pending_files))
+    attempted = set(streamed)
+
+    if workers > 1:
+        logger.info(f"Procesando en paralelo con {workers} workers")
+        submitted = process_files_parallel(
+            pending_files=pending_files,
+            settings=settings,
+            logger=logger,
+            archive_dir=effective_archive_dir,
+            workers=workers,
+            metrics=metrics,
+            stop=stop,
+        )
+        attempted.update(submitted)
+    else:
+        for f in pending_files:
+            if stop is not None and stop.is_set():
+                break
+            _process_one(f, settings, logger, effective_archive_dir, metrics)
+            attempted.add(f)
+
+    return attempted
+
+
+def run_watch(settings, logger, workers: int, interval: float) -> None:
+    """
+    Modo `--watch`: proceso tibio que repite `run_once` cada `interval` segundos.
+
+    Evita pagar en cada revisión el arranque del intérprete, los imports
+    (pandas) y la carga de configuración, así la latencia entre que llega
+    un export y sale su output baja del intervalo del Programador de
+    tareas a unos segundos.
+
+    Un archivo que falla queda en el directorio de entrada (como en la
+    corrida normal); para no reintentarlo en cada pasada se recuerda su
+    fecha de modificación y se vuelve a intentar solo si cambia.
+
+    Con Outlook activo, la conexión (CoInitialize + Dispatch) se abre una
+    vez para todo el modo watch y cada pasada la reutiliza (ver
+    `src.download_from_outlook.OutlookSession`).
+
+    Cada pasada tiene sus propias métricas (un `RunMetrics` nuevo), así el
+    metrics.json que deja cada una no repite las etapas de las anteriores.
+
+    Ctrl+C / SIGTERM terminan el archivo en curso y salen (ver
+    `src.watch.ShutdownRequest`).
+    """
+    from contextlib import nullcontext
+
+    failed: dict[Path, int] = {}
+    session = None
+
+    def tick():
+        skip = set()
+        for path, mtime in list(failed.items()):
+            try:
+                if path.stat().st_mtime_ns == mtime:
+                    skip.add(path)
+            except FileNotFoundError:
+                del failed[path]
+
+        metrics = RunMetrics()
+        attempted = run_once(
+            settings, logger, workers, metrics, skip=skip, quiet=True, stop=shutdown.stop, session=session
+        )
+        if not attempted:
+            return
+
+        # Un archivo procesado con éxito queda archivado: si sigue en su lugar, falló
+        for path in attempted:
+            try:
+                failed[path] = path.stat().st_mtime_ns
+                logger.warning(f"{path.name} no se reintentará hasta que el archivo cambie")
+            except FileNotFoundError:
+                failed.pop(path, None)
+
+        _write_run_metrics(metrics, logger)
+
+    logger.info(f"Modo watch: revisando cada {interval:g}s (Ctrl+C para salir)")
+
+    if settings.enable_outlook_download:
+        from src.download_from_outlook import OutlookSession
+
+        session = OutlookSession()
+
+    with ShutdownRequest(logger) as shutdown, session or nullcontext():
+        ticks = watch_loop(tick, interval, shutdown.stop, logger)
+
+    logger.info(f"Modo watch finalizado tras {ticks} pasadas")
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Punto de entrada principal del pipeline de automatización.
+
+    Orquesta el flujo completo:
+    - carga configuración
+    - inicializa logging
+    - detecta archivo de entrada
+    - extrae datos
+    - transforma y valida
+    - genera output
+    - archiva input
+    - registra todo en logs
+
+    Solo una instancia corre a la vez (lock en state_dir): si el modo
+    `--watch` está activo, una corrida del Programador de tareas se omite.
+
+    Parameters
+    ----------
+    argv : list[str] | None
+        Argumentos de línea de comandos (ej: ["--workers", "4"], ["--watch"]).
+    """
+    args = _parse_args(argv)
+
+    settings = get_settings()                                           # Carga configuración desde .env (rutas, patrones, etc.)
+    logger = setup_logger(settings.log_dir)                             # Inicializa logger y define dónde se guardarán los logs
+
+    logger.info("Inicio de ejecución del pipeline")
+
+    try:
+        with InstanceLock(settings.state_dir):
+            if args.watch:
+                interval = args.interval if args.interval is not None else settings.watch_interval
+                run_watch(settings, logger, args.workers, interval)
+                return
 
-    logger.info("Ejecución finalizada")
+            # Tiempo, filas y memoria por etapa (ver src.metrics)
+            metrics = RunMetrics()
+            if run_once(settings, logger, args.workers, metrics):
+                logger.info("Ejecución finalizada")
+            _write_run_metrics(metrics, logger)
+    except AlreadyRunningError as e:
+        logger.warning(f"{e}; se omite esta ejecución")
 
     # latest_file = find_latest_file(                                     # Busca el archivo más reciente que calce con el patrón configurado
     #     settings.input_dir,
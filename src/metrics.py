@@ -0,0 +1,254 @@
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+import csv
+import json
+import os
+import sys
+import time
+
+try:
+    import resource     # solo Unix
+except ImportError:
+    resource = None
+
+
+def _windows_peak_rss() -> float | None:
+    """
+    Pico del working set del proceso en Windows (`GetProcessMemoryInfo`).
+
+    Se llama a la API de Windows con ctypes, sin dependencias extra. None
+    si la llamada falla.
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+
+    kernel32 = ctypes.WinDLL("kernel32")
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    # K32GetProcessMemoryInfo: la versión de kernel32 (psapi.dll no hace falta desde Windows 7)
+    get_info = kernel32.K32GetProcessMemoryInfo
+    get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    get_info.restype = wintypes.BOOL
+
+    if not get_info(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize / 1024 ** 2
+
+
+def peak_rss_mb() -> float | None:
+    """
+    Pico de memoria residente (RSS) del proceso actual, en MB.
+
+    Es el máximo desde que arrancó el proceso (no por etapa). En Windows
+    es el pico del working set (`GetProcessMemoryInfo` vía ctypes); en el
+    resto, `resource.getrusage`. No necesita dependencias fuera de la
+    biblioteca estándar. None si no hay forma de medirlo.
+    """
+    if sys.platform == "win32":
+        return _windows_peak_rss()
+
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux lo reporta en KB, macOS en bytes
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+    return None
+
+
+@dataclass
+class StageMetric:
+    """
+    Métricas acumuladas de una etapa del pipeline para un archivo.
+
+    Attributes
+    ----------
+    stage : str
+        Nombre de la etapa (ej: "read_export", "transform_export").
+    file : str
+        Archivo procesado ("" para etapas de la corrida, ej: "outlook").
+    seconds : float
+        Tiempo de pared propio de la etapa (sin contar etapas anidadas).
+    calls : int
+        Veces que se ejecutó (ej: una por bloque).
+    rows_in : int | None
+        Filas recibidas (None si no aplica).
+    rows_out : int | None
+        Filas entregadas (None si no aplica).
+    peak_rss_mb : float | None
+        Pico de RSS del proceso al terminar la etapa.
+    pid : int
+        Proceso que la ejecutó (con --workers cada archivo va en otro).
+    """
+
+    stage: str
+    file: str = ""
+    seconds: float = 0.0
+    calls: int = 0
+    rows_in: int | None = None
+    rows_out: int | None = None
+    peak_rss_mb: float | None = None
+    pid: int = 0
+
+    def add_rows(self, rows_in: int | None = None, rows_out: int | None = None) -> None:
+        if rows_in is not None:
+            self.rows_in = (self.rows_in or 0) + rows_in
+        if rows_out is not None:
+            self.rows_out = (self.rows_out or 0) + rows_out
+
+
+class RunMetrics:
+    """
+    Instrumentación por etapa de una corrida.
+
+    `stage(...)` mide tiempo de pared y pico de RSS de un bloque de código;
+    llamadas repetidas a la misma etapa y archivo se acumulan (ej: una por
+    bloque en la lectura por bloques). Las etapas pueden anidarse: el
+    tiempo de una etapa interna se descuenta de la externa, así en la
+    lectura por bloques "write_outputs" mide solo la escritura aunque
+    consuma el generador que lee y transforma.
+
+    No es thread-safe: se usa desde el hilo principal de cada proceso.
+    """
+
+    def __init__(self):
+        self._stages: dict[tuple[str, str, int], StageMetric] = {}
+        self._nested: list[list[float]] = []
+        self.started = time.perf_counter()
+
+    @property
+    def records(self) -> list[StageMetric]:
+        return list(self._stages.values())
+
+    def _metric(self, stage: str, file: str) -> StageMetric:
+        key = (stage, file, os.getpid())
+        if key not in self._stages:
+            self._stages[key] = StageMetric(stage=stage, file=file, pid=os.getpid())
+        return self._stages[key]
+
+    @contextmanager
+    def stage(self, stage: str, file: str = "") -> Iterator[StageMetric]:
+        """
+        Mide un bloque de código como parte de la etapa `stage`.
+
+        Yields
+        ------
+        StageMetric
+            Métrica acumulada, para registrar filas (`add_rows`).
+        """
+        metric = self._metric(stage, file)
+        nested = [0.0]
+        self._nested.append(nested)
+        t0 = time.perf_counter()
+        try:
+            yield metric
+        finally:
+            elapsed = time.perf_counter() - t0
+            self._nested.pop()
+            if self._nested:
+                self._nested[-1][0] += elapsed
+
+            metric.seconds += elapsed - nested[0]
+            metric.calls += 1
+            metric.peak_rss_mb = peak_rss_mb()
+
+    def iter_stage(self, stage: str, file: str, chunks: Iterable) -> Iterator:
+        """
+        Envuelve un iterador de bloques midiendo cada `next` como la etapa `stage`.
+        """
+        iterator = iter(chunks)
+        while True:
+            with self.stage(stage, file) as metric:
+                chunk = next(iterator, None)
+                if chunk is not None:
+                    metric.add_rows(rows_out=len(chunk))
+            if chunk is None:
+                return
+            yield chunk
+
+    def record(self, stage: str, seconds: float, file: str = "", rows_in=None, rows_out=None) -> None:
+        """
+        Registra una etapa medida por fuera (ej: el hilo de Outlook).
+        """
+        metric = self._metric(stage, file)
+        metric.seconds += seconds
+        metric.calls += 1
+        metric.add_rows(rows_in, rows_out)
+        metric.peak_rss_mb = peak_rss_mb()
+
+    def extend(self, records: Iterable[StageMetric]) -> None:
+        """
+        Incorpora métricas de otro proceso (workers del pool).
+        """
+        for r in records:
+            self._stages[(r.stage, r.file, r.pid)] = r
+
+    def summary(self) -> str:
+        """
+        Línea de resumen: tiempo total y tiempo/filas por etapa (sumando archivos).
+        """
+        totals: dict[str, list] = {}
+        for r in self.records:
+            entry = totals.setdefault(r.stage, [0.0, None])
+            entry[0] += r.seconds
+            if r.rows_out is not None:
+                entry[1] = (entry[1] or 0) + r.rows_out
+
+        parts = [f"total {time.perf_counter() - self.started:.2f}s"]
+        for stage, (seconds, rows) in totals.items():
+            rows_txt = f" ({rows} filas)" if rows is not None else ""
+            parts.append(f"{stage} {seconds:.2f}s{rows_txt}")
+
+        peaks = [r.peak_rss_mb for r in self.records if r.peak_rss_mb is not None]
+        if peaks:
+            parts.append(f"RSS máx {max(peaks):.0f} MB")
+
+        return " | ".join(parts)
+
+    def write(self, base_path: Path) -> tuple[Path, Path]:
+        """
+        Escribe las métricas junto al log: <base>.metrics.json y <base>.metrics.csv.
+
+        Parameters
+        ----------
+        base_path : Path
+            Ruta del log de la corrida (ej: logs/run_2026-01-21_08-00-00.log).
+
+        Returns
+        -------
+        tuple[Path, Path]
+            (ruta JSON, ruta CSV).
+        """
+        json_path = base_path.with_suffix(".metrics.json")
+        csv_path = base_path.with_suffix(".metrics.csv")
+        rows = [asdict(r) for r in self.records]
+
+        data = {
+            "total_seconds": round(time.perf_counter() - self.started, 3),
+            "stages": rows,
+        }
+        json_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+        with open(csv_path, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=[f.name for f in fields(StageMetric)])
+            writer.writeheader()
+            writer.writerows(rows)
+
+        return json_path, csv_path
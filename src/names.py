@@ -0,0 +1,293 @@
+from dataclasses import dataclass
+from pathlib import Path
+import re
+import sqlite3
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Nombre del archivo SQLite (dentro de state_dir) con la tabla de canonicalización
+NAME_MEMO_DB_NAME = "name_memo.sqlite"
+
+# Versión de las reglas de normalización. Si se cambian `fold_text`,
+# `customer_key` o `parse_name`, subir este número: las entradas guardadas
+# con otra versión se ignoran y se recalculan.
+NAME_RULES_VERSION = 1
+
+# Niveles de confianza de la key de cliente (solo en base al nombre)
+CONFIDENCE_NONE = "none"        # sin nombre utilizable
+CONFIDENCE_LOW = "low"          # solo una parte (sin coma, falta nombre o apellido, o solo iniciales)
+CONFIDENCE_MEDIUM = "medium"    # "Apellido, Nombre" completos
+CONFIDENCE_HIGH = "high"        # además con 3+ palabras (ej: dos apellidos), más difícil de confundir
+
+# Columnas que agrega la normalización de nombres (mismo orden que ParsedName)
+NAME_COLUMNS = ["name", "last_name", "first_name", "customer_key_name", "customer_key_confidence"]
+
+# Apóstrofes se eliminan ("O'Brien" -> "obrien"); el resto de lo que no sea
+# letra, número o espacio se trata como separador ("Pérez-Soto" = "Perez Soto")
+_APOSTROPHES = re.compile(r"['’`´]")
+_NON_WORD = re.compile(r"[^\w\s]|_")
+
+# Palabra con al menos 2 letras seguidas (no solo una inicial)
+_INFORMATIVE_WORD = re.compile(r"[^\W\d_]{2}")
+
+
+@dataclass(frozen=True)
+class ParsedName:
+    """
+    Resultado de normalizar un valor crudo de 'name'.
+
+    Attributes
+    ----------
+    name : str
+        Nombre limpio (strip + espacios simples), tal como se muestra.
+    last_name : str
+        Apellido (texto antes de la primera coma).
+    first_name : str | None
+        Nombre (texto después de la primera coma) o None si no hay coma.
+    customer_key : str
+        Key "apellido|nombre" sin acentos, en casefold y sin puntuación.
+    confidence : str
+        Confianza de la key (ver CONFIDENCE_*).
+    """
+
+    name: str
+    last_name: str
+    first_name: str | None
+    customer_key: str
+    confidence: str
+
+    def as_row(self) -> tuple:
+        # Mismo orden que NAME_COLUMNS (dataclasses.astuple es mucho más lento)
+        return (self.name, self.last_name, self.first_name, self.customer_key, self.confidence)
+
+
+def fold_text(text: str) -> str:
+    """
+    Lleva un texto a su forma canónica para comparar nombres.
+
+    - quita acentos y diacríticos (NFKD + descarta marcas combinantes)
+    - casefold (minúsculas "agresivas", ej: "ß" -> "ss")
+    - apóstrofes fuera, resto de la puntuación -> espacio
+    - espacios múltiples -> uno
+    """
+    # La mayoría de los nombres son ASCII: solo se descompone cuando hace falta
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+    folded = _APOSTROPHES.sub("", text.casefold())
+    return " ".join(_NON_WORD.sub(" ", folded).split())
+
+
+def _is_informative(part: str) -> bool:
+    # Una parte "cuenta" si tiene al menos una palabra de 2+ letras (no solo iniciales)
+    return _INFORMATIVE_WORD.search(part) is not None
+
+
+def customer_key(last_name, first_name) -> tuple[str, str]:
+    """
+    Construye la key "apellido|nombre" y su nivel de confianza.
+
+    Parameters
+    ----------
+    last_name :
+        Apellido (texto o nulo).
+    first_name :
+        Nombre (texto o nulo si el valor original no traía coma).
+
+    Returns
+    -------
+    tuple[str, str]
+        (key, confianza).
+    """
+    last = fold_text(last_name) if isinstance(last_name, str) else ""
+    first = fold_text(first_name) if isinstance(first_name, str) else ""
+
+    has_last = _is_informative(last)
+    has_first = _is_informative(first)
+
+    if has_last and has_first:
+        words = len(last.split()) + len(first.split())
+        confidence = CONFIDENCE_HIGH if words >= 3 else CONFIDENCE_MEDIUM
+    elif has_last or has_first:
+        confidence = CONFIDENCE_LOW
+    else:
+        confidence = CONFIDENCE_NONE
+
+    return f"{last}|{first}", confidence
+
+
+def parse_name(raw) -> ParsedName:
+    """
+    Limpia y separa un valor de 'name' ("Apellido, Nombre").
+
+    - strip + espacios múltiples -> uno
+    - separa por la primera coma en (apellido, nombre)
+    - arma la key canónica y su confianza (ver `customer_key`)
+
+    Parameters
+    ----------
+    raw :
+        Valor crudo de la columna 'name'.
+
+    Returns
+    -------
+    ParsedName
+    """
+    # str.split() sin argumentos = strip + colapsar cualquier whitespace
+    name = " ".join(str(raw).split())
+
+    last, sep, first = name.partition(",")
+    last = last.strip()
+    first = first.strip() if sep else None
+
+    key, confidence = customer_key(last, first)
+    return ParsedName(name, last, first, key, confidence)
+
+
+class NameMemo:
+    """
+    Tabla persistente (SQLite) de canonicalización de nombres.
+
+    Guarda, por valor crudo de 'name', el resultado de `parse_name`. Los
+    huéspedes frecuentes aparecen en todos los exports diarios, así cada
+    nombre se normaliza una sola vez y las corridas siguientes lo leen
+    de la tabla.
+
+    Los nombres nuevos quedan en memoria hasta `commit` (una transacción
+    corta al final, igual que `ReservationIndex`).
+    """
+
+    def __init__(self, state_dir: Path):
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self.path = state_dir / NAME_MEMO_DB_NAME
+
+        # timeout: con --workers varios procesos pueden escribir a la vez
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS names (
+                raw_name TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                last_name TEXT NOT NULL,
+                first_name TEXT,
+                customer_key TEXT NOT NULL,
+                confidence TEXT NOT NULL,
+                rules_version INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+        # Caché de la corrida (sirve entre bloques de un mismo archivo)
+        self._cache: dict[str, ParsedName] = {}
+        self._pending: dict[str, ParsedName] = {}
+
+    def _stored(self, raws: list[str]) -> dict[str, ParsedName]:
+        """
+        Lee de la tabla las entradas vigentes para los nombres indicados.
+
+        Se cargan en una tabla temporal y se cruzan con un JOIN, para no
+        armar un IN (...) gigante ni leer la tabla completa.
+        """
+        cur = self._conn.cursor()
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (raw_name TEXT PRIMARY KEY)")
+        cur.execute("DELETE FROM incoming")
+        cur.executemany("INSERT OR IGNORE INTO incoming VALUES (?)", ((r,) for r in raws))
+        rows = cur.execute(
+            """
+            SELECT n.raw_name, n.name, n.last_name, n.first_name, n.customer_key, n.confidence
+            FROM incoming i
+            JOIN names n USING (raw_name)
+            WHERE n.rules_version = ?
+            """,
+            (NAME_RULES_VERSION,),
+        ).fetchall()
+        self._conn.commit()
+        return {raw: ParsedName(*values) for raw, *values in rows}
+
+    def resolve(self, raws: list[str]) -> list[ParsedName]:
+        """
+        Normaliza una lista de nombres crudos, usando la tabla cuando se puede.
+
+        Parameters
+        ----------
+        raws : list[str]
+            Nombres crudos (idealmente ya únicos).
+
+        Returns
+        -------
+        list[ParsedName]
+            Un resultado por nombre, en el mismo orden.
+        """
+        missing = [r for r in raws if r not in self._cache]
+        if missing:
+            self._cache.update(self._stored(missing))
+
+            for raw in missing:
+                if raw not in self._cache:
+                    parsed = parse_name(raw)
+                    self._cache[raw] = parsed
+                    self._pending[raw] = parsed
+
+        return [self._cache[r] for r in raws]
+
+    def commit(self) -> None:
+        """
+        Persiste los nombres normalizados desde el último commit.
+        """
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO names (raw_name, name, last_name, first_name, customer_key, confidence, rules_version)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(raw_name) DO UPDATE SET
+                    name = excluded.name,
+                    last_name = excluded.last_name,
+                    first_name = excluded.first_name,
+                    customer_key = excluded.customer_key,
+                    confidence = excluded.confidence,
+                    rules_version = excluded.rules_version
+                """,
+                ((raw, *p.as_row(), NAME_RULES_VERSION) for raw, p in self._pending.items()),
+            )
+        self._pending.clear()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def parse_names(values: pd.Series, memo: NameMemo | None = None) -> pd.DataFrame:
+    """
+    Normaliza una columna de nombres trabajando solo sobre valores únicos.
+
+    factorize -> normaliza cada nombre distinto una vez (o lo lee del
+    memo) -> vuelve a expandir a todas las filas con los códigos.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Columna 'name' cruda.
+    memo : NameMemo | None
+        Tabla persistente de canonicalización. Si es None, solo se
+        normalizan los únicos de esta columna.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columnas NAME_COLUMNS, con el mismo índice que `values`.
+    """
+    # use_na_sentinel=False: los nulos también se tratan como un valor más ("nan")
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    raws = [str(u) for u in uniques]
+
+    parsed = memo.resolve(raws) if memo is not None else [parse_name(r) for r in raws]
+
+    table = np.empty((len(parsed), len(NAME_COLUMNS)), dtype=object)
+    for i, p in enumerate(parsed):
+        table[i] = p.as_row()
+
+    return pd.DataFrame(table[codes], columns=NAME_COLUMNS, index=values.index)
@@ -0,0 +1,352 @@
+from dataclasses import dataclass
+from pathlib import Path
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.aggregates import room_counts, stay_lengths
+from src.transform import header_mapping
+
+# Carpeta (dentro de state_dir) con los snapshots compactos del export
+PACE_DIRNAME = "pace"
+
+# Snapshots que se conservan (los más antiguos se borran)
+MAX_SNAPSHOTS = 14
+
+# Columnas (ya normalizadas) que se guardan de cada snapshot
+SNAPSHOT_COLUMNS = ["confirmation_number", "property", "arrival", "departure", "nights", "rooms", "rate"]
+
+# Mínimo indispensable para comparar snapshots
+REQUIRED_SNAPSHOT_COLUMNS = {"confirmation_number", "property", "arrival", "rate"}
+
+
+@dataclass
+class Snapshot:
+    """
+    Versión compacta de un export de Opera, ordenada por confirmation_number.
+
+    Solo guarda lo necesario para el pace (arreglos numpy, sin texto por
+    fila salvo la propiedad), así comparar contra el snapshot anterior es
+    un cruce de arreglos ordenados y no una relectura del archivo.
+
+    Attributes
+    ----------
+    keys : np.ndarray
+        confirmation_number (int64), ordenados y sin repetidos.
+    property : np.ndarray
+        Propiedad de cada reserva.
+    arrival : np.ndarray
+        Fecha de llegada (datetime64[D]).
+    room_nights : np.ndarray
+        Noches * habitaciones (int64).
+    rate : np.ndarray
+        Tarifa (float64).
+    """
+
+    keys: np.ndarray
+    property: np.ndarray
+    arrival: np.ndarray
+    room_nights: np.ndarray
+    rate: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Snapshot":
+        """
+        Construye un snapshot desde un DataFrame con columnas normalizadas.
+
+        Filas sin confirmation_number numérico se descartan; si una
+        confirmación se repite, vale la última.
+        """
+        keys = pd.to_numeric(df["confirmation_number"], errors="coerce")
+        valid = keys.notna().to_numpy()
+
+        arrival, nights = stay_lengths(df)
+
+        return cls._sorted(
+            keys=keys.to_numpy(dtype=np.float64)[valid].astype(np.int64),
+            property=df["property"].astype("string").fillna("").to_numpy(dtype=str)[valid],
+            arrival=arrival.to_numpy(dtype="datetime64[D]")[valid],
+            room_nights=(nights * room_counts(df))[valid],
+            rate=pd.to_numeric(df["rate"], errors="coerce").to_numpy(dtype=np.float64)[valid],
+        )
+
+    @classmethod
+    def _sorted(cls, **arrays) -> "Snapshot":
+        # Orden estable por key y se queda con la última aparición de cada una
+        order = np.argsort(arrays["keys"], kind="stable")
+        keys = arrays["keys"][order]
+        last = np.ones(len(keys), dtype=bool)
+        last[:-1] = keys[1:] != keys[:-1]
+        return cls(**{name: values[order][last] for name, values in arrays.items()})
+
+    @classmethod
+    def concat(cls, parts: list["Snapshot"]) -> "Snapshot":
+        """
+        Une snapshots parciales (ej: bloques de un mismo archivo).
+        """
+        fields = ["keys", "property", "arrival", "room_nights", "rate"]
+        return cls._sorted(**{f: np.concatenate([getattr(p, f) for p in parts]) for f in fields})
+
+    def save(self, path: Path) -> None:
+        # Escritura atómica: un snapshot a medio escribir nunca queda con el nombre final
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as fh:
+            np.savez_compressed(
+                fh,
+                keys=self.keys,
+                property=self.property,
+                arrival=self.arrival,
+                room_nights=self.room_nights,
+                rate=self.rate,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "Snapshot":
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+
+def diff_snapshots(previous: Snapshot, current: Snapshot) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compara dos snapshots consecutivos por confirmation_number.
+
+    El cruce es un merge join sobre las keys ordenadas (`np.searchsorted`
+    del snapshot nuevo sobre el anterior). Reservas del snapshot anterior
+    que no están en el nuevo cuentan como canceladas solo si llegan dentro
+    de la ventana que cubre el nuevo export (desde su primera llegada):
+    las más antiguas simplemente salieron del reporte.
+
+    El pickup se arma por reserva: cada reserva del snapshot nuevo suma y
+    su versión anterior (si la hay) resta en su fecha de llegada anterior,
+    aunque esa fecha quede fuera de la ventana (ej: una llegada que se
+    movió hacia la ventana no cuenta como pickup completo).
+
+    Parameters
+    ----------
+    previous : Snapshot
+        Snapshot N-1.
+    current : Snapshot
+        Snapshot N.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        - resumen por propiedad y fecha de llegada: new_bookings,
+          cancellations, rate_changes, room_night_pickup, revenue_pickup
+        - detalle por reserva con cambios ('change': new, cancelled,
+          rate_change o stay_change)
+    """
+    # Posición de cada key nueva en el snapshot anterior
+    pos = np.searchsorted(previous.keys, current.keys)
+    pos_clipped = np.minimum(pos, max(len(previous) - 1, 0))
+    found = (pos < len(previous)) & (previous.keys[pos_clipped] == current.keys) if len(previous) else np.zeros(len(current), dtype=bool)
+    prev_idx = pos_clipped[found]
+
+    in_current = np.zeros(len(previous), dtype=bool)
+    in_current[prev_idx] = True
+
+    dated = current.arrival[~np.isnat(current.arrival)]
+    window_start = dated.min() if len(dated) else np.datetime64("NaT")
+    in_window = previous.arrival >= window_start     # NaT nunca queda dentro
+
+    cancelled = ~in_current & in_window
+    new = ~found
+
+    # Versiones anteriores que restan: las que siguen (vayan donde vayan) y las canceladas
+    prior = in_current | cancelled
+
+    rate_change = np.zeros(len(current), dtype=bool)
+    rate_change[found] = ~np.isclose(current.rate[found], previous.rate[prev_idx], equal_nan=True)
+
+    stay_change = np.zeros(len(current), dtype=bool)
+    stay_change[found] = (
+        (current.arrival[found] != previous.arrival[prev_idx])
+        | (current.room_nights[found] != previous.room_nights[prev_idx])
+    )
+
+    # Resumen: aportes del snapshot nuevo (+) y de la versión anterior de cada reserva (-)
+    revenue = np.nan_to_num(current.rate) * current.room_nights
+    prev_revenue = np.nan_to_num(previous.rate) * previous.room_nights
+
+    plus = pd.DataFrame({
+        "property": current.property,
+        "arrival": current.arrival,
+        "new_bookings": new.astype(np.int64),
+        "cancellations": 0,
+        "rate_changes": rate_change.astype(np.int64),
+        "room_night_pickup": current.room_nights,
+        "revenue_pickup": revenue,
+    })
+    minus = pd.DataFrame({
+        "property": previous.property[prior],
+        "arrival": previous.arrival[prior],
+        "new_bookings": 0,
+        "cancellations": cancelled[prior].astype(np.int64),
+        "rate_changes": 0,
+        "room_night_pickup": -previous.room_nights[prior],
+        "revenue_pickup": -prev_revenue[prior],
+    })
+
+    summary = pd.concat([plus, minus], ignore_index=True).groupby(["property", "arrival"], as_index=False).sum()
+    summary["revenue_pickup"] = summary["revenue_pickup"].round(2)
+
+    # Solo fechas con algún movimiento
+    activity = summary[["new_bookings", "cancellations", "rate_changes", "room_night_pickup"]].any(axis=1)
+    summary = summary[activity | (summary["revenue_pickup"] != 0)].reset_index(drop=True)
+
+    # Detalle: una fila por reserva con cambios
+    prev_room_nights = np.zeros(len(current), dtype=np.int64)
+    prev_room_nights[found] = previous.room_nights[prev_idx]
+    prev_rate = np.full(len(current), np.nan)
+    prev_rate[found] = previous.rate[prev_idx]
+
+    change = np.select([new, rate_change, stay_change], ["new", "rate_change", "stay_change"], default="")
+    changed = change != ""
+
+    detail = pd.concat(
+        [
+            pd.DataFrame({
+                "confirmation_number": current.keys[changed],
+                "property": current.property[changed],
+                "arrival": current.arrival[changed],
+                "change": change[changed],
+                "room_nights": current.room_nights[changed],
+                "prev_room_nights": prev_room_nights[changed],
+                "rate": current.rate[changed],
+                "prev_rate": prev_rate[changed],
+            }),
+            pd.DataFrame({
+                "confirmation_number": previous.keys[cancelled],
+                "property": previous.property[cancelled],
+                "arrival": previous.arrival[cancelled],
+                "change": "cancelled",
+                "room_nights": 0,
+                "prev_room_nights": previous.room_nights[cancelled],
+                "rate": np.nan,
+                "prev_rate": previous.rate[cancelled],
+            }),
+        ],
+        ignore_index=True,
+    ).sort_values(["property", "arrival", "confirmation_number"], ignore_index=True)
+
+    return summary, detail
+
+
+class PaceTracker:
+    """
+    Pickup / pace entre snapshots consecutivos del export de Opera.
+
+    Cada archivo procesado es un snapshot del libro de reservas. Se guarda
+    en forma compacta (ver `Snapshot`) en state_dir/pace, identificado por
+    la fecha del export (ver `src.files.export_time`), y se compara contra
+    el snapshot más reciente anterior a esa fecha. El nombre del archivo no
+    identifica el export: un adjunto diario puede llegar siempre con el
+    mismo nombre.
+
+    Uso:
+    - `observe(df)` con cada DataFrame/bloque crudo (antes de filtrar por
+      el índice de ingesta: el pace necesita el export completo)
+    - `snapshot()` al terminar de leer el archivo
+    - `commit(snapshot, ...)` una vez que el archivo se procesó bien. El
+      snapshot es picklable: con --workers lo arma el worker y el commit
+      lo hace el proceso principal, de a un archivo y en orden de export.
+    """
+
+    def __init__(self, state_dir: Path):
+        self.path = state_dir / PACE_DIRNAME
+        self._parts: list[Snapshot] = []
+
+    def observe(self, df: pd.DataFrame) -> None:
+        """
+        Agrega un DataFrame o bloque crudo al snapshot del archivo actual.
+
+        Raises
+        ------
+        ValueError
+            Si faltan columnas necesarias para el pace.
+        """
+        # Columnas por su nombre normalizado (el DataFrame todavía viene crudo)
+        columns = {c: raw for raw, c in header_mapping(tuple(df.columns)).items()}
+        missing = REQUIRED_SNAPSHOT_COLUMNS - set(columns)
+        if missing:
+            raise ValueError(f"Faltan columnas requeridas para el pace: {sorted(missing)}")
+
+        present = [c for c in SNAPSHOT_COLUMNS if c in columns]
+        frame = df[[columns[c] for c in present]].set_axis(present, axis=1)
+        if "departure" not in frame.columns:
+            frame = frame.assign(departure=pd.NaT)
+
+        self._parts.append(Snapshot.from_frame(frame))
+
+    def snapshot(self) -> Snapshot | None:
+        """
+        Snapshot del archivo actual (une los bloques observados) o None si
+        no se observó nada.
+        """
+        current = Snapshot.concat(self._parts) if self._parts else None
+        self._parts = []
+        return current
+
+    def _snapshots(self) -> dict[Path, int]:
+        # Snapshot -> fecha del export (prefijo del nombre: <export_time>_<archivo>.npz)
+        return {p: int(p.stem.split("_", 1)[0]) for p in self.path.glob("*.npz")}
+
+    def _previous_snapshot(self, export_time: int) -> Path | None:
+        # El más reciente anterior a este export (una corrida previa del mismo no cuenta)
+        older = {p: t for p, t in self._snapshots().items() if t < export_time}
+        return max(older, key=older.get, default=None)
+
+    def commit(self, current: Snapshot, source_name: str, export_time: int, output_dir: Path) -> Path | None:
+        """
+        Guarda el snapshot del archivo y escribe el reporte de pace.
+
+        Parameters
+        ----------
+        current : Snapshot
+            Snapshot del archivo (ver `snapshot`).
+        source_name : str
+            Nombre del archivo de origen (sin extensión).
+        export_time : int
+            Fecha del export en nanosegundos (ver `src.files.export_time`).
+        output_dir : Path
+            Directorio donde se escribe `pace_<source_name>.xlsx`.
+
+        Returns
+        -------
+        Path | None
+            Reporte generado, o None si no había snapshot anterior.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        previous_path = self._previous_snapshot(export_time)
+
+        # Reprocesar el mismo export reemplaza su snapshot anterior
+        for stale, t in self._snapshots().items():
+            if t == export_time:
+                stale.unlink(missing_ok=True)
+
+        current.save(self.path / f"{export_time:020d}_{source_name}.npz")
+
+        # Solo se conservan los últimos MAX_SNAPSHOTS
+        snapshots = self._snapshots()
+        for old in sorted(snapshots, key=snapshots.get)[:-MAX_SNAPSHOTS]:
+            old.unlink(missing_ok=True)
+
+        if previous_path is None:
+            return None
+
+        summary, detail = diff_snapshots(Snapshot.load(previous_path), current)
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        report_path = output_dir / f"pace_{source_name}.xlsx"
+        tmp_path = output_dir / f".{report_path.stem}.{os.getpid()}.tmp.xlsx"
+        with pd.ExcelWriter(tmp_path) as writer:
+            summary.to_excel(writer, sheet_name="resumen", index=False)
+            detail.to_excel(writer, sheet_name="detalle", index=False)
+        os.replace(tmp_path, report_path)
+
+        return report_path
@@ -0,0 +1,232 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+# Atributos que pueden derivar las reglas y su tipo en el DataFrame.
+# Un atributo que ninguna regla asigna queda nulo (desconocido).
+RATE_ATTRIBUTE_DTYPES = {
+    "breakfast_included": "boolean",
+    "refundable": "boolean",
+    "channel": "string",
+}
+
+# Columnas (ya normalizadas) sobre las que se pueden escribir reglas
+RULE_COLUMNS = ("rate_code", "travel_agent")
+
+# Tipos de comparación. Todas ignoran mayúsculas/minúsculas y espacios en los bordes.
+MATCH_TYPES = ("exact", "prefix", "suffix", "contains", "regex")
+
+# Tabla por defecto (se reemplaza con RATE_RULES_FILE, ver src.config).
+# Orden importa: para cada atributo gana la primera regla que calza.
+DEFAULT_RATE_RULES = [
+    # Rate codes: "...SD" = sin desayuno, "NRF" = no reembolsable
+    {"column": "rate_code", "match": "suffix", "pattern": "SD", "set": {"breakfast_included": False}},
+    {"column": "rate_code", "match": "contains", "pattern": "NRF", "set": {"refundable": False}},
+    {"column": "rate_code", "match": "regex", "pattern": r"\S", "set": {"breakfast_included": True, "refundable": True}},
+
+    # Travel agent -> canal de venta (sin travel agent = reserva directa)
+    {"column": "travel_agent", "match": "exact", "pattern": "BOOKING", "set": {"channel": "Booking.com"}},
+    {"column": "travel_agent", "match": "exact", "pattern": "EXPEDIA", "set": {"channel": "Expedia"}},
+    {"column": "travel_agent", "match": "exact", "pattern": "DESPEGAR", "set": {"channel": "Despegar"}},
+    {"column": "travel_agent", "match": "exact", "pattern": "ABNB", "set": {"channel": "Airbnb"}},
+    {"column": "travel_agent", "match": "exact", "pattern": "", "set": {"channel": "Directo"}},
+]
+
+
+@dataclass(frozen=True)
+class RateRule:
+    """
+    Regla de la tabla de tarifas.
+
+    Attributes
+    ----------
+    column : str
+        Columna sobre la que se evalúa ('rate_code' o 'travel_agent').
+    match : str
+        Tipo de comparación (ver MATCH_TYPES).
+    pattern : str
+        Texto (o expresión regular si match == "regex").
+    values : dict
+        Atributos que asigna cuando calza (ej: {"breakfast_included": False}).
+    """
+
+    column: str
+    match: str
+    pattern: str
+    values: dict = field(default_factory=dict)
+
+    def compile(self) -> re.Pattern:
+        """
+        Traduce la regla a una expresión regular (todas se evalúan igual).
+
+        Raises
+        ------
+        ValueError
+            Si la regla no es válida.
+        """
+        if self.column not in RULE_COLUMNS:
+            raise ValueError(f"Regla de tarifa con columna desconocida: {self.column!r}")
+        if self.match not in MATCH_TYPES:
+            raise ValueError(f"Regla de tarifa con tipo desconocido: {self.match!r}")
+
+        for attribute, value in self.values.items():
+            if attribute not in RATE_ATTRIBUTE_DTYPES:
+                raise ValueError(f"Regla de tarifa con atributo desconocido: {attribute!r}")
+            if RATE_ATTRIBUTE_DTYPES[attribute] == "boolean" and not isinstance(value, bool):
+                raise ValueError(f"El atributo {attribute!r} espera true/false, no {value!r}")
+
+        text = re.escape(self.pattern.strip())
+        source = {
+            "exact": rf"^{text}$",
+            "prefix": rf"^{text}",
+            "suffix": rf"{text}$",
+            "contains": text,
+            "regex": self.pattern,
+        }[self.match]
+
+        try:
+            return re.compile(source, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Expresión regular inválida en regla de tarifa {self.pattern!r}: {e}") from e
+
+
+class RateRules:
+    """
+    Tabla de reglas de tarifa compilada.
+
+    Las expresiones se compilan una vez al construir el objeto. Al aplicar,
+    cada regla se evalúa solo sobre los valores distintos de su columna
+    (hay pocas decenas de rate codes y travel agents) y el resultado se
+    expande a todas las filas con los códigos de `pd.factorize`: no hay
+    Python por fila.
+    """
+
+    def __init__(self, rules: list[RateRule]):
+        self.rules = list(rules)
+        self._compiled = [(rule, rule.compile()) for rule in self.rules]
+
+        # Atributos que efectivamente asigna la tabla (en el orden de RATE_ATTRIBUTE_DTYPES)
+        assigned = {a for rule in self.rules for a in rule.values}
+        self.attributes = [a for a in RATE_ATTRIBUTE_DTYPES if a in assigned]
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> "RateRules":
+        """
+        Construye la tabla desde registros {"column", "match", "pattern", "set"}.
+
+        Raises
+        ------
+        ValueError
+            Si algún registro no tiene el formato esperado.
+        """
+        rules = []
+        for i, record in enumerate(records):
+            try:
+                rules.append(
+                    RateRule(
+                        column=record["column"],
+                        match=record.get("match", "exact"),
+                        pattern=str(record["pattern"]),
+                        values=dict(record["set"]),
+                    )
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Regla de tarifa #{i + 1} inválida: {record!r}") from e
+        return cls(rules)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "RateRules":
+        """
+        Carga la tabla desde un JSON (lista de registros, ver `from_records`).
+        """
+        with open(path, encoding="utf-8") as fh:
+            records = json.load(fh)
+        if not isinstance(records, list):
+            raise ValueError(f"{path} debe contener una lista de reglas")
+        return cls.from_records(records)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Agrega al DataFrame las columnas derivadas de la tabla de reglas.
+
+        Para cada atributo gana la primera regla (en orden de la tabla) que
+        calza; si ninguna calza, queda nulo. Modifica el DataFrame recibido.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame con columnas normalizadas.
+
+        Returns
+        -------
+        pd.DataFrame
+            El mismo DataFrame con las columnas de `self.attributes`.
+        """
+        n = len(df)
+
+        # Valores distintos de cada columna y código de cada fila
+        factorized = {}
+        for column in RULE_COLUMNS:
+            if column in df.columns:
+                # Nulos (código -1) -> "" al final de los únicos; strip solo sobre los únicos
+                codes, uniques = pd.factorize(df[column])
+                uniques = pd.Series(uniques, dtype="string").str.strip()
+                codes = np.where(codes < 0, len(uniques), codes)
+                uniques = pd.concat([uniques, pd.Series([""], dtype="string")], ignore_index=True)
+                factorized[column] = (codes, uniques.fillna(""))
+
+        # Por atributo: índice (en `options`) del valor asignado a cada fila, -1 = sin asignar
+        choice = {a: np.full(n, -1, dtype=np.int16) for a in self.attributes}
+        options = {a: [] for a in self.attributes}
+
+        for rule, pattern in self._compiled:
+            if rule.column not in factorized:
+                continue
+            codes, uniques = factorized[rule.column]
+
+            # Regla evaluada sobre los únicos -> expandida a filas por código
+            hits = uniques.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+            if not hits.any():
+                continue
+            rows = hits[codes]
+
+            for attribute, value in rule.values.items():
+                if value not in options[attribute]:
+                    options[attribute].append(value)
+                target = rows & (choice[attribute] < 0)
+                choice[attribute][target] = options[attribute].index(value)
+
+        # Columnas armadas desde los códigos (sin pasar por objetos por fila)
+        for attribute in self.attributes:
+            codes = choice[attribute]
+            if RATE_ATTRIBUTE_DTYPES[attribute] == "boolean":
+                table = np.array(options[attribute], dtype=bool)
+                data = table[np.maximum(codes, 0)] if len(table) else np.zeros(n, dtype=bool)
+                df[attribute] = pd.arrays.BooleanArray(data, codes < 0)
+            else:
+                categorical = pd.Categorical.from_codes(codes, categories=[str(v) for v in options[attribute]])
+                df[attribute] = categorical.astype("string")
+
+        return df
+
+
+def load_rate_rules(path: Path | None = None) -> RateRules:
+    """
+    Tabla de reglas desde `path` (JSON) o la tabla por defecto.
+
+    Parameters
+    ----------
+    path : Path | None
+        Archivo de reglas (ver `RateRules.from_file`). None = DEFAULT_RATE_RULES.
+
+    Returns
+    -------
+    RateRules
+    """
+    if path is None:
+        return RateRules.from_records(DEFAULT_RATE_RULES)
+    return RateRules.from_file(path)
@@ -1,6 +1,12 @@
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 import re
 
+from src.names import NameMemo, customer_key, parse_names
+from src.rate_rules import RateRules
+from src.validation import Quarantine, RowValidator
+
 # La siguiente variable es un set y su nombre está en mayuscula ya que esta variable es una constante, por lo tanto, no debería mutar nunca.
 REQUIRED_COLUMNS  = {
     "property",             # Propiedad del hotel (ALMASPDV = Stgo, ALMASPUQ = Pta. Arenas, ALMASPUQX = Pta. Arenas Express)
@@ -19,40 +25,318 @@ REQUIRED_COLUMNS  = {
     "travel_agent"          # Esta columna dice a que OTA corresponde la reserva
 }
 
-def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+# Esquema de lectura del export de Opera (nombres tal como vienen en el CSV;
+# al leer se ubican por su nombre canónico, ver NORMALIZED_DTYPES).
+# Fijar tipos evita la inferencia columna a columna y reduce memoria:
+# - códigos de baja cardinalidad -> category (se guardan una vez y se referencian)
+# - contadores e IDs -> enteros nullable (Int64) para tolerar celdas vacías
+OPERA_DTYPES = {
+    "Property": "category",
+    "ConfirmationNumber": "Int64",
+    "Rate": "float64",
+    "Balance": "float64",
+    "RoomType": "category",
+    "Nights": "Int64",
+    "ReservationType": "category",
+    "RateCode": "category",
+    "RoomTypeToCharge": "category",
+    "Rooms": "Int64",
+    "Adults": "Int64",
+    "Children": "Int64",
+    "Travel Agent": "category",
+    "Market Code": "category",
+}
+
+# Fechas del export: vienen como dd-mm-YYYY (día primero)
+OPERA_DATE_COLUMNS = ["Arrival", "Departure"]
+OPERA_DATE_FORMAT = "%d-%m-%Y"
+
+# Columnas que no pueden venir vacías para que una fila se considere válida (ver basic_clean)
+NOT_NULL_COLUMNS = ["confirmation_number", "arrival", "name"]
+
+
+# Todas las columnas conocidas del export, ya normalizadas. Las demás se
+# descartan al leer / normalizar (no las usa ningún paso del pipeline).
+CANONICAL_COLUMNS = [
+    "property", "confirmation_number", "rate", "balance", "name", "room", "room_type",
+    "arrival", "nights", "departure", "reservation_type", "rate_code", "room_type_to_charge",
+    "rooms", "adults", "children", "company", "travel_agent", "market_code", "block_code",
+    "membership_number", "etd", "last_room", "vip_code", "linked_name",
+]
+
+# Nombres alternativos (ya en snake_case) -> nombre canónico.
+# Si el archivo trae la columna canónica y además un alias, gana la canónica.
+HEADER_ALIASES = {
+    "confirmation": "confirmation_number",
+    "confirmation_no": "confirmation_number",
+    "conf_no": "confirmation_number",
+    "guest_name": "name",
+    "arrival_date": "arrival",
+    "departure_date": "departure",
+    "no_of_rooms": "rooms",
+    "travel_agent_name": "travel_agent",
+}
+
+# Cortes de palabra en CamelCase: "RoomType" -> "Room_Type", "VIPCode" -> "VIP_Code"
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+_CANONICAL_SET = frozenset(CANONICAL_COLUMNS)
+
+
+@lru_cache(maxsize=None)
+def _snake_case(column: str) -> str:
+    # "RoomTypeToCharge" / "Room Type To Charge" -> "room_type_to_charge"
+    return _NON_ALNUM.sub("_", _CAMEL_BOUNDARY.sub("_", str(column).strip()).lower()).strip("_")
+
+
+@lru_cache(maxsize=None)
+def normalize_header(column: str) -> str:
     """
-    Normaliza los nombres de columnas del DataFrame.
+    Normaliza un nombre de columna a snake_case canónico.
+
+    - separa CamelCase ("ConfirmationNumber" -> "confirmation_number")
+    - minúsculas; espacios y puntuación -> '_'
+    - aplica HEADER_ALIASES
+
+    Es la regla que aplica `transform_export`; se expone para que otros
+    módulos ubiquen columnas en el DataFrame crudo (ej: índice de ingesta).
+    Memoizada: los exports repiten siempre los mismos encabezados.
+    """
+    snake = _snake_case(column)
+    return HEADER_ALIASES.get(snake, snake)
+
+
+@lru_cache(maxsize=64)
+def header_mapping(columns: tuple) -> dict:
+    """
+    Mapeo encabezado crudo -> nombre canónico para un layout de archivo.
+
+    Solo incluye columnas conocidas (CANONICAL_COLUMNS). Si dos
+    encabezados caen en el mismo nombre, gana el que no es alias (y si
+    ninguno lo es, el primero). Memoizada por la tupla de encabezados:
+    los exports diarios traen siempre el mismo layout.
+
+    Parameters
+    ----------
+    columns : tuple
+        Encabezados del archivo, en orden.
+
+    Returns
+    -------
+    dict
+        {encabezado crudo: nombre canónico}, en el orden del archivo.
+        Es compartido entre llamadas: no modificarlo.
+    """
+    chosen: dict[str, str] = {}     # canónico -> encabezado crudo
+    for raw in columns:
+        canonical = normalize_header(raw)
+        if canonical not in _CANONICAL_SET:
+            continue
+        previous = chosen.get(canonical)
+        if previous is None or (_snake_case(previous) != canonical and _snake_case(raw) == canonical):
+            chosen[canonical] = raw
+
+    keep = {raw: canonical for canonical, raw in chosen.items()}
+    return {raw: keep[raw] for raw in columns if raw in keep}
+
+
+def map_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deja solo las columnas conocidas del export, con su nombre canónico.
+
+    Devuelve siempre un DataFrame nuevo (el recibido conserva sus
+    columnas): si no hay nada que descartar es una copia superficial, que
+    comparte los datos y solo cambia el índice de columnas.
+    """
+    mapping = header_mapping(tuple(df.columns))
+    if len(mapping) < len(df.columns):
+        df = df.drop(columns=[c for c in df.columns if c not in mapping])
+    else:
+        df = df.copy(deep=False)
+    df.columns = list(mapping.values())
+    return df
+
+
+# Tipos de las columnas del export ya normalizadas (ver map_columns).
+# Sirven para escribir salidas con esquema fijo (ej: Parquet), donde una
+# columna vacía no puede quedar como float en un archivo y texto en otro.
+NORMALIZED_DTYPES = {normalize_header(c): t for c, t in OPERA_DTYPES.items()}
+NORMALIZED_DATE_COLUMNS = [normalize_header(c) for c in OPERA_DATE_COLUMNS]
+
+# Tipo con el que se marca una columna de fecha en `coerce_schema`
+DATE_DTYPE = "datetime64[ns]"
+
+
+def coerce_schema(values: pd.Series, dtype: str) -> tuple[pd.Series, np.ndarray]:
+    """
+    Convierte una columna al tipo del esquema: número ("float64"), entero
+    nullable ("Int64") o fecha dd-mm-YYYY (DATE_DTYPE).
+
+    Si la columna ya viene con ese tipo se devuelve tal cual.
+
+    Returns
+    -------
+    tuple[pd.Series, np.ndarray]
+        (columna convertida, máscara de celdas no vacías que no calzan con
+        el tipo: quedan nulas en la convertida). Un entero con decimales
+        también cuenta como que no calza.
+    """
+    if dtype == DATE_DTYPE:
+        converted = (
+            values if pd.api.types.is_datetime64_any_dtype(values)
+            else pd.to_datetime(values, format=OPERA_DATE_FORMAT, errors="coerce")
+        )
+    else:
+        converted = values if pd.api.types.is_numeric_dtype(values) else pd.to_numeric(values, errors="coerce")
+
+    failed = (converted.isna() & values.notna()).to_numpy()
+    if failed.any():
+        # Celdas con solo espacios cuentan como vacías
+        failed[failed] = values[failed].astype(str).str.strip().ne("").to_numpy(dtype=bool)
+
+    if dtype == "Int64":
+        fractional = converted.mod(1).fillna(0).ne(0).to_numpy(dtype=bool)
+        if fractional.any():
+            converted = converted.where(~fractional)
+            failed |= fractional
+
+    return (converted if dtype == DATE_DTYPE else converted.astype(dtype)), failed
+
+
+def cast_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica el esquema a las columnas numéricas y de fecha que vienen como texto.
+
+    `read_export` deja como texto una columna con alguna celda que no
+    calza con su tipo (ej: Rate "abc"), así la validación por fila decide
+    y la cuarentena conserva el valor original. Una vez separadas las
+    filas rechazadas, esto convierte el resto.
+    """
+    for c in df.columns:
+        dtype = DATE_DTYPE if c in NORMALIZED_DATE_COLUMNS else NORMALIZED_DTYPES.get(c)
+        if dtype not in ("float64", "Int64", DATE_DTYPE):
+            continue
+        typed = (
+            pd.api.types.is_datetime64_any_dtype(df[c]) if dtype == DATE_DTYPE
+            else df[c].dtype == dtype
+        )
+        if not typed:
+            df[c], _ = coerce_schema(df[c], dtype)
+    return df
+
+
+def transform_export(
+        df: pd.DataFrame,
+        name_memo: NameMemo | None = None,
+        rate_rules: RateRules | None = None,
+        validator: RowValidator | None = None,
+        quarantine: Quarantine | None = None,
+) -> pd.DataFrame:
+    """
+    Aplica toda la cadena de transformación en un solo paso.
+
+    Equivale a la cadena:
+    normalize_columns -> validate -> basic_clean -> split_name -> build_customer_key_name
+
+    con la validación por fila de `src.validation` en lugar del filtro de
+    nulos de basic_clean (las filas rechazadas van a `quarantine`), más
+    los atributos de tarifa derivados de `rate_rules` (si se entrega),
+    pero sin copias intermedias del DataFrame completo y normalizando
+    cada nombre distinto una única vez (limpieza, split y key juntos,
+    ver `src.names.parse_names`).
 
-    - Convierte a minúsculas
-    - Elimina espacios iniciales y finales
-    - Reemplaza espacios múltiples por uno
-    - Reemplaza espacios por '_'
+    No modifica el DataFrame recibido: trabaja sobre una copia
+    superficial (ver `map_columns`) y cada paso reemplaza columnas
+    completas en vez de escribir sobre las del export.
 
     Parameters
     ----------
     df : pd.DataFrame
+        DataFrame crudo tal como viene de la exportación.
+    name_memo : NameMemo | None
+        Tabla persistente de nombres ya normalizados (opcional).
+    rate_rules : RateRules | None
+        Tabla de reglas de tarifa (opcional, ver `src.rate_rules`).
+    validator : RowValidator | None
+        Reglas de validación por fila. None = reglas por defecto.
+    quarantine : Quarantine | None
+        Destino de las filas rechazadas. None = se descartan.
 
     Returns
     -------
     pd.DataFrame
+        DataFrame limpio con las columnas 'last_name', 'first_name',
+        'customer_key_name' y 'customer_key_confidence' (y los atributos
+        de tarifa, ej: 'breakfast_included', 'channel', 'refundable').
+
+    Raises
+    ------
+    ValueError
+        Si faltan columnas requeridas (error de archivo, no de fila).
     """
-    # Crea una copia del DataFrame para no modificar el original
-    # Esto evita efectos secundarios en otros pasos del pipeline
-    df = df.copy()
+    # Nombres canónicos (mapeo memoizado por layout) y
+    # fuera las columnas desconocidas antes de transformar
+    df = map_columns(df)
 
-    # Normaliza cada nombre de columna:
-    # - strip(): elimina espacios al inicio y al final
-    # - lower(): convierte a minúsculas
-    # - re.sub(): reemplaza uno o más espacios por "_"
-    df.columns = [
-        re.sub(r"\s+", "_", c.strip().lower())
-        for c in df.columns
-    ]
+    validate(df)
+
+    # Validación por fila (todas las reglas como máscaras en una pasada).
+    # Solo se filtra (y por lo tanto se copian filas) si realmente falla algo.
+    df, rejected = (validator or RowValidator()).split(df)
+    if quarantine is not None:
+        quarantine.add(rejected)
+
+    # Columnas que llegaron como texto (celdas que no calzaban) -> su tipo,
+    # 'rate' incluido (el to_numeric de basic_clean)
+    df = cast_schema(df)
+
+    # Nombre, apellido y key: una sola pasada sobre los nombres únicos
+    parsed = parse_names(df["name"], memo=name_memo)
+
+    _assign_names(df, parsed)
+    df["customer_key_name"] = parsed["customer_key_name"].to_numpy()
+    df["customer_key_confidence"] = parsed["customer_key_confidence"].to_numpy()
+
+    # Atributos de tarifa: reglas evaluadas sobre rate codes / travel agents únicos
+    if rate_rules is not None:
+        df = rate_rules.apply(df)
 
-    # Devuelve el DataFrame con columnas normalizadas
     return df
 
 
+def _assign_names(df: pd.DataFrame, parsed: pd.DataFrame) -> None:
+    """
+    Copia nombre, apellido y nombre de pila de `parse_names` al DataFrame.
+    """
+    df["name"] = parsed["name"].to_numpy()
+    df["last_name"] = parsed["last_name"].to_numpy()
+    # Si ninguna fila trae coma, la columna queda en None
+    has_comma = parsed["first_name"].notna().any()
+    df["first_name"] = parsed["first_name"].to_numpy() if has_comma else None
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza los nombres de columnas del DataFrame.
+
+    - Convierte a snake_case (incluye CamelCase: "RoomTypeToCharge" ->
+      "room_type_to_charge") y aplica HEADER_ALIASES
+    - Descarta columnas desconocidas (fuera de CANONICAL_COLUMNS)
+
+    Es el primer paso de `transform_export` (ver `map_columns`).
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    return map_columns(df)
+
+
 def validate(df: pd.DataFrame) -> None:
     """
     Valida que el DataFrame contenga todas las columnas requeridas.
@@ -81,7 +365,47 @@ def validate(df: pd.DataFrame) -> None:
         )
 
 
-def split_name(df:pd.DataFrame) -> pd.DataFrame:
+# =============== MODIFICAR ====================
+# En un futuro habría que lidiar con deduplicación de clientes. 
+    # Para esto hay que lidiar con el problema de falta de ID único por cliente. 
+# También hay que averiguar donde se guarda la info personal de cada cliente. 
+
+# Una solución es implementar una solución temporal por fuera de Opera (Ej. Planilla propia) que cree un "client_id" 
+
+def basic_clean(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica una limpieza básica de datos al DataFrame.
+
+    - Convierte la columna 'rate' a numérica
+    - Elimina filas sin 'confirmation_number', 'arrival' o 'name'
+
+    Esta función asume que el DataFrame ya fue validado.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame validado y con columnas normalizadas.
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame limpio, listo para consolidación o carga.
+    """
+    # Crea una copia del DataFrame para trabajar de forma segura
+    df = df.copy()
+
+    # Convierte la columna 'rate' a tipo numérico
+    # errors="coerce" convierte valores inválidos en NaN
+    df["rate"] = pd.to_numeric(df["rate"], errors="coerce")
+
+    # Elimina filas donde falte información crítica
+    # (reservación, fecha de llegada o nombre)
+    df = df.dropna(subset=NOT_NULL_COLUMNS)
+
+    # Devuelve el DataFrame limpio
+    return df
+
+def split_name(df: pd.DataFrame) -> pd.DataFrame:
     """
     Separa la columna 'name' en apellido y nombre.
 
@@ -91,6 +415,8 @@ def split_name(df:pd.DataFrame) -> pd.DataFrame:
     Si el separador ',' no está presente, el apellido se
     conserva y el nombre queda como valor nulo.
 
+    Es el mismo paso de `transform_export` (ver `src.names.parse_names`).
+
     Parameters
     ----------
     df : pd.DataFrame
@@ -103,26 +429,12 @@ def split_name(df:pd.DataFrame) -> pd.DataFrame:
         - 'last_name'
         - 'first_name'
     """
-
-    # Espera formatp: "Apellido, Nombre"
     df = df.copy()
-    
-    # Asegura string y limpia espacios dobles
-    df["name"] = df["name"].astype(str).str.strip()
-    df["name"] = df["name"].str.replace(r"\s+", " ", regex=True)
-
-    # Separa por la primera coma
-    parts = df["name"].str.split(",", n=1, expand=True)
-
-    # Si no hay coma, parts[1] será NaN
-    df["last_name"] = parts[0].str.strip()
-    df["first_name"] = parts[1].str.strip() if parts.shape[1] > 1 else None
-
+    _assign_names(df, parse_names(df["name"]))
     return df
 
 
 def build_customer_key_name(df: pd.DataFrame) -> pd.DataFrame:
-
     """
     Construye un identificador provisional de cliente basado
     únicamente en nombre y apellido.
@@ -131,8 +443,9 @@ def build_customer_key_name(df: pd.DataFrame) -> pd.DataFrame:
     que probablemente correspondan a la misma persona, sin
     asumir unicidad real.
 
-    Dado que se basa solo en nombre, el nivel de confianza
-    asociado es bajo.
+    Dado que se basa solo en nombre, la confianza depende de qué tan
+    completo viene: "none", "low", "medium" o "high"
+    (ver `src.names.customer_key`, el mismo que usa `transform_export`).
 
     Parameters
     ----------
@@ -147,57 +460,13 @@ def build_customer_key_name(df: pd.DataFrame) -> pd.DataFrame:
         - 'customer_key_name'
         - 'customer_key_confidence'
     """
-
     df = df.copy()
 
-    # Normaliza: minúsculas + sin espacios raros
-    ln = df["last_name"].fillna("").str.lower().str.strip()
-    fn = df["first_name"].fillna("").str.lower().str.strip()
-
-    # Key simple (En producción considerar hashear)
-    df["customer_key_name"] = (ln + "|" + fn).str.replace(r"\s+", " ", regex=True)
+    # Una vez por par (apellido, nombre) distinto
+    pairs = list(zip(df["last_name"].tolist(), df["first_name"].tolist()))
+    keys = {pair: customer_key(*pair) for pair in dict.fromkeys(pairs)}
 
-    # "Confianza" baja porque solo es nombre
-    df["customer_key_confidence"] = "low"
+    df["customer_key_name"] = [keys[pair][0] for pair in pairs]
+    df["customer_key_confidence"] = [keys[pair][1] for pair in pairs]
 
     return df
-
-# =============== MODIFICAR ====================
-# En un futuro habría que lidiar con deduplicación de clientes. 
-    # Para esto hay que lidiar con el problema de falta de ID único por cliente. 
-# También hay que averiguar donde se guarda la info personal de cada cliente. 
-
-# Una solución es implementar una solución temporal por fuera de Opera (Ej. Planilla propia) que cree un "client_id" 
-
-def basic_clean(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Aplica una limpieza básica de datos al DataFrame.
-
-    - Convierte la columna 'rate' a numérica
-    - Elimina filas sin 'reservation_id' o 'arrival_date'
-
-    Esta función asume que el DataFrame ya fue validado.
-
-    Parameters
-    ----------
-    df : pd.DataFrame
-        DataFrame validado y con columnas normalizadas.
-
-    Returns
-    -------
-    pd.DataFrame
-        DataFrame limpio, listo para consolidación o carga.
-    """
-    # Crea una copia del DataFrame para trabajar de forma segura
-    df = df.copy()
-
-    # Convierte la columna 'rate' a tipo numérico
-    # errors="coerce" convierte valores inválidos en NaN
-    df["rate"] = pd.to_numeric(df["rate"], errors="coerce")
-
-    # Elimina filas donde falte información crítica
-    # (reservación o fecha de llegada)
-    df = df.dropna(subset=["confirmation_number", "arrival_date", "name"])   # TODO: MODIFICAR cuando corresponda
-
-    # Devuelve el DataFrame limpio
-    return df
\ No newline at end of file
@@ -65,4 +65,17 @@ def setup_logger(log_dir: Path) -> logging.Logger:
     logger.addHandler(ch)
 
     # Devuelve el logger ya configurado
-    return logger
\ No newline at end of file
+    return logger
+
+
+def log_file_path(logger: logging.Logger) -> Path | None:
+    """
+    Ruta del archivo de log de la corrida (el FileHandler de `setup_logger`).
+
+    Sirve para dejar otros archivos de la corrida al lado del log
+    (ej: métricas). None si el logger no escribe a archivo.
+    """
+    for handler in logger.handlers:
+        if isinstance(handler, logging.FileHandler):
+            return Path(handler.baseFilename)
+    return None
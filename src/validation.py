@@ -0,0 +1,211 @@
+from collections import Counter
+from pathlib import Path
+import os
+
+import numpy as np
+import pandas as pd
+
+# Columna (primera del archivo de cuarentena) con los motivos de rechazo
+REJECTION_COLUMN = "rejection_reasons"
+
+# Códigos de propiedad conocidos (ALMASPDV = Stgo, ALMASPUQ = Pta. Arenas, ALMASPUQX = Pta. Arenas Express)
+DEFAULT_KNOWN_PROPERTIES = ("ALMASPDV", "ALMASPUQ", "ALMASPUQX")
+
+# Formato de fechas del export (mismo que src.transform.OPERA_DATE_FORMAT)
+_DATE_FORMAT = "%d-%m-%Y"
+
+# Columnas numéricas opcionales (se validan si vienen) -> si deben ser enteras
+# (mismo esquema que src.transform.OPERA_DTYPES)
+_OPTIONAL_NUMBERS = {"balance": False, "nights": True, "rooms": True, "adults": True, "children": True}
+
+
+def _per_unique(values: pd.Series, fn) -> np.ndarray:
+    """
+    Aplica `fn` (texto -> bool) una vez por valor distinto y lo expande a filas.
+
+    Los nulos se evalúan como "". Mismo patrón que el resto del pipeline
+    (factorize -> trabajo sobre únicos -> códigos): los exports tienen
+    pocos valores distintos por columna de texto.
+    """
+    codes, uniques = pd.factorize(values)
+    table = np.array([fn(str(u)) for u in uniques] + [fn("")], dtype=bool)
+    return table[codes]       # código -1 (nulo) -> última posición
+
+
+def _is_blank(values: pd.Series) -> np.ndarray:
+    # Nulo o texto vacío / solo espacios (columnas no textuales: solo nulos)
+    if pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values.isna().to_numpy()
+    return _per_unique(values, lambda text: not text.strip())
+
+
+def _as_number(values: pd.Series, integer: bool = False) -> tuple[pd.Series, np.ndarray, np.ndarray]:
+    """
+    Convierte a número y separa celdas vacías de valores no numéricos.
+
+    Con `integer=True`, un número con decimales también cuenta como no
+    numérico (columnas Int64 del esquema).
+
+    Returns
+    -------
+    tuple[pd.Series, np.ndarray, np.ndarray]
+        (valores numéricos, máscara vacíos, máscara no numéricos).
+    """
+    numbers = pd.to_numeric(values, errors="coerce")
+    missing = numbers.isna().to_numpy()
+
+    # Solo las celdas que no convirtieron se revisan como texto (suelen ser pocas)
+    blank = missing.copy()
+    if missing.any():
+        blank[missing] = _is_blank(values[missing])
+
+    invalid = missing & ~blank
+    if integer:
+        invalid |= numbers.mod(1).fillna(0).ne(0).to_numpy()
+
+    return numbers, blank, invalid
+
+
+class RowValidator:
+    """
+    Validación por fila del export ya normalizado.
+
+    Cada regla es una máscara booleana sobre columnas completas (sin
+    Python por fila); todas se evalúan en una pasada y las filas que
+    fallan al menos una se separan con sus motivos.
+
+    Reglas:
+    - confirmation_number presente y numérico
+    - name presente
+    - arrival / departure presentes y con fecha válida (dd-mm-YYYY)
+    - arrival < departure
+    - rate numérico (si viene) y no negativo
+    - balance, nights, rooms, adults y children numéricos (si vienen;
+      enteros salvo balance)
+    - property dentro de los códigos conocidos (si se entregan)
+    """
+
+    def __init__(self, known_properties=DEFAULT_KNOWN_PROPERTIES):
+        self.known_properties = frozenset(p.strip().upper() for p in known_properties or ())
+
+    def masks(self, df: pd.DataFrame) -> dict[str, np.ndarray]:
+        """
+        Evalúa todas las reglas.
+
+        Returns
+        -------
+        dict[str, np.ndarray]
+            Motivo -> máscara de filas que fallan la regla.
+        """
+        _, confirmation_blank, confirmation_invalid = _as_number(df["confirmation_number"], integer=True)
+
+        arrival = pd.to_datetime(df["arrival"], format=_DATE_FORMAT, errors="coerce")
+        departure = pd.to_datetime(df["departure"], format=_DATE_FORMAT, errors="coerce")
+
+        rate, _, rate_invalid = _as_number(df["rate"])
+
+        masks = {
+            "confirmation_number vacío": confirmation_blank,
+            "confirmation_number no numérico": confirmation_invalid,
+            "name vacío": _is_blank(df["name"]),
+            "arrival inválida": arrival.isna().to_numpy(),
+            "departure inválida": departure.isna().to_numpy(),
+            "departure no posterior a arrival": (departure <= arrival).to_numpy(dtype=bool),
+            "rate no numérico": rate_invalid,
+            "rate negativo": (rate < 0).to_numpy(dtype=bool),
+        }
+
+        for column, integer in _OPTIONAL_NUMBERS.items():
+            if column in df.columns:
+                masks[f"{column} no numérico"] = _as_number(df[column], integer=integer)[2]
+
+        if self.known_properties:
+            known = self.known_properties
+            masks["property desconocida"] = _per_unique(df["property"], lambda text: text.strip().upper() not in known)
+
+        return masks
+
+    def split(self, df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Separa filas válidas y rechazadas.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame con columnas normalizadas (ya pasó `validate`).
+
+        Returns
+        -------
+        tuple[pd.DataFrame, pd.DataFrame]
+            (filas válidas, filas rechazadas con la columna REJECTION_COLUMN).
+            Si no hay rechazos, el primero es el mismo DataFrame recibido.
+        """
+        masks = self.masks(df)
+        reasons = list(masks)
+        matrix = np.column_stack([masks[r] for r in reasons]) if len(df) else np.zeros((0, len(reasons)), dtype=bool)
+
+        bad = matrix.any(axis=1)
+        if not bad.any():
+            return df, df.iloc[:0].assign(**{REJECTION_COLUMN: pd.Series(dtype="string")})
+
+        # Cada combinación de reglas falladas -> un entero (bits); el texto
+        # de motivos se arma una vez por combinación distinta, no por fila
+        bits = matrix[bad] @ (1 << np.arange(len(reasons), dtype=np.int64))
+        combos, codes = np.unique(bits, return_inverse=True)
+        labels = np.array(
+            ["; ".join(r for i, r in enumerate(reasons) if combo >> i & 1) for combo in combos],
+            dtype=object,
+        )
+
+        rejected = df.take(np.flatnonzero(bad))
+        rejected.insert(0, REJECTION_COLUMN, labels[codes])
+
+        good = df.take(np.flatnonzero(~bad))
+        return good, rejected
+
+
+class Quarantine:
+    """
+    Archivo de cuarentena: filas rechazadas con sus motivos.
+
+    Se escribe por bloques (CSV en modo append) igual que `CsvOutput`, y
+    se crea solo si llega al menos una fila rechazada:
+    output_dir/quarantine_<archivo>.csv.
+    """
+
+    def __init__(self, output_dir: Path, source_name: str):
+        self.path = output_dir / f"quarantine_{source_name}.csv"
+        self._tmp_path = output_dir / f".{self.path.stem}.{os.getpid()}.tmp.csv"
+        self.rows = 0
+        self.reasons: Counter = Counter()
+
+    def add(self, rejected: pd.DataFrame) -> None:
+        if rejected.empty:
+            return
+
+        self._tmp_path.parent.mkdir(parents=True, exist_ok=True)
+        rejected.to_csv(
+            self._tmp_path,
+            mode="a" if self.rows else "w",
+            header=not self.rows,
+            index=False,
+            encoding="utf-8",
+        )
+        self.rows += len(rejected)
+
+        # Conteo por motivo individual (una fila puede tener varios)
+        for label, count in rejected[REJECTION_COLUMN].value_counts().items():
+            for reason in label.split("; "):
+                self.reasons[reason] += count
+
+    def close(self) -> Path | None:
+        """
+        Publica el archivo de cuarentena (None si no hubo rechazos).
+        """
+        if not self.rows:
+            return None
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self._tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,205 @@
+from collections.abc import Callable
+from pathlib import Path
+import logging
+import os
+import signal
+import threading
+import time
+
+try:
+    import msvcrt       # solo Windows
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+# Archivo de lock (dentro de state_dir): una sola instancia del pipeline a la vez
+LOCK_FILENAME = "pipeline.lock"
+
+# Tramo máximo de espera entre pasadas (ver watch_loop)
+WAIT_SLICE_SECONDS = 1.0
+
+
+class AlreadyRunningError(RuntimeError):
+    """
+    Otra instancia del pipeline tiene tomado el lock.
+    """
+
+
+class InstanceLock:
+    """
+    Lock de instancia única sobre un archivo en state_dir.
+
+    Usa el lock del sistema operativo (`msvcrt.locking` en Windows,
+    `fcntl.flock` en el resto), no la mera existencia del archivo: si el
+    proceso muere, el sistema libera el lock y no queda un lock huérfano
+    que haya que borrar a mano. El archivo guarda el PID del dueño, solo
+    como referencia para quien lo revise.
+
+    Se usa como context manager:
+
+        with InstanceLock(settings.state_dir):
+            ...
+
+    Raises
+    ------
+    AlreadyRunningError
+        Al entrar, si otra instancia tiene el lock.
+    """
+
+    def __init__(self, state_dir: Path):
+        self.path = state_dir / LOCK_FILENAME
+        self._fh = None
+
+    def acquire(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # "a+" no trunca: el PID del dueño actual se pierde solo si se obtiene el lock
+        fh = open(self.path, "a+")
+        try:
+            if msvcrt is not None:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            raise AlreadyRunningError(
+                f"Otra instancia del pipeline está corriendo (PID {self._owner()}, lock {self.path})"
+            )
+
+        fh.seek(0)
+        fh.truncate()
+        fh.write(str(os.getpid()))
+        fh.flush()
+        self._fh = fh
+
+    def _owner(self) -> str:
+        # En Windows el byte bloqueado no se puede leer desde otro proceso
+        try:
+            return self.path.read_text().strip() or "?"
+        except OSError:
+            return "?"
+
+    def release(self) -> None:
+        if self._fh is None:
+            return
+        try:
+            if msvcrt is not None:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> "InstanceLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class ShutdownRequest:
+    """
+    Apagado ordenado ante Ctrl+C / SIGTERM (y Ctrl+Break en Windows).
+
+    La primera señal solo marca el evento `stop`: el ciclo termina el
+    archivo en curso y sale en vez de cortarlo a la mitad (archivo sin
+    archivar, índices a medio escribir). Una segunda señal corta de
+    inmediato con KeyboardInterrupt.
+
+    Los handlers se instalan al entrar y se restauran al salir. Debe
+    usarse desde el hilo principal (restricción de `signal`).
+    """
+
+    SIGNALS = ("SIGINT", "SIGTERM", "SIGBREAK")
+
+    def __init__(self, logger: logging.Logger | None = None):
+        self.stop = threading.Event()
+        self._logger = logger
+        self._previous = {}
+
+    def _handle(self, signum, frame) -> None:
+        if self.stop.is_set():
+            raise KeyboardInterrupt
+        self.stop.set()
+        if self._logger:
+            self._logger.info(f"Señal {signal.Signals(signum).name}: se termina el trabajo en curso y se sale")
+
+    def __enter__(self) -> "ShutdownRequest":
+        for name in self.SIGNALS:
+            sig = getattr(signal, name, None)     # SIGBREAK solo existe en Windows
+            if sig is not None:
+                self._previous[sig] = signal.signal(sig, self._handle)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for sig, handler in self._previous.items():
+            signal.signal(sig, handler)
+        self._previous.clear()
+
+    @classmethod
+    def ignore_signals(cls) -> None:
+        """
+        Ignora las señales de apagado en el proceso actual.
+
+        Se usa como `initializer` de los pools de procesos: Ctrl+C llega a
+        todo el grupo de procesos y, con fork, los workers heredan el
+        handler. Así solo el proceso principal decide el apagado y cada
+        worker termina el archivo que tiene entre manos.
+        """
+        for name in cls.SIGNALS:
+            sig = getattr(signal, name, None)
+            if sig is not None:
+                signal.signal(sig, signal.SIG_IGN)
+
+
+def watch_loop(
+        tick: Callable[[], None],
+        interval: float,
+        stop: threading.Event,
+        logger: logging.Logger,
+) -> int:
+    """
+    Ejecuta `tick` cada `interval` segundos hasta que se pida detener.
+
+    El intervalo se cuenta desde el inicio de cada pasada, así una pasada
+    larga no atrasa las siguientes. La espera es sobre `stop`, por lo que
+    una señal de apagado despierta el ciclo de inmediato. Un error en una
+    pasada se registra y el ciclo sigue (la próxima pasada reintenta).
+
+    Parameters
+    ----------
+    tick : Callable[[], None]
+        Una pasada del pipeline (Outlook + pendientes del directorio).
+    interval : float
+        Segundos entre el inicio de una pasada y el de la siguiente.
+    stop : threading.Event
+        Evento de apagado (ver `ShutdownRequest`).
+    logger : logging.Logger
+        Logger del pipeline.
+
+    Returns
+    -------
+    int
+        Pasadas ejecutadas.
+    """
+    ticks = 0
+    while not stop.is_set():
+        started = time.monotonic()
+        try:
+            tick()
+        except Exception as e:
+            logger.exception(f"Error en la pasada del modo watch: {e}")
+        ticks += 1
+
+        # Espera en tramos cortos: en Windows un wait largo no se
+        # interrumpe con Ctrl+C hasta que vence
+        while not stop.is_set():
+            remaining = interval - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            stop.wait(min(remaining, WAIT_SLICE_SECONDS))
+
+    return ticks
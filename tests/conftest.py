@@ -0,0 +1,27 @@
+import pytest
+
+from src.config import get_settings
+
+PIPELINE_DIRS = {"INPUT_DIR": "in", "ARCHIVE_DIR": "arch", "OUTPUT_DIR": "out", "LOG_DIR": "log", "STATE_DIR": "state"}
+
+
+@pytest.fixture
+def pipeline_settings(tmp_path, monkeypatch):
+    """
+    Arma un `Settings` con sus directorios bajo tmp_path/<name>.
+
+    Las variables extra (ej: READ_CHUNKSIZE="5") se pasan como keywords;
+    sin Outlook y con output CSV por defecto.
+    """
+    def make(name: str = "run", **env: str):
+        for var, folder in PIPELINE_DIRS.items():
+            path = tmp_path / name / folder
+            path.mkdir(parents=True, exist_ok=True)
+            monkeypatch.setenv(var, str(path))
+
+        monkeypatch.delenv("READ_CHUNKSIZE", raising=False)
+        for var, value in {"ENABLE_OUTLOOK_DOWNLOAD": "0", "OUTPUT_FORMATS": "csv", **env}.items():
+            monkeypatch.setenv(var, value)
+        return get_settings()
+
+    return make
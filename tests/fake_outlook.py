@@ -0,0 +1,187 @@
+"""
+Objetos MAPI falsos para probar src.download_from_outlook sin Outlook.
+
+Imitan solo lo que usa el módulo (Items.Restrict/Sort/GetFirst/GetNext,
+Attachments 1-based, UnRead/Save/Move) y cuentan las llamadas COM en
+`calls` para verificar cuántas idas y vueltas hace cada función.
+"""
+from collections import Counter
+from datetime import datetime
+import sys
+import types
+
+# 43 = olMail
+MAIL_CLASS = 43
+
+
+class Attachment:
+    def __init__(self, name: str, data: bytes, calls: Counter):
+        self.FileName = name
+        self.data = data
+        self._calls = calls
+
+    def SaveAsFile(self, path: str) -> None:
+        self._calls["SaveAsFile"] += 1
+        with open(path, "wb") as f:
+            f.write(self.data)
+
+
+class Attachments:
+    def __init__(self, attachments: list[Attachment]):
+        self._attachments = attachments
+        self.Count = len(attachments)
+
+    def Item(self, i: int) -> Attachment:
+        return self._attachments[i - 1]
+
+
+class MailItem:
+    def __init__(self, folder, entry_id: str, received: datetime, attachments: list[Attachment], calls: Counter):
+        self.Class = MAIL_CLASS
+        self.EntryID = entry_id
+        self.ReceivedTime = received
+        self.Attachments = Attachments(attachments)
+        self.folder = folder
+        self._unread = True
+        self._calls = calls
+
+    @property
+    def UnRead(self) -> bool:
+        return self._unread
+
+    @UnRead.setter
+    def UnRead(self, value: bool) -> None:
+        self._calls["UnRead"] += 1
+        self._unread = value
+
+    def Save(self) -> None:
+        self._calls["Save"] += 1
+
+    def Move(self, folder) -> "MailItem":
+        self._calls["Move"] += 1
+        self.folder.messages.remove(self)
+        folder.messages.append(self)
+        self.folder = folder
+        return self
+
+
+class Items:
+    """
+    Colección Items: se recorre con GetFirst/GetNext y cuenta cada ítem entregado.
+    """
+
+    def __init__(self, messages: list[MailItem], calls: Counter):
+        self._messages = list(messages)
+        self._pos = 0
+        self._calls = calls
+        self.filters: list[str] = []
+
+    def __iter__(self):
+        raise AssertionError("Items se debe recorrer con GetFirst/GetNext")
+
+    @property
+    def Count(self) -> int:
+        return len(self._messages)
+
+    def Restrict(self, dasl: str) -> "Items":
+        self._calls["Restrict"] += 1
+        messages = self._messages
+        if '"urn:schemas:httpmail:read" = 0' in dasl:
+            messages = [m for m in messages if m.UnRead]
+        if '"urn:schemas:httpmail:hasattachment" = 1' in dasl:
+            messages = [m for m in messages if m.Attachments.Count]
+
+        restricted = Items(messages, self._calls)
+        restricted.filters = [*self.filters, dasl]
+        return restricted
+
+    def Sort(self, prop: str, descending: bool = False) -> None:
+        assert prop == "[ReceivedTime]"
+        self._messages.sort(key=lambda m: m.ReceivedTime, reverse=descending)
+
+    def GetFirst(self) -> MailItem | None:
+        self._pos = 0
+        return self.GetNext()
+
+    def GetNext(self) -> MailItem | None:
+        if self._pos >= len(self._messages):
+            return None
+        self._calls["GetNext"] += 1
+        self._pos += 1
+        return self._messages[self._pos - 1]
+
+
+class Folder:
+    def __init__(self, name: str, parent=None, calls: Counter | None = None):
+        self.Name = name
+        self.Parent = parent
+        self.Folders: list[Folder] = []
+        self.messages: list[MailItem] = []
+        self.EntryID = f"folder:{name}"
+        self.StoreID = "store"
+        self.calls = calls if calls is not None else Counter()
+        if parent is not None:
+            parent.Folders.append(self)
+
+    @property
+    def Items(self) -> Items:
+        return Items(self.messages, self.calls)
+
+    def add_mail(self, entry_id: str, received: datetime, attachments: dict[str, bytes]) -> MailItem:
+        """
+        Agrega un correo no leído con los adjuntos {nombre: contenido}.
+        """
+        atts = [Attachment(name, data, self.calls) for name, data in attachments.items()]
+        msg = MailItem(self, entry_id, received, atts, self.calls)
+        self.messages.append(msg)
+        return msg
+
+
+class Namespace:
+    """
+    Namespace MAPI con un Inbox (GetDefaultFolder(6)) y sus subcarpetas.
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.inbox = Folder("Inbox", calls=self.calls)
+
+    def folder(self, name: str) -> Folder:
+        return Folder(name, parent=self.inbox, calls=self.calls)
+
+    def GetDefaultFolder(self, n: int) -> Folder:
+        assert n == 6
+        return self.inbox
+
+    def GetFolderFromID(self, entry_id: str, store_id: str) -> Folder:
+        for folder in [self.inbox, *self.inbox.Folders]:
+            if folder.EntryID == entry_id:
+                return folder
+        raise LookupError(entry_id)
+
+
+def install(monkeypatch, namespace: Namespace) -> None:
+    """
+    Reemplaza win32com.client por uno cuyo Dispatch entrega `namespace`.
+
+    Cuenta en `namespace.calls["Dispatch"]` cada conexión nueva a Outlook.
+    """
+
+    class Application:
+        def GetNamespace(self, name: str) -> Namespace:
+            assert name == "MAPI"
+            return namespace
+
+    def dispatch(prog_id: str) -> Application:
+        namespace.calls["Dispatch"] += 1
+        return Application()
+
+    client = types.ModuleType("win32com.client")
+    client.Dispatch = dispatch
+    package = types.ModuleType("win32com")
+    package.client = client
+
+    monkeypatch.setitem(sys.modules, "win32com", package)
+    monkeypatch.setitem(sys.modules, "win32com.client", client)
+    # Sin pywin32 no hay apartamento COM que iniciar (ver AttachmentProducer)
+    monkeypatch.setitem(sys.modules, "pythoncom", None)
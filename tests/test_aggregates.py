@@ -0,0 +1,56 @@
+import pandas as pd
+
+from src.aggregates import AggregateBatch, DailyAggregates
+
+
+def _export(prop: str, arrivals: dict[int, str]) -> pd.DataFrame:
+    # confirmation_number -> llegada (dos noches, una habitación)
+    arrival = pd.to_datetime(list(arrivals.values()))
+    return pd.DataFrame({
+        "confirmation_number": pd.array(list(arrivals), dtype="Int64"),
+        "property": prop,
+        "arrival": arrival,
+        "departure": arrival + pd.Timedelta(days=2),
+        "rooms": 1,
+        "rate": 100.0,
+    })
+
+
+def _apply(state_dir, df: pd.DataFrame, export_time: int) -> None:
+    batch = AggregateBatch()
+    batch.observe(df)
+    batch.add(df)
+
+    aggregates = DailyAggregates(state_dir)
+    try:
+        assert aggregates.apply(batch, export_time)
+        aggregates.commit()
+    finally:
+        aggregates.close()
+
+
+def _stored(state_dir) -> dict[str, set[str]]:
+    aggregates = DailyAggregates(state_dir)
+    try:
+        rows = aggregates._conn.execute("SELECT DISTINCT property, confirmation_number FROM stay_nights").fetchall()
+    finally:
+        aggregates.close()
+    stored = {}
+    for prop, confirmation in rows:
+        stored.setdefault(prop, set()).add(confirmation)
+    return stored
+
+
+def test_export_of_other_property_keeps_reservations(tmp_path):
+    _apply(tmp_path, _export("ALMASPDV", {1: "2026-01-10", 2: "2026-01-20"}), 1)
+    _apply(tmp_path, _export("ALMASPUQ", {3: "2026-01-10"}), 2)
+
+    assert _stored(tmp_path) == {"ALMASPDV": {"1", "2"}, "ALMASPUQ": {"3"}}
+
+
+def test_missing_reservation_removed_only_within_arrival_range(tmp_path):
+    _apply(tmp_path, _export("ALMASPDV", {1: "2026-01-10", 2: "2026-01-12", 3: "2026-02-20"}), 1)
+    # Export más corto (10-01 a 15-01): falta la 2 (cancelada); la 3 está más allá de su horizonte
+    _apply(tmp_path, _export("ALMASPDV", {1: "2026-01-10", 4: "2026-01-15"}), 2)
+
+    assert _stored(tmp_path) == {"ALMASPDV": {"1", "3", "4"}}
@@ -0,0 +1,238 @@
+from datetime import datetime, timedelta, timezone
+import json
+import queue
+
+import pytest
+
+from src import download_from_outlook
+from src.download_from_outlook import (
+    DIGEST_INDEX_NAME,
+    AttachmentProducer,
+    OutlookSession,
+    build_restrict_filter,
+    download_attachments,
+    fetch_mail_attachments,
+    finalize_messages,
+    iter_items,
+)
+from tests import fake_outlook
+
+
+def _received(hour: int) -> datetime:
+    return datetime(2026, 10, 1, hour, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def namespace(monkeypatch):
+    ns = fake_outlook.Namespace()
+    fake_outlook.install(monkeypatch, ns)
+    return ns
+
+
+def test_restrict_filter_default():
+    assert build_restrict_filter() == (
+        '@SQL="urn:schemas:httpmail:read" = 0 AND "urn:schemas:httpmail:hasattachment" = 1'
+    )
+
+
+def test_restrict_filter_since_is_utc():
+    since = datetime(2026, 3, 5, 18, 30, tzinfo=timezone(timedelta(hours=-3)))
+    dasl = build_restrict_filter(since=since, unread_only=False)
+
+    assert dasl == (
+        '@SQL="urn:schemas:httpmail:hasattachment" = 1 AND '
+        '"urn:schemas:httpmail:datereceived" >= \'03/05/2026 09:30 PM\''
+    )
+
+
+def test_restrict_filter_without_conditions():
+    assert build_restrict_filter(unread_only=False, with_attachments=False) is None
+
+
+def test_iter_items_is_lazy(namespace):
+    folder = namespace.folder("Opera test")
+    for i in range(5):
+        folder.add_mail(f"E{i}", _received(i), {})
+
+    it = iter_items(folder.Items)
+    assert namespace.calls["GetNext"] == 0
+
+    first = next(it)
+    assert first.EntryID == "E0"
+    assert namespace.calls["GetNext"] == 1
+
+    assert [m.EntryID for m in it] == ["E1", "E2", "E3", "E4"]
+    assert namespace.calls["GetNext"] == 5
+
+
+def test_download_attachments_does_not_touch_messages(namespace, tmp_path):
+    folder = namespace.folder("Opera test")
+    folder.add_mail("E1", _received(10), {"opera_export_1.csv": b"1", "firma.png": b"png"})
+    # Mismo contenido que E1: se omite, pero el correo cuenta como procesado
+    folder.add_mail("E2", _received(11), {"opera_export_1.csv": b"1"})
+    folder.add_mail("E3", _received(12), {"notas.txt": b"x"})
+
+    saved, handled = download_attachments(folder, tmp_path, {".csv"})
+
+    assert saved == 1
+    assert [m.EntryID for m in handled] == ["E1", "E2"]
+    assert sorted(p.name for p in tmp_path.glob("*.csv")) == ["opera_export_1.csv"]
+    assert namespace.calls["SaveAsFile"] == 2
+    assert namespace.calls["UnRead"] == namespace.calls["Save"] == namespace.calls["Move"] == 0
+
+
+def test_digest_index_written_once_per_pass(namespace, tmp_path, monkeypatch):
+    folder = namespace.folder("Opera test")
+    for i in range(3):
+        folder.add_mail(f"E{i}", _received(i), {f"opera_export_{i}.csv": str(i).encode()})
+
+    saves = []
+    save = download_from_outlook._save_digest_index
+
+    def counting_save(*args):
+        saves.append(args)
+        save(*args)
+
+    monkeypatch.setattr(download_from_outlook, "_save_digest_index", counting_save)
+
+    saved, _ = download_attachments(folder, tmp_path, {".csv"})
+
+    assert saved == 3
+    assert len(saves) == 1
+    # La fecha del export queda en el archivo antes de que se escriba el índice
+    assert (tmp_path / "opera_export_1.csv").stat().st_mtime == _received(1).timestamp()
+
+
+def test_digest_index_prunes_archived_entries(namespace, tmp_path):
+    folder = namespace.folder("Opera test")
+    kwargs = dict(allowed_ext={".csv"}, state_dir=tmp_path / "state")
+    input_dir = tmp_path / "input"
+    for i in range(3):
+        folder.add_mail(f"E{i}", _received(i), {f"opera_export_{i}.csv": str(i).encode()})
+    fetch_mail_attachments(["Inbox", "Opera test"], input_dir, **kwargs)
+
+    # 0 y 1 ya se procesaron y archivaron; 2 quedó pendiente (ej: falló)
+    (input_dir / "opera_export_0.csv").unlink()
+    (input_dir / "opera_export_1.csv").unlink()
+
+    folder.add_mail("E3", _received(12), {"opera_export_3.csv": b"3"})
+    fetch_mail_attachments(["Inbox", "Opera test"], input_dir, **kwargs)
+
+    index = json.loads((input_dir / DIGEST_INDEX_NAME).read_text(encoding="utf-8"))
+    assert sorted(e["file"] for e in index["digests"].values()) == ["opera_export_2.csv", "opera_export_3.csv"]
+    assert index["counters"]["opera_export_0.csv"] == 0
+
+
+def test_finalize_messages_moves_once_without_save(namespace):
+    folder = namespace.folder("Opera test")
+    processed = namespace.folder("Procesados")
+    messages = [folder.add_mail(f"E{i}", _received(i), {}) for i in range(3)]
+
+    moved, failed = finalize_messages(messages, processed)
+
+    assert (moved, failed) == (3, 0)
+    assert namespace.calls["Move"] == 3
+    assert namespace.calls["Save"] == 0
+    assert folder.messages == []
+    assert not any(m.UnRead for m in processed.messages)
+
+
+def test_finalize_messages_without_destination_saves_once(namespace):
+    folder = namespace.folder("Opera test")
+    messages = [folder.add_mail(f"E{i}", _received(i), {}) for i in range(3)]
+
+    assert finalize_messages(messages) == (0, 0)
+    assert namespace.calls["Save"] == 3
+    assert namespace.calls["Move"] == 0
+    assert not any(m.UnRead for m in folder.messages)
+
+
+def test_fetch_mail_attachments_single_pass(namespace, tmp_path):
+    folder = namespace.folder("Opera test")
+    processed = namespace.folder("Procesados")
+    for i in range(3):
+        folder.add_mail(f"E{i}", _received(i), {f"opera_export_{i}.csv": str(i).encode()})
+
+    saved = fetch_mail_attachments(
+        ["Inbox", "Opera test"],
+        tmp_path / "input",
+        allowed_ext={".csv"},
+        processed_folder_name="Procesados",
+        state_dir=tmp_path / "state",
+    )
+
+    assert saved == 3
+    assert namespace.calls["Restrict"] == 1
+    assert namespace.calls["GetNext"] == 3
+    assert namespace.calls["Move"] == 3
+    assert namespace.calls["Save"] == 0
+    assert [m.EntryID for m in processed.messages] == ["E0", "E1", "E2"]
+
+
+def _drain(file_queue: queue.Queue) -> list:
+    items = []
+    while True:
+        item = file_queue.get(timeout=5)
+        items.append(item)
+        if item is None:
+            return items
+
+
+def test_producer_queues_attachments_oldest_first(namespace, tmp_path):
+    folder = namespace.folder("Opera test")
+    # Llegan a la carpeta desordenados
+    folder.add_mail("E3", _received(12), {"opera_export_3.csv": b"3"})
+    folder.add_mail("E1", _received(10), {"opera_export_1.csv": b"1"})
+    folder.add_mail("E2", _received(11), {"opera_export_2.csv": b"2"})
+
+    file_queue = queue.Queue(maxsize=1)
+    producer = AttachmentProducer(
+        file_queue,
+        outlook_folder_path=["Inbox", "Opera test"],
+        output_dir=tmp_path / "input",
+        allowed_ext={".csv"},
+        state_dir=tmp_path / "state",
+    )
+    producer.start()
+    items = _drain(file_queue)
+    producer.join(timeout=5)
+
+    assert producer.error is None
+    assert producer.saved == 3
+    assert [p.name for p in items[:-1]] == ["opera_export_1.csv", "opera_export_2.csv", "opera_export_3.csv"]
+    assert items[-1] is None
+    assert not any(m.UnRead for m in folder.messages)
+
+
+def test_producer_puts_sentinel_on_error(namespace, tmp_path):
+    file_queue = queue.Queue()
+    producer = AttachmentProducer(
+        file_queue,
+        outlook_folder_path=["Inbox", "No existe"],
+        output_dir=tmp_path / "input",
+        allowed_ext={".csv"},
+    )
+    producer.start()
+    producer.join(timeout=5)
+
+    assert isinstance(producer.error, ValueError)
+    assert _drain(file_queue) == [None]
+
+
+def test_session_connects_once_across_runs(namespace, tmp_path):
+    folder = namespace.folder("Opera test")
+    kwargs = dict(outlook_folder_path=["Inbox", "Opera test"], output_dir=tmp_path / "input", allowed_ext={".csv"})
+
+    with OutlookSession() as session:
+        for i in range(3):
+            folder.add_mail(f"E{i}", _received(i), {f"opera_export_{i}.csv": str(i).encode()})
+            file_queue = queue.Queue()
+            producer = AttachmentProducer(file_queue, session=session, **kwargs)
+            producer.start()
+            items = _drain(file_queue)
+            producer.join(timeout=5)
+
+            assert producer.error is None
+            assert [p.name for p in items[:-1]] == [f"opera_export_{i}.csv"]
+
+    assert namespace.calls["Dispatch"] == 1
@@ -0,0 +1,108 @@
+from pathlib import Path
+import logging
+
+import pandas as pd
+import pytest
+
+from src import extract, main
+from src.extract import read_export
+from src.transform import transform_export
+from src.validation import REJECTION_COLUMN, Quarantine
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "input_mail" / "reservations_test.csv"
+
+logger = logging.getLogger("hotel_automation.tests")
+
+# (columna en la exportación, columna normalizada, valor crudo) -> motivo
+BAD_CELLS = {
+    ("Rate", "rate", "abc"): "rate no numérico",
+    ("ConfirmationNumber", "confirmation_number", "33356X932"): "confirmation_number no numérico",
+    ("Nights", "nights", "x"): "nights no numérico",
+    ("Arrival", "arrival", "31-02-2026"): "arrival inválida",
+}
+
+
+def _write_export(directory: Path, ext: str) -> Path:
+    df = pd.read_csv(SAMPLE, dtype=str, keep_default_na=False)
+    for row, (column, _, value) in enumerate(BAD_CELLS):
+        df.loc[row, column] = value
+
+    path = directory / f"opera_export_1.{ext}"
+    if ext == "csv":
+        df.to_csv(path, index=False)
+    else:
+        pytest.importorskip("openpyxl")
+        df.to_excel(path, index=False)
+    return path
+
+
+@pytest.fixture(params=["csv", "xlsx"])
+def export_path(request, tmp_path):
+    return _write_export(tmp_path, request.param)
+
+
+def _run(path: Path, chunksize: int | None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    quarantine = Quarantine(path.parent / "out", path.stem)
+    frames = read_export(path, chunksize=chunksize)
+    if chunksize is None:
+        frames = [frames]
+    clean = pd.concat([transform_export(df, quarantine=quarantine) for df in frames], ignore_index=True)
+    rejected = pd.read_csv(quarantine.close(), dtype=str, keep_default_na=False)
+    return clean, rejected
+
+
+@pytest.mark.parametrize("chunksize", [None, 5])
+def test_bad_cells_go_to_quarantine_with_raw_text(export_path, chunksize):
+    clean, rejected = _run(export_path, chunksize)
+
+    assert len(rejected) == len(BAD_CELLS)
+    for (_, column, value), reason in BAD_CELLS.items():
+        row = rejected[rejected[column] == value]
+        assert len(row) == 1, (column, value)
+        assert reason in row[REJECTION_COLUMN].iloc[0]
+
+    total = len(pd.read_csv(SAMPLE))
+    assert len(clean) == total - len(BAD_CELLS)
+    assert str(clean["confirmation_number"].dtype) == "Int64"
+    assert str(clean["rate"].dtype) == "float64"
+    assert str(clean["nights"].dtype) == "Int64"
+    assert pd.api.types.is_datetime64_any_dtype(clean["arrival"])
+
+
+def test_clean_csv_keeps_typed_read(tmp_path):
+    path = tmp_path / "opera_export_1.csv"
+    path.write_bytes(SAMPLE.read_bytes())
+
+    df = read_export(path)
+
+    assert str(df["ConfirmationNumber"].dtype) == "Int64"
+    assert str(df["Rate"].dtype) == "float64"
+    assert pd.api.types.is_datetime64_any_dtype(df["Arrival"])
+
+
+def _pipeline_outputs(settings, ext: str) -> dict[str, pd.DataFrame]:
+    path = _write_export(settings.input_dir, ext)
+    main.process_file(path, settings, logger, settings.archive_dir)
+
+    return {
+        p.name.split("_")[0]: pd.read_csv(p, dtype=str, keep_default_na=False)
+        for p in settings.output_dir.glob("*.csv")
+    }
+
+
+@pytest.mark.parametrize("calamine", [True, False], ids=["calamine", "openpyxl"])
+def test_excel_export_full_path_matches_csv(pipeline_settings, monkeypatch, calamine):
+    if calamine and not extract.HAS_CALAMINE:
+        pytest.skip("python-calamine no está instalado")
+    monkeypatch.setattr(extract, "HAS_CALAMINE", calamine)
+
+    expected = _pipeline_outputs(pipeline_settings("csv"), "csv")
+    assert set(expected) == {"opera", "quarantine"}
+
+    for name, chunksize in [("xlsx", None), ("xlsx_chunked", "5")]:
+        env = {"READ_CHUNKSIZE": chunksize} if chunksize else {}
+        outputs = _pipeline_outputs(pipeline_settings(name, **env), "xlsx")
+
+        assert outputs.keys() == expected.keys()
+        for key, df in expected.items():
+            pd.testing.assert_frame_equal(outputs[key], df, obj=f"{name}: {key}")
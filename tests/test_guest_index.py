@@ -0,0 +1,49 @@
+import pandas as pd
+
+from src.guest_index import GuestIndex
+from src.names import CONFIDENCE_HIGH
+
+
+def _reservations(rows: list[tuple[int, str]]) -> pd.DataFrame:
+    return pd.DataFrame({
+        "confirmation_number": pd.array([c for c, _ in rows], dtype="Int64"),
+        "customer_key_name": [key for _, key in rows],
+        "customer_key_confidence": CONFIDENCE_HIGH,
+        "property": "ALMASPDV",
+    })
+
+
+def _assign(state_dir, df: pd.DataFrame, source_name: str) -> tuple[pd.DataFrame, GuestIndex]:
+    index = GuestIndex(state_dir)
+    try:
+        return index.assign(df, source_name), index
+    finally:
+        index.close()
+
+
+def test_reprocessing_same_file_is_not_returning(tmp_path):
+    rows = [(1, "perez|jose"), (2, "soto|maria")]
+    first, index = _assign(tmp_path, _reservations(rows), "opera_export_1.csv")
+    assert index.stats.new == 2
+
+    again, index = _assign(tmp_path, _reservations(rows), "opera_export_1.csv")
+    assert index.stats.new == 0
+    assert index.stats.returning == set()
+    assert again["guest_id"].tolist() == first["guest_id"].tolist()
+    assert again["customer_key_confidence"].tolist() == first["customer_key_confidence"].tolist()
+
+
+def test_same_reservation_in_next_export_is_not_returning(tmp_path):
+    _assign(tmp_path, _reservations([(1, "perez|jose")]), "opera_export_1.csv")
+    _, index = _assign(tmp_path, _reservations([(1, "perez|jose")]), "opera_export_2.csv")
+
+    assert index.stats.returning == set()
+
+
+def test_new_reservation_is_returning(tmp_path):
+    first, _ = _assign(tmp_path, _reservations([(1, "perez|jose")]), "opera_export_1.csv")
+    second, index = _assign(tmp_path, _reservations([(1, "perez|jose"), (3, "perez|jose")]), "opera_export_2.csv")
+
+    guest_id = first["guest_id"].iloc[0]
+    assert second["guest_id"].tolist() == [guest_id, guest_id]
+    assert index.stats.returning == {guest_id}
@@ -0,0 +1,97 @@
+from contextlib import closing
+from pathlib import Path
+import logging
+import os
+import sqlite3
+
+import pandas as pd
+
+from src import main
+from src.extract import read_export
+from src.ingest_index import INDEX_DB_NAME, ReservationIndex
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "input_mail" / "reservations_test.csv"
+
+logger = logging.getLogger("hotel_automation.tests")
+
+
+def _export(path: Path, rate: str, mtime: int) -> Path:
+    df = pd.read_csv(SAMPLE, dtype=str, keep_default_na=False)
+    df["Rate"] = rate
+    df.to_csv(path, index=False)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_index_keeps_newest_export_when_workers_finish_out_of_order(pipeline_settings):
+    settings = pipeline_settings(INCREMENTAL_INGEST="1")
+
+    older = _export(settings.input_dir / "opera_export_1.csv", "80.00", 1_700_000_000)
+    newer = _export(settings.input_dir / "opera_export_2.csv", "95.00", 1_700_003_600)
+
+    # El worker del export más nuevo termina primero
+    states = {}
+    for path in (newer, older):
+        states[path] = main.process_file(path, settings, logger, settings.archive_dir, defer_commit=True)
+
+    # Nada queda en el índice hasta confirmar, y se confirma en orden de export
+    index = ReservationIndex(settings.state_dir)
+    assert len(index.filter_new_or_changed(read_export(newer))) == len(pd.read_csv(SAMPLE))
+    index.close()
+
+    for path in (older, newer):
+        main.commit_file_state(states[path], settings, logger, settings.archive_dir)
+
+    index = ReservationIndex(settings.state_dir)
+    try:
+        index.filter_new_or_changed(read_export(settings.archive_dir / newer.name))
+        assert index.stats.updated == 0 and index.stats.inserted == 0
+    finally:
+        index.close()
+
+
+def _overlapping_exports(directory: Path) -> list[Path]:
+    """
+    Dos exports del mismo libro: el segundo cambia una tarifa, repite el
+    resto y agrega una reserva nueva.
+    """
+    day1 = pd.read_csv(SAMPLE, dtype=str, keep_default_na=False)
+    day2 = day1.copy()
+    day2.loc[3, "Rate"] = "123.45"
+    new = day1.iloc[[0]].assign(ConfirmationNumber="999000111")
+    day2 = pd.concat([day2, new], ignore_index=True)
+
+    paths = []
+    for i, df in enumerate((day1, day2), 1):
+        path = directory / f"opera_export_{i}.csv"
+        df.to_csv(path, index=False)
+        os.utime(path, (1_700_000_000 + i * 3600,) * 2)
+        paths.append(path)
+    return paths
+
+
+def _incremental_run(settings) -> tuple[list[pd.DataFrame], list[tuple]]:
+    for path in _overlapping_exports(settings.input_dir):
+        main.process_file(path, settings, logger, settings.archive_dir)
+
+    outputs = [
+        pd.read_csv(p, dtype=str, keep_default_na=False)
+        for p in sorted(settings.output_dir.glob("opera_clean_*.csv"), key=lambda p: p.stat().st_mtime_ns)
+    ]
+    with closing(sqlite3.connect(settings.state_dir / INDEX_DB_NAME)) as conn:
+        rows = conn.execute("SELECT confirmation_number, content_hash, source_file FROM reservations ORDER BY 1").fetchall()
+    return outputs, rows
+
+
+def test_chunked_incremental_run_matches_full_read(pipeline_settings):
+    full = _incremental_run(pipeline_settings("full", INCREMENTAL_INGEST="1"))
+    chunked = _incremental_run(pipeline_settings("chunked", INCREMENTAL_INGEST="1", READ_CHUNKSIZE="4"))
+
+    outputs, rows = full
+    # Segundo export: solo la tarifa modificada y la reserva nueva
+    assert [len(df) for df in outputs] == [len(pd.read_csv(SAMPLE)), 2]
+    assert set(outputs[1]["confirmation_number"]) == {outputs[0]["confirmation_number"][3], "999000111"}
+
+    for full_df, chunked_df in zip(outputs, chunked[0], strict=True):
+        pd.testing.assert_frame_equal(full_df, chunked_df)
+    assert rows == chunked[1]
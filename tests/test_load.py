@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from src import load
+from src.load import read_reservation_store, write_outputs
+
+
+def _reservations(rates: dict[str, float]) -> pd.DataFrame:
+    return pd.DataFrame({
+        "confirmation_number": pd.array([int(c) for c in rates], dtype="Int64"),
+        "property": "ALMASPDV",
+        "arrival": pd.Timestamp("2026-01-10"),
+        "rate": list(rates.values()),
+    })
+
+
+def test_excel_by_property_has_its_own_name(tmp_path):
+    paths, _ = write_outputs([_reservations({"1": 80.0})], tmp_path, ("excel", "excel_by_property"))
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    assert paths["excel"].name == f"opera_clean_{today}.xlsx"
+    assert paths["excel_by_property"].name == f"opera_clean_by_property_{today}.xlsx"
+
+
+
+def _by_property_chunks() -> list[pd.DataFrame]:
+    # Propiedades intercaladas entre bloques, una nula y una con "/" (prohibido en hojas)
+    frames = []
+    for chunk, props in enumerate([["ALMASPDV", "ALMASPUQ", "ALMASPDV"], ["ALMASPUQ", None, "PUQ/X"]]):
+        frames.append(pd.DataFrame({
+            "confirmation_number": pd.array([10 * chunk + i for i in range(3)], dtype="Int64"),
+            "property": pd.array(props, dtype="string"),
+            "arrival": pd.to_datetime(["2026-01-10", None, "2026-02-01"]),
+            "rate": [80.5, None, 1234.25],
+        }))
+    return frames
+
+
+@pytest.mark.parametrize("xlsxwriter", [True, False], ids=["xlsxwriter", "openpyxl"])
+def test_excel_by_property_writes_one_sheet_per_property(tmp_path, monkeypatch, xlsxwriter):
+    openpyxl = pytest.importorskip("openpyxl")
+    if xlsxwriter and not load.HAS_XLSXWRITER:
+        pytest.skip("xlsxwriter no está instalado")
+    monkeypatch.setattr(load, "HAS_XLSXWRITER", xlsxwriter)
+
+    chunks = _by_property_chunks()
+    paths, rows = write_outputs(chunks, tmp_path, ("excel_by_property",))
+    assert rows == 6
+
+    sheets = pd.read_excel(paths["excel_by_property"], sheet_name=None)
+    assert list(sheets) == ["ALMASPDV", "ALMASPUQ", "unknown", "PUQ_X"]
+
+    expected = pd.concat(chunks, ignore_index=True)
+    for sheet, prop in [("ALMASPDV", "ALMASPDV"), ("ALMASPUQ", "ALMASPUQ"), ("PUQ_X", "PUQ/X")]:
+        got = sheets[sheet]
+        want = expected[expected["property"] == prop]
+        assert got["confirmation_number"].tolist() == want["confirmation_number"].tolist()
+        assert got["property"].tolist() == [prop] * len(want)
+        pd.testing.assert_series_equal(got["arrival"], want["arrival"].reset_index(drop=True), check_dtype=False)
+        pd.testing.assert_series_equal(got["rate"], want["rate"].reset_index(drop=True), check_dtype=False)
+    assert sheets["unknown"]["confirmation_number"].tolist() == [11]
+
+    # Formato de número por columna: fecha como Opera, montos con decimales
+    ws = openpyxl.load_workbook(paths["excel_by_property"])["ALMASPDV"]
+    assert ws["C2"].number_format == load.EXCEL_DATE_FORMAT
+    assert ws["D2"].number_format == load.EXCEL_AMOUNT_FORMAT
+
+
+def test_excel_by_property_continues_full_sheet(tmp_path, monkeypatch):
+    pytest.importorskip("openpyxl")
+    monkeypatch.setattr(load, "EXCEL_MAX_ROWS", 2)
+
+    df = pd.DataFrame({"confirmation_number": range(5), "property": ["A", "B", "A", "A", "A"]})
+    paths, _ = write_outputs([df], tmp_path, ("excel_by_property",))
+
+    sheets = pd.read_excel(paths["excel_by_property"], sheet_name=None)
+    assert {k: v["confirmation_number"].tolist() for k, v in sheets.items()} == {
+        "A": [0, 2], "B": [1], "A (2)": [3, 4],
+    }
+
+def test_reservation_store_keeps_latest_version(tmp_path):
+    pytest.importorskip("pyarrow")
+    write_outputs([_reservations({"1": 80.0, "2": 50.0})], tmp_path, ("parquet",), "opera_export_1", 1)
+    write_outputs([_reservations({"1": 95.0})], tmp_path, ("parquet",), "opera_export_2", 2)
+
+    raw = pd.read_parquet(tmp_path / "reservations")
+    assert len(raw) == 3
+
+    store = read_reservation_store(tmp_path).set_index("confirmation_number")
+    assert store["rate"].to_dict() == {1: 95.0, 2: 50.0}
+    assert store.loc[1, "source_file"] == "opera_export_2"
+
+
+def test_reservation_store_reprocessing_replaces_parts(tmp_path):
+    pytest.importorskip("pyarrow")
+    write_outputs([_reservations({"1": 80.0})], tmp_path, ("parquet",), "opera_export_1", 1)
+    write_outputs([_reservations({"1": 80.0})], tmp_path, ("parquet",), "opera_export_1", 1)
+
+    assert len(pd.read_parquet(tmp_path / "reservations")) == 1
+
+
+def test_reservation_store_same_name_new_export_keeps_other_rows(tmp_path):
+    pytest.importorskip("pyarrow")
+    write_outputs([_reservations({"1": 80.0, "2": 50.0})], tmp_path, ("parquet",), "opera_export_a", 1)
+    # Con ingesta incremental el export siguiente (mismo nombre) trae solo lo que cambió
+    write_outputs([_reservations({"1": 95.0})], tmp_path, ("parquet",), "opera_export_a", 2)
+
+    store = read_reservation_store(tmp_path).set_index("confirmation_number")
+    assert store["rate"].to_dict() == {1: 95.0, 2: 50.0}
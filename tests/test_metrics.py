@@ -0,0 +1,17 @@
+from src.metrics import RunMetrics, peak_rss_mb
+
+
+def test_peak_rss_is_measured_without_extra_dependencies():
+    # Windows: GetProcessMemoryInfo vía ctypes; resto: resource
+    peak = peak_rss_mb()
+
+    assert peak is not None and peak > 0
+
+
+def test_stage_records_peak_rss():
+    metrics = RunMetrics()
+    with metrics.stage("transform_export", "opera_export_1.csv"):
+        pass
+
+    (record,) = metrics.records
+    assert record.peak_rss_mb is not None and record.peak_rss_mb > 0
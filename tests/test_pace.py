@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pace import PaceTracker, Snapshot, diff_snapshots
+
+
+def _snapshot(rows: dict[int, tuple[str, int, float]]) -> Snapshot:
+    # confirmation_number -> (llegada, room nights, tarifa)
+    return Snapshot(
+        keys=np.array(list(rows), dtype=np.int64),
+        property=np.array(["ALMASPDV"] * len(rows)),
+        arrival=np.array([a for a, _, _ in rows.values()], dtype="datetime64[D]"),
+        room_nights=np.array([n for _, n, _ in rows.values()], dtype=np.int64),
+        rate=np.array([r for _, _, r in rows.values()], dtype=np.float64),
+    )
+
+
+def test_same_file_name_compares_against_previous_export(tmp_path):
+    pytest.importorskip("openpyxl")
+    tracker = PaceTracker(tmp_path / "state")
+    out = tmp_path / "out"
+
+    assert tracker.commit(_snapshot({1: ("2026-01-10", 2, 80.0)}), "opera[export]", 1, out) is None
+    report = tracker.commit(_snapshot({1: ("2026-01-10", 2, 95.0)}), "opera[export]", 2, out)
+
+    assert report is not None
+    detail = pd.read_excel(report, sheet_name="detalle")
+    assert detail[["change", "rate", "prev_rate"]].to_dict("records") == [
+        {"change": "rate_change", "rate": 95.0, "prev_rate": 80.0}
+    ]
+
+
+def test_reprocessing_export_replaces_its_snapshot(tmp_path):
+    pytest.importorskip("openpyxl")
+    tracker = PaceTracker(tmp_path / "state")
+    out = tmp_path / "out"
+
+    tracker.commit(_snapshot({1: ("2026-01-10", 2, 80.0)}), "opera_export", 1, out)
+    tracker.commit(_snapshot({1: ("2026-01-10", 2, 90.0)}), "opera_export", 2, out)
+    report = tracker.commit(_snapshot({1: ("2026-01-10", 2, 95.0)}), "opera_export", 2, out)
+
+    assert len(list(tracker.path.glob("*.npz"))) == 2
+    assert pd.read_excel(report, sheet_name="detalle")["prev_rate"].tolist() == [80.0]
+
+
+def test_arrival_moved_into_window_is_not_pickup():
+    previous = _snapshot({1: ("2026-01-05", 2, 100.0), 2: ("2026-01-10", 1, 50.0)})
+    # La reserva 1 se movió dentro de la ventana del nuevo export (desde el 10-01)
+    current = _snapshot({1: ("2026-01-12", 2, 100.0), 2: ("2026-01-10", 1, 50.0)})
+
+    summary, detail = diff_snapshots(previous, current)
+
+    assert summary["room_night_pickup"].sum() == 0
+    assert summary["revenue_pickup"].sum() == 0
+    assert summary.set_index("arrival")["room_night_pickup"].to_dict() == {
+        pd.Timestamp("2026-01-05"): -2,
+        pd.Timestamp("2026-01-12"): 2,
+    }
+    assert detail["change"].tolist() == ["stay_change"]
+
+
+def test_reservation_outside_window_is_not_cancelled():
+    previous = _snapshot({1: ("2026-01-05", 2, 100.0), 2: ("2026-01-10", 1, 50.0)})
+    current = _snapshot({2: ("2026-01-10", 1, 50.0)})
+
+    summary, detail = diff_snapshots(previous, current)
+
+    assert summary.empty
+    assert detail.empty
@@ -0,0 +1,75 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.rate_rules import RateRules, load_rate_rules
+
+# rate_code -> (breakfast_included, refundable) con la tabla por defecto
+RATE_CODES = {
+    "BAR": (True, True),            # solo la regla comodín \S
+    "BARSD": (False, True),         # sufijo SD gana a la comodín en desayuno
+    "NRF01": (True, False),         # NRF gana a la comodín en reembolsable
+    "NRFSD": (False, False),
+    " barsd ": (False, True),       # sin distinguir mayúsculas ni espacios
+    "": (None, None),               # la comodín exige al menos un carácter
+    "   ": (None, None),
+    None: (None, None),
+}
+
+# travel_agent -> channel
+TRAVEL_AGENTS = {
+    "BOOKING": "Booking.com",
+    "expedia": "Expedia",
+    "": "Directo",
+    None: "Directo",                # sin travel agent = reserva directa
+    "OTRA AGENCIA": None,
+}
+
+
+def _value(x):
+    return None if pd.isna(x) else x
+
+
+def test_default_rules_by_rate_code():
+    df = pd.DataFrame({"rate_code": list(RATE_CODES)})
+
+    out = load_rate_rules().apply(df)
+
+    for code, (breakfast, refundable) in RATE_CODES.items():
+        row = out[df["rate_code"].isna()] if code is None else out[df["rate_code"] == code]
+        assert _value(row["breakfast_included"].iloc[0]) == breakfast, code
+        assert _value(row["refundable"].iloc[0]) == refundable, code
+    assert str(out["breakfast_included"].dtype) == "boolean"
+
+
+def test_default_rules_by_travel_agent():
+    df = pd.DataFrame({"travel_agent": list(TRAVEL_AGENTS)})
+
+    out = load_rate_rules().apply(df)
+
+    assert [_value(v) for v in out["channel"]] == list(TRAVEL_AGENTS.values())
+
+
+def test_rules_file_first_match_wins(tmp_path):
+    path = tmp_path / "rate_rules.json"
+    path.write_text(json.dumps([
+        {"column": "rate_code", "match": "prefix", "pattern": "PROMO", "set": {"refundable": False}},
+        {"column": "rate_code", "match": "regex", "pattern": r"\S", "set": {"refundable": True}},
+    ]), encoding="utf-8")
+
+    out = load_rate_rules(path).apply(pd.DataFrame({"rate_code": ["PROMO10", "BAR"]}))
+
+    assert out["refundable"].tolist() == [False, True]
+    assert "breakfast_included" not in out.columns
+
+
+@pytest.mark.parametrize("record", [
+    {"column": "rate_code", "match": "regex", "pattern": "(", "set": {"refundable": False}},
+    {"column": "rate_code", "pattern": "BAR", "set": {"refundable": "no"}},
+    {"column": "rate_code", "pattern": "BAR", "set": {"minibar": True}},
+    {"column": "room_type", "pattern": "KING", "set": {"refundable": True}},
+])
+def test_invalid_rule_is_rejected(record):
+    with pytest.raises(ValueError):
+        RateRules.from_records([record])
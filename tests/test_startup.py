@@ -0,0 +1,32 @@
+from pathlib import Path
+import subprocess
+import sys
+
+from scripts.bench_startup import HEAVY_MODULES, parse_importtime
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Holgado a propósito: scripts/bench_startup.py mide con el umbral fino (300 ms)
+MAX_IMPORT_MS = 1000
+
+
+def _import_main() -> dict[str, int]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(proc.stderr)
+
+
+def test_import_main_skips_heavy_modules():
+    modules = _import_main()
+
+    assert "src.main" in modules
+    heavy = sorted(m for m in modules if m.split(".")[0] in HEAVY_MODULES)
+    assert heavy == []
+
+
+def test_import_main_within_budget():
+    # Mejor de tres: el primer arranque puede pagar la caché de disco
+    best = min(_import_main()["src.main"] for _ in range(3)) / 1000
+    assert best < MAX_IMPORT_MS
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pandas as pd
+
+from src.extract import read_export
+from src.transform import (
+    CANONICAL_COLUMNS,
+    basic_clean,
+    build_customer_key_name,
+    header_mapping,
+    map_columns,
+    normalize_columns,
+    split_name,
+    transform_export,
+    validate,
+)
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "input_mail" / "reservations_test.csv"
+
+
+def test_chain_matches_transform_export():
+    df = read_export(SAMPLE)
+
+    chained = normalize_columns(df)
+    validate(chained)
+    chained = build_customer_key_name(split_name(basic_clean(chained)))
+
+    pd.testing.assert_frame_equal(transform_export(df), chained)
+
+
+def test_transform_export_leaves_input_untouched():
+    df = read_export(SAMPLE)
+    before = df.copy()
+
+    transform_export(df)
+
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_sample_header_maps_to_canonical_columns():
+    header = tuple(pd.read_csv(SAMPLE, nrows=0).columns)
+
+    mapping = header_mapping(header)
+
+    # El export de ejemplo trae todas las columnas conocidas, en el mismo orden
+    assert list(mapping) == list(header)
+    assert list(mapping.values()) == CANONICAL_COLUMNS
+    assert mapping["ConfirmationNumber"] == "confirmation_number"
+    assert mapping["RoomTypeToCharge"] == "room_type_to_charge"
+    assert mapping["Travel Agent"] == "travel_agent"
+    assert mapping["VIP Code"] == "vip_code"
+    assert mapping["ETD"] == "etd"
+
+
+def test_aliases_and_camel_case_headers():
+    header = ("Confirmation No.", "Guest Name", "ArrivalDate", "Departure Date", "VIPCode", "Travel Agent Name", "Notas")
+
+    mapping = header_mapping(header)
+
+    assert mapping == {
+        "Confirmation No.": "confirmation_number",
+        "Guest Name": "name",
+        "ArrivalDate": "arrival",
+        "Departure Date": "departure",
+        "VIPCode": "vip_code",
+        "Travel Agent Name": "travel_agent",
+    }
+
+
+def test_canonical_header_wins_over_alias():
+    df = pd.DataFrame({"Conf No": ["1"], "ConfirmationNumber": ["2"], "Name": ["Soto, Ana"]})
+
+    out = map_columns(df)
+
+    assert list(out.columns) == ["confirmation_number", "name"]
+    assert out["confirmation_number"].tolist() == ["2"]
+    assert list(df.columns) == ["Conf No", "ConfirmationNumber", "Name"]
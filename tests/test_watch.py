@@ -0,0 +1,76 @@
+import logging
+import os
+import signal
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src import main
+from src.watch import AlreadyRunningError, InstanceLock, ShutdownRequest
+
+logger = logging.getLogger("hotel_automation.tests")
+
+
+def test_second_lock_fails_while_first_is_held(tmp_path):
+    with InstanceLock(tmp_path):
+        with pytest.raises(AlreadyRunningError, match=f"PID {os.getpid()}"):
+            InstanceLock(tmp_path).acquire()
+
+    # Al soltarlo, otra instancia lo puede tomar
+    with InstanceLock(tmp_path):
+        pass
+
+
+def test_first_signal_stops_second_interrupts():
+    with ShutdownRequest() as shutdown:
+        signal.raise_signal(signal.SIGTERM)
+        assert shutdown.stop.is_set()
+
+        with pytest.raises(KeyboardInterrupt):
+            signal.raise_signal(signal.SIGTERM)
+
+
+
+def test_workers_ignore_shutdown_signals():
+    previous = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        ShutdownRequest.ignore_signals()
+        assert all(signal.getsignal(sig) is signal.SIG_IGN for sig in previous)
+        signal.raise_signal(signal.SIGTERM)
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+
+def test_parallel_stops_submitting_once_stop_is_set(tmp_path):
+    stop = threading.Event()
+    stop.set()
+
+    submitted = main.process_files_parallel(
+        [tmp_path / "opera_export_1.csv"], settings=None, logger=logger, archive_dir=tmp_path, workers=2, stop=stop
+    )
+
+    assert submitted == []
+
+
+def test_watch_uses_fresh_metrics_per_tick(monkeypatch):
+    seen = []
+
+    def run_once(settings, logger, workers, metrics, **kwargs):
+        metrics.record("outlook", 1.0)
+        seen.append(metrics)
+        return set()
+
+    def watch_loop(tick, interval, stop, logger):
+        tick()
+        tick()
+        return 2
+
+    monkeypatch.setattr(main, "run_once", run_once)
+    monkeypatch.setattr(main, "watch_loop", watch_loop)
+
+    main.run_watch(SimpleNamespace(enable_outlook_download=False), logger, workers=1, interval=1)
+
+    assert len(seen) == 2 and seen[0] is not seen[1]
+    assert [len(m.records) for m in seen] == [1, 1]